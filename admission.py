@@ -0,0 +1,368 @@
+# ================================
+# Admission control (admission.py)
+# ================================
+"""
+Rate limiting, queueing and load shedding in front of the upstream model.
+
+- Token buckets per route, and per client when ADMISSION_CLIENT_RATE is
+  set, reject bursts early with 429 + Retry-After. A client is its API key
+  when the key is one of ADMISSION_API_KEYS, else its remote address, so
+  made-up keys cannot buy fresh buckets; at most `max_clients` buckets are
+  kept (LRU). Loopback callers (the Streamlit front end, whose users all
+  share 127.0.0.1) are exempt from the per-client bucket by default.
+- At most `limit` upstream calls run at once. A slot is held around each
+  real completion (a single-flight leader, a batch item, a map/reduce node, a
+  job, a stream), not around the request, so cache hits and local-only
+  analysis never wait for one. Calls without a free slot wait in a bounded
+  queue for up to `queue_timeout` seconds; a full queue or an expired wait is
+  shed with 503 + Retry-After instead of piling up on the upstream.
+- The limit adapts to the upstream (AIMD): an upstream 429 halves it and
+  starts a cooldown for the upstream's Retry-After, each success grows it
+  back by ~1 per window of calls. While the cooldown outlasts the queue
+  deadline, new requests are shed immediately.
+"""
+import asyncio
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+
+import metrics
+
+# Routes that reach the upstream model get the rate buckets; nothing else is throttled
+ADMITTED_ROUTES = {
+    "generate_news",
+    "create_social_content",
+    "create_social_content_batch",
+    "create_content_series",
+    "analyze_news",
+    "submit_job",
+}
+
+
+class Rejected(Exception):
+    """A request refused by admission control (429 or 503)."""
+
+    def __init__(self, status, reason, retry_after):
+        super().__init__(
+            "Rate limit exceeded" if status == 429 else "Server busy, try again later"
+        )
+        self.status = status
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def take(self, now):
+        """Take one token; return 0 on success, else seconds until one is free."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+
+def _key_hash(key):
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+# Keys that identify a client by themselves (comma-separated ADMISSION_API_KEYS)
+API_KEYS = frozenset(
+    _key_hash(k.strip()) for k in os.getenv("ADMISSION_API_KEYS", "").split(",") if k.strip()
+)
+
+
+def client_id(headers, remote_addr, api_keys=None):
+    """
+    Rate-limit identity: a configured API key (X-API-Key or a Bearer token),
+    else the caller's address. Unknown keys are ignored.
+    """
+    api_keys = API_KEYS if api_keys is None else api_keys
+    key = headers.get("X-API-Key") or headers.get("Authorization") or ""
+    if key.lower().startswith("bearer "):
+        key = key[7:]
+    key = key.strip()
+    if key and api_keys and _key_hash(key) in api_keys:
+        return "key:" + _key_hash(key)
+    return f"ip:{remote_addr or 'unknown'}"
+
+
+def upstream_retry_after(error, default=1.0):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return default
+
+
+class _Admission:
+    """Buckets and adaptive limit shared by the threaded and asyncio controllers."""
+
+    def __init__(
+        self, client_rate=0.0, client_burst=20, route_rate=50.0, route_burst=100,
+        max_concurrent=64, min_concurrent=2, max_queue=256, queue_timeout=10.0,
+        max_clients=10000, exempt_clients=("ip:127.0.0.1", "ip:::1"), enabled=True,
+    ):
+        self.enabled = bool(enabled)  # False: no buckets and no concurrency limit
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.route_rate = route_rate
+        self.route_burst = route_burst
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.min_concurrent = max(1, min(int(min_concurrent), self.max_concurrent))
+        self.max_queue = int(max_queue)
+        self.queue_timeout = float(queue_timeout)
+        self.max_clients = max(1, int(max_clients))
+        self.exempt_clients = frozenset(exempt_clients)
+        self.limit = float(self.max_concurrent)
+        self.in_flight = 0
+        self.waiting = 0
+        self.cooldown_until = 0.0
+        self.service_time = 1.0  # EWMA of upstream call duration
+        self.admitted = 0
+        self.rejected = {}
+        self.upstream_rate_limits = 0
+        self._buckets_lock = threading.Lock()
+        self._clients = OrderedDict()  # client -> bucket, least recently seen first
+        self._routes = {}
+        self.client_evictions = 0
+
+    # ---------- token buckets ----------
+    def check_rate(self, client, route):
+        now = time.monotonic()
+        with self._buckets_lock:
+            if self.client_rate > 0 and client not in self.exempt_clients:
+                self._check_client(client, route, now)
+            bucket = self._routes.get(route)
+            if bucket is None:
+                bucket = self._routes[route] = TokenBucket(self.route_rate, self.route_burst)
+            wait = bucket.take(now)
+            if wait:
+                self._reject(route, 429, "route_rate_limited", wait)
+
+    def _check_client(self, client, route, now):
+        bucket = self._clients.get(client)
+        if bucket is None:
+            while len(self._clients) >= self.max_clients:
+                self._clients.popitem(last=False)
+                self.client_evictions += 1
+            bucket = self._clients[client] = TokenBucket(self.client_rate, self.client_burst)
+        else:
+            self._clients.move_to_end(client)
+        wait = bucket.take(now)
+        if wait:
+            self._reject(route, 429, "client_rate_limited", wait)
+
+    # ---------- queue ----------
+    def _reject(self, route, status, reason, retry_after):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        metrics.admission_rejected_total.inc(route, reason)
+        raise Rejected(status, reason, retry_after)
+
+    def _slot_free(self):
+        return self.in_flight < int(self.limit)
+
+    def _retry_hint(self):
+        cooldown = self.cooldown_until - time.monotonic()
+        backlog = self.service_time * (self.waiting + 1) / max(1, int(self.limit))
+        return max(cooldown, backlog, 1.0)
+
+    def _shed_before_queueing(self, route):
+        if self.cooldown_until - time.monotonic() > self.queue_timeout:
+            self._reject(route, 503, "upstream_cooldown", self._retry_hint())
+        if self.waiting >= self.max_queue:
+            self._reject(route, 503, "queue_full", self._retry_hint())
+
+    def _admit(self):
+        self.in_flight += 1
+        self.admitted += 1
+        metrics.admission_in_flight.set(self.in_flight)
+        return time.monotonic()
+
+    def _finish(self, started):
+        self.in_flight -= 1
+        elapsed = time.monotonic() - started
+        self.service_time = 0.8 * self.service_time + 0.2 * elapsed
+        metrics.admission_in_flight.set(self.in_flight)
+
+    # ---------- upstream feedback ----------
+    def upstream_succeeded(self):
+        """Grow the limit additively; True when a new slot opened up."""
+        before = int(self.limit)
+        self.limit = min(float(self.max_concurrent), self.limit + 1.0 / self.limit)
+        metrics.admission_limit.set(int(self.limit))
+        return int(self.limit) > before
+
+    def upstream_failed(self, error):
+        if metrics.classify_error(error) != "upstream_rate_limit":
+            return
+        now = time.monotonic()
+        self.upstream_rate_limits += 1
+        # Halve at most once per cooldown so one burst of 429s is one signal
+        if now >= self.cooldown_until:
+            self.limit = max(float(self.min_concurrent), self.limit / 2)
+            metrics.admission_limit.set(int(self.limit))
+        self.cooldown_until = max(self.cooldown_until, now + upstream_retry_after(error))
+
+    def retry_after(self):
+        return max(1, math.ceil(self._retry_hint()))
+
+    def stats(self):
+        return {
+            "limit": int(self.limit),
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "queue_timeout": self.queue_timeout,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "upstream_rate_limits": self.upstream_rate_limits,
+            "cooldown_seconds": round(max(0.0, self.cooldown_until - time.monotonic()), 3),
+            "client_rate": self.client_rate,
+            "clients": len(self._clients),
+            "client_evictions": self.client_evictions,
+        }
+
+
+class AdmissionController(_Admission):
+    """Thread-based admission for the threaded Flask server."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._cond = threading.Condition()
+
+    def acquire(self, route):
+        """Take an upstream slot or raise Rejected; returns a token for release()."""
+        with self._cond:
+            if self._slot_free() and not self.waiting:
+                return self._admit()
+            self._shed_before_queueing(route)
+            self.waiting += 1
+            metrics.admission_queue_depth.set(self.waiting)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while not self._slot_free():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._reject(route, 503, "queue_timeout", self._retry_hint())
+                    self._cond.wait(remaining)
+                return self._admit()
+            finally:
+                self.waiting -= 1
+                metrics.admission_queue_depth.set(self.waiting)
+
+    def release(self, token):
+        with self._cond:
+            self._finish(token)
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self, route):
+        """Hold an upstream slot around one call (a no-op when disabled)."""
+        if not self.enabled:
+            yield
+            return
+        token = self.acquire(route)
+        try:
+            yield
+        finally:
+            self.release(token)
+
+    def upstream_succeeded(self):
+        with self._cond:
+            if super().upstream_succeeded():
+                self._cond.notify_all()
+
+    def upstream_failed(self, error):
+        with self._cond:
+            super().upstream_failed(error)
+
+
+class AsyncAdmissionController(_Admission):
+    """Asyncio admission for async_api.py (all calls on the event loop)."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._cond = None
+
+    async def acquire(self, route):
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        async with self._cond:
+            if self._slot_free() and not self.waiting:
+                return self._admit()
+            self._shed_before_queueing(route)
+            self.waiting += 1
+            metrics.admission_queue_depth.set(self.waiting)
+            try:
+                await asyncio.wait_for(
+                    self._cond.wait_for(self._slot_free), self.queue_timeout
+                )
+            except asyncio.TimeoutError:
+                self._reject(route, 503, "queue_timeout", self._retry_hint())
+            finally:
+                self.waiting -= 1
+                metrics.admission_queue_depth.set(self.waiting)
+            return self._admit()
+
+    async def release(self, token):
+        self._finish(token)
+        if self._cond is not None:
+            async with self._cond:
+                self._cond.notify()
+
+    @asynccontextmanager
+    async def slot(self, route):
+        if not self.enabled:
+            yield
+            return
+        token = await self.acquire(route)
+        try:
+            yield
+        finally:
+            await self.release(token)
+
+    def upstream_succeeded(self):
+        if super().upstream_succeeded() and self._cond is not None:
+            asyncio.ensure_future(self._notify_all())
+
+    async def _notify_all(self):
+        async with self._cond:
+            self._cond.notify_all()
+
+
+def admission_enabled():
+    return os.getenv("ADMISSION", "1").lower() not in ("0", "false", "no")
+
+
+def admission_from_env(controller_class=AdmissionController):
+    return controller_class(
+        client_rate=float(os.getenv("ADMISSION_CLIENT_RATE", "0")),
+        client_burst=float(os.getenv("ADMISSION_CLIENT_BURST", "20")),
+        route_rate=float(os.getenv("ADMISSION_ROUTE_RATE", "50")),
+        route_burst=float(os.getenv("ADMISSION_ROUTE_BURST", "100")),
+        max_concurrent=int(os.getenv("ADMISSION_MAX_CONCURRENT", "64")),
+        max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "256")),
+        queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10")),
+        max_clients=int(os.getenv("ADMISSION_MAX_CLIENTS", "10000")),
+        exempt_clients=[
+            f"ip:{a.strip()}"
+            for a in os.getenv("ADMISSION_CLIENT_EXEMPT", "127.0.0.1,::1").split(",")
+            if a.strip()
+        ],
+        enabled=admission_enabled(),
+    )
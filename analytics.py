@@ -0,0 +1,272 @@
+# ================================
+# Local analytics (analytics.py)
+# ================================
+"""
+CPU-only sentiment, theme and hashtag extraction for /analyze_news.
+
+Every article (title + description) is tokenized once; the rest is NumPy
+over the whole batch as sparse (article, term, count) triples:
+- sentiment: lexicon scoring, (positive - negative) / (positive + negative + 1)
+  per article, with a word after "not"/"no"/"never"/... counted as its opposite;
+- themes: TF-IDF over unigrams and bigrams (stopwords dropped), rows
+  L2-normalized and averaged over the batch;
+- hashtags: CamelCase tags built from the top themes.
+
+The result is plain JSON. The LLM is only asked for the narrative on top
+(prompts.build_analysis_messages) when a request sets "narrative": true.
+NumPy is imported on the first analysis rather than at API startup.
+"""
+import os
+import re
+
+POSITIVE_WORDS = frozenset(
+    """
+    gain gains growth grow grows growing surge surges soar soars rally rallies rise rises
+    record boost boosts improve improves improved improvement recover recovery rebound
+    win wins won victory success successful breakthrough advance advances innovative
+    innovation strong stronger strength profit profits profitable beat beats optimism
+    optimistic hope hopeful confident confidence upbeat positive benefit benefits
+    celebrate celebrates celebrated award awarded praise praised support supports
+    approve approved approval agreement deal deals partnership expand expands expansion
+    launch launches launched milestone peace safe safer secure stable stability
+    thrive thrives boom booming upgrade upgraded cure healthy efficient affordable
+    relief rescue rescued saves saved welcome welcomed lead leads leading top best
+    """.split()
+)
+
+NEGATIVE_WORDS = frozenset(
+    """
+    loss losses lose loses losing fall falls fell drop drops plunge plunges slump slumps
+    decline declines declining crash crashes crisis crises recession inflation debt
+    layoffs layoff cut cuts cutting fail fails failed failure weak weaker weakness
+    risk risks risky threat threats threaten threatens warn warns warning fear fears
+    concern concerns worried worry doubt uncertain uncertainty negative down downturn
+    war attack attacks conflict violence killed kill kills death deaths dead injured
+    disaster storm storms flood floods fire fires wildfire earthquake outbreak virus
+    scandal fraud lawsuit sued sue charges charged arrest arrested ban banned fine fined
+    protest protests strike strikes shortage shortages delay delays delayed outage
+    breach hack hacked collapse collapses bankrupt bankruptcy struggle struggles worst
+    """.split()
+)
+
+NEGATORS = frozenset({"not", "no", "never", "without", "hardly", "nor", "cannot"})
+
+STOPWORDS = frozenset(
+    """
+    a about above after again against all also am an and any are as at be because been
+    before being below between both but by can could did do does doing down during each
+    few for from further had has have having he her here hers herself him himself his how
+    i if in into is it its itself just me more most my myself new news no nor not now of
+    off on once only or other our ours out over own same says said she should so some
+    such than that the their theirs them themselves then there these they this those
+    through to too under until up very was we were what when where which while who whom
+    why will with would you your yours year years today week amid via per one two three
+    first last next report reports according set sets make makes made get gets us
+    """.split()
+)
+
+SENTIMENT_THRESHOLD = 0.1
+_TOKEN_RE = re.compile(r"[a-z][a-z0-9'-]*[a-z0-9]|[a-z]")
+_CLAUSE_RE = re.compile(r"[.!?;:,()\[\]\"]+\s")
+
+
+def _tokens(text):
+    """Lowercase words; the first content word after a negator becomes "not_<word>"."""
+    out, negate = [], False
+    for word in _TOKEN_RE.findall(text.lower()):
+        if word in NEGATORS:
+            negate = True
+            continue
+        if negate and word in STOPWORDS:  # "not a concern" negates "concern"
+            out.append(word)
+            continue
+        out.append("not_" + word if negate else word)
+        negate = False
+    return out
+
+
+def _theme_terms(text):
+    """Unigrams and in-clause bigrams of non-stopword, non-negated tokens."""
+    terms = []
+    for clause in _CLAUSE_RE.split(text):
+        words = [t if len(t) > 2 and t not in STOPWORDS and not t.startswith("not_") else None
+                 for t in _tokens(clause)]
+        terms += [w for w in words if w]
+        terms += [f"{a} {b}" for a, b in zip(words, words[1:]) if a and b]
+    return terms
+
+
+def _hashtag(term):
+    tag = "".join(part[:1].upper() + part[1:] for part in re.split(r"[\s'-]+", term) if part)
+    return "#" + tag if tag and not tag.isdigit() and len(tag) <= 30 else None
+
+
+class _Vocab(dict):
+    def index(self, term):
+        idx = self.get(term)
+        if idx is None:
+            idx = self[term] = len(self)
+        return idx
+
+
+def _triples(docs, vocab):
+    """Sparse (doc, term, count) arrays for a list of token lists."""
+    import numpy as np
+
+    doc_idx, term_idx = [], []
+    for d, terms in enumerate(docs):
+        doc_idx.extend([d] * len(terms))
+        term_idx.extend(vocab.index(t) for t in terms)
+    doc_idx = np.asarray(doc_idx, dtype=np.int64)
+    term_idx = np.asarray(term_idx, dtype=np.int64)
+    width = max(len(vocab), 1)
+    keys, counts = np.unique(doc_idx * width + term_idx, return_counts=True)
+    return keys // width, keys % width, counts.astype(np.float64)
+
+
+def sentiment_scores(token_lists):
+    """Per-article sentiment in [-1, 1] plus positive/negative hit counts."""
+    import numpy as np
+
+    n = len(token_lists)
+    vocab = _Vocab()
+    doc, term, count = _triples(token_lists, vocab)
+    polarity = np.zeros(len(vocab))
+    for word, idx in vocab.items():
+        negated = word.startswith("not_")
+        base = word[4:] if negated else word
+        sign = 1.0 if base in POSITIVE_WORDS else -1.0 if base in NEGATIVE_WORDS else 0.0
+        polarity[idx] = -sign if negated else sign
+    hits = polarity[term] * count
+    positive = np.bincount(doc, weights=np.where(hits > 0, hits, 0.0), minlength=n)
+    negative = np.bincount(doc, weights=np.where(hits < 0, -hits, 0.0), minlength=n)
+    return (positive - negative) / (positive + negative + 1.0), positive, negative
+
+
+def tfidf_themes(term_lists, top_n=10, per_article=3):
+    """(top themes over the batch, top keywords per article) by TF-IDF."""
+    import numpy as np
+
+    n = len(term_lists)
+    vocab = _Vocab()
+    doc, term, count = _triples(term_lists, vocab)
+    if not len(term):
+        return [], [[] for _ in range(n)]
+    terms = np.array(list(vocab), dtype=object)
+    doc_len = np.bincount(doc, weights=count, minlength=n)
+    df = np.bincount(term, minlength=len(vocab))
+    idf = np.log((1.0 + n) / (1.0 + df)) + 1.0
+    weight = count / doc_len[doc] * idf[term]
+    norms = np.sqrt(np.bincount(doc, weights=weight ** 2, minlength=n))
+    weight /= norms[doc]
+
+    score = np.bincount(term, weights=weight, minlength=len(vocab)) / n
+    candidates = np.argsort(-score, kind="stable")[:top_n * 3].tolist()
+    # A word that only occurs inside a top phrase is shown as the phrase
+    covered = set()
+    for i in candidates:
+        if " " in terms[i]:
+            covered.update(w for w in terms[i].split() if df[vocab[w]] <= df[i])
+    top = [i for i in candidates if terms[i] not in covered][:top_n]
+    themes = [
+        {"term": terms[i], "score": round(float(score[i]), 4), "articles": int(df[i])}
+        for i in top
+    ]
+
+    # Top keywords per article: sort by (article, -weight) and keep each group's head
+    order = np.lexsort((-weight, doc))
+    sorted_doc = doc[order]
+    group_start = np.searchsorted(sorted_doc, np.arange(n))
+    rank = np.arange(len(order)) - group_start[sorted_doc]
+    keep = order[rank < per_article]
+    keywords = [[] for _ in range(n)]
+    for d, t in zip(doc[keep].tolist(), term[keep].tolist()):
+        keywords[d].append(terms[t])
+    return themes, keywords
+
+
+def _label(score):
+    if score > SENTIMENT_THRESHOLD:
+        return "positive"
+    if score < -SENTIMENT_THRESHOLD:
+        return "negative"
+    return "neutral"
+
+
+def analyze_articles(articles, top_n=10, max_hashtags=8):
+    """Sentiment breakdown, themes, hashtag ideas and per-article scores."""
+    texts = [f"{a.get('title') or ''}. {a.get('description') or ''}" for a in articles]
+    token_lists = [_tokens(t) for t in texts]
+    n = len(articles)
+    if not n:
+        return {
+            "articles_analyzed": 0,
+            "sentiment": {"positive": 0.0, "negative": 0.0, "neutral": 0.0, "average_score": 0.0},
+            "themes": [],
+            "hashtags": [],
+            "articles": [],
+        }
+
+    scores, _, _ = sentiment_scores(token_lists)
+    themes, keywords = tfidf_themes([_theme_terms(t) for t in texts], top_n=top_n)
+    labels = [_label(s) for s in scores.tolist()]
+
+    hashtags = []
+    for theme in themes:
+        tag = _hashtag(theme["term"])
+        if tag and tag.lower() not in {h.lower() for h in hashtags}:
+            hashtags.append(tag)
+        if len(hashtags) >= max_hashtags:
+            break
+
+    per_article = []
+    for i, article in enumerate(articles):
+        item = {
+            "index": i,
+            "title": article.get("title") or "",
+            "sentiment": labels[i],
+            "score": round(float(scores[i]), 3),
+            "keywords": keywords[i],
+        }
+        if article.get("id") is not None:
+            item["id"] = article["id"]
+        per_article.append(item)
+
+    return {
+        "articles_analyzed": n,
+        "sentiment": {
+            **{k: round(100.0 * labels.count(k) / n, 1) for k in ("positive", "negative", "neutral")},
+            "average_score": round(float(scores.mean()), 3),
+        },
+        "themes": themes,
+        "hashtags": hashtags,
+        "articles": per_article,
+    }
+
+
+def analytics_summary(result):
+    """Plain-text report of analyze_articles() output (the non-LLM "analysis")."""
+    if not result["articles_analyzed"]:
+        return "No articles to analyze."
+    s = result["sentiment"]
+    lines = [
+        f"Sentiment: {s['positive']}% positive, {s['negative']}% negative, "
+        f"{s['neutral']}% neutral (average score {s['average_score']:+.2f})",
+        "Key themes: " + ", ".join(t["term"] for t in result["themes"]),
+        "Hashtag ideas: " + " ".join(result["hashtags"]),
+    ]
+    ranked = sorted(result["articles"], key=lambda a: a["score"])
+    if ranked[-1]["score"] > SENTIMENT_THRESHOLD:
+        lines.append(f"Most positive: {ranked[-1]['title']} ({ranked[-1]['score']:+.2f})")
+    if ranked[0]["score"] < -SENTIMENT_THRESHOLD:
+        lines.append(f"Most negative: {ranked[0]['title']} ({ranked[0]['score']:+.2f})")
+    return "\n".join(lines)
+
+
+def narrative_requested(data):
+    """Opt-in per request (`narrative`); the ANALYSIS_NARRATIVE env flag sets the default."""
+    default = os.getenv("ANALYSIS_NARRATIVE", "0").lower() in ("1", "true", "yes")
+    value = data.get("narrative", default)
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
@@ -4,47 +4,290 @@
 import streamlit as st
 import requests
 import subprocess
-import time
 import os
 import sys
-import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cards import article_key, content_card_html, news_card_html, page_slice, theme_css
+from serve import api_is_healthy, wait_for_health
+from streaming import iter_sse
 
 API_PORT = int(os.getenv("NEWS_API_PORT", "5001"))
 API_BASE_URL = f"http://127.0.0.1:{API_PORT}"
+API_STARTUP_TIMEOUT = float(os.getenv("API_STARTUP_TIMEOUT", "20"))
+NEWS_PAGE_SIZE = int(os.getenv("NEWS_PAGE_SIZE", "10"))  # 0 = show every card
 
 
 # ---------- Helpers ----------
+@st.cache_resource(show_spinner="Starting API...")
 def start_flask_api():
-    """Start the Flask API in a background process if it's not already running."""
+    """
+    Start the API once per Streamlit process, unless one already answers on
+    NEWS_API_PORT, and wait for /health (with backoff) instead of a fixed sleep.
+    API_LAUNCHER=serve starts the multi-worker launcher (serve.py) instead.
+    Raises on failure so the next rerun retries.
+    """
+    if api_is_healthy(API_BASE_URL):
+        return True
+
+    api_dir = os.path.dirname(os.path.abspath(__file__))
+    script = "serve.py" if os.getenv("API_LAUNCHER", "").lower() == "serve" else "flask_api.py"
+    env = os.environ.copy()
+    env["NEWS_API_PORT"] = str(API_PORT)
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(api_dir, script)],
+        cwd=api_dir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.STDOUT,
+        env=env,
+    )
+    if not wait_for_health(API_BASE_URL, API_STARTUP_TIMEOUT, proc=proc):
+        raise RuntimeError(f"API did not become healthy on {API_BASE_URL}")
+    return True
+
+
+# Read timeouts per route (seconds); connect timeout is always short
+ROUTE_TIMEOUTS = {
+    "/health": 2,
+    "/articles": 5,
+    "/generate_news": 30,
+    "/create_social_content": 45,
+    "/create_social_content/batch": 90,
+    "/create_content_series": 90,
+    "/analyze_news": 90,
+    "/jobs": 10,
+}
+CONNECT_TIMEOUT = 3.05
+
+
+def route_timeout(path, timeout=None):
+    read = timeout if timeout is not None else ROUTE_TIMEOUTS.get(path, 45)
+    return (CONNECT_TIMEOUT, read)
+
+
+@st.cache_resource
+def get_session():
+    """
+    Process-wide keep-alive session shared by all Streamlit sessions.
+    Connection failures are retried for every method; 502/503/504 only for
+    GETs, so paid-for POST generations are never silently repeated.
+    """
+    retry_kwargs = dict(
+        total=3,
+        connect=3,
+        read=0,
+        status=2,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
     try:
-        api_dir = os.path.dirname(os.path.abspath(__file__))
-        api_path = os.path.join(api_dir, "flask_api.py")
-        env = os.environ.copy()
-        env["NEWS_API_PORT"] = str(API_PORT)
-        subprocess.Popen(
-            [sys.executable, api_path],
-            cwd=api_dir,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.STDOUT,
-            env=env,
-        )
-        time.sleep(2.5)
-    except Exception as e:
-        st.error(f"Failed to start Flask API: {e}")
+        retry = Retry(backoff_jitter=0.25, **retry_kwargs)
+    except TypeError:  # urllib3 < 2 has no backoff_jitter
+        retry = Retry(**retry_kwargs)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 
-def call_api(path, method="GET", data=None, params=None, timeout=45):
+def call_api(path, method="GET", data=None, params=None, timeout=None):
     try:
         url = f"{API_BASE_URL}{path}"
+        session = get_session()
         if method == "GET":
-            r = requests.get(url, params=params, timeout=timeout)
+            r = session.get(url, params=params, timeout=route_timeout(path, timeout))
         else:
-            r = requests.post(url, json=data, timeout=timeout)
+            r = session.post(url, json=data, timeout=route_timeout(path, timeout))
         return r.json()
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+@st.cache_resource
+def get_fan_out_pool():
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="fan-out")
+
+
+def fan_out(calls):
+    """
+    Run several call_api calls concurrently and return their results in order.
+    Each call is a dict of call_api keyword arguments (path, method, data, ...).
+    """
+    pool = get_fan_out_pool()
+    futures = [pool.submit(call_api, **call) for call in calls]
+    return [f.result() for f in futures]
+
+
+def run_jobs(jobs, timeout=300, poll_interval=0.5):
+    """
+    Submit generations as API jobs (POST /jobs) and wait for all of them.
+    Jobs are submitted, and then polled, concurrently (fan_out). The work runs
+    server-side and its result is kept, so a slow upstream call is not lost
+    to a client read timeout. Returns each job's result payload (or an error
+    dict) in order.
+    """
+    submitted = fan_out([{"path": "/jobs", "method": "POST", "data": job} for job in jobs])
+    results = [None if res.get("success") else res for res in submitted]
+    deadline = time.monotonic() + timeout
+    delay = poll_interval
+    while any(r is None for r in results) and time.monotonic() < deadline:
+        time.sleep(delay)
+        delay = min(delay * 1.5, 3.0)
+        pending = [i for i, r in enumerate(results) if r is None]
+        polls = fan_out([{"path": f"/jobs/{submitted[i]['job']['id']}"} for i in pending])
+        for i, polled in zip(pending, polls):
+            job = polled.get("job") or {}
+            if not polled.get("success"):
+                results[i] = polled
+            elif job["status"] == "succeeded":
+                results[i] = job["result"]
+            elif job["status"] in ("failed", "cancelled"):
+                results[i] = {"success": False, "error": job.get("error") or f"Job {job['status']}"}
+    return [r or {"success": False, "error": "Timed out waiting for the job"} for r in results]
+
+
+def stream_api(path, data, result, timeout=None):
+    """
+    Yield text deltas from a streaming (SSE) endpoint as they arrive.
+    The final payload (or error) is stored in `result` once the stream ends.
+    """
+    try:
+        url = f"{API_BASE_URL}{path}"
+        with get_session().post(
+            url, json={**data, "stream": True}, stream=True, timeout=route_timeout(path, timeout)
+        ) as r:
+            for event, payload in iter_sse(r.iter_lines(decode_unicode=True)):
+                if event == "token":
+                    yield payload.get("delta", "")
+                elif event in ("done", "error"):
+                    result.update(payload)
+    except Exception as e:
+        result.update({"success": False, "error": str(e)})
+
+
+def stream_articles(path, params, result, timeout=None):
+    """
+    Yield articles from a streaming GET endpoint (`article` events) as they
+    arrive. The final payload (or error) is stored in `result`.
+    """
+    try:
+        url = f"{API_BASE_URL}{path}"
+        with get_session().get(
+            url, params={**params, "stream": "true"}, stream=True,
+            timeout=route_timeout(path, timeout),
+        ) as r:
+            for event, payload in iter_sse(r.iter_lines(decode_unicode=True)):
+                if event == "article":
+                    yield payload["article"]
+                elif event in ("done", "error"):
+                    result.update(payload)
+    except Exception as e:
+        result.update({"success": False, "error": str(e)})
+
+
+def render_stream(path, data, field, label, height):
+    """Render tokens incrementally, then swap in an editable text area; returns the payload."""
+    result = {}
+    placeholder = st.empty()
+    with placeholder.container():
+        st.write_stream(stream_api(path, data, result))
+    if result.get("success"):
+        placeholder.text_area(label, result[field], height=height)
+    else:
+        placeholder.empty()
+        st.error(result.get("error", "Stream ended unexpectedly"))
+    return result
+
+
+def render_analytics(analytics):
+    """Locally computed sentiment split, themes, hashtag ideas and per-article scores."""
+    if not analytics or not analytics.get("articles_analyzed"):
+        return
+    sentiment = analytics["sentiment"]
+    cols = st.columns(4)
+    for col, key in zip(cols, ("positive", "neutral", "negative")):
+        col.metric(key.title(), f"{sentiment[key]}%")
+    cols[3].metric("Average score", f"{sentiment['average_score']:+.2f}")
+    if analytics["themes"]:
+        st.caption("Key themes")
+        st.bar_chart({t["term"]: t["score"] for t in analytics["themes"]}, horizontal=True)
+    if analytics["hashtags"]:
+        st.code(" ".join(analytics["hashtags"]), language=None)
+    with st.expander("Per-article scores"):
+        st.dataframe(
+            [
+                {
+                    "title": a["title"],
+                    "sentiment": a["sentiment"],
+                    "score": a["score"],
+                    "keywords": ", ".join(a["keywords"]),
+                }
+                for a in analytics["articles"]
+            ],
+            hide_index=True,
+        )
+
+
+def article_ref(article):
+    """Reference one stored article by id; fall back to the full dict."""
+    if article.get("id") is not None:
+        return {"article_id": article["id"]}
+    return {"article": article}
+
+
+def article_refs(articles, key="articles"):
+    """Reference stored articles by id (smaller bodies); fall back to full dicts."""
+    if articles and all(a.get("id") is not None for a in articles):
+        return {f"{key[:-1]}_ids": [a["id"] for a in articles]}
+    return {key: articles}
+
+
+@st.fragment
+def render_news_list():
+    """
+    Cards for the current page of fetched articles. Paging reruns only this
+    fragment; card HTML comes from the cards.py cache.
+    """
+    news = st.session_state.get("news") or []
+    items, page, pages = page_slice(news, st.session_state.get("news_page", 1), NEWS_PAGE_SIZE)
+    if pages > 1:
+        st.session_state.news_page = page
+        c1, c2 = st.columns([1, 3])
+        with c1:
+            page = st.number_input("Page", min_value=1, max_value=pages, key="news_page")
+        with c2:
+            first = (page - 1) * NEWS_PAGE_SIZE
+            st.caption(f"Showing {first + 1}–{first + len(items)} of {len(news)} articles")
+        items, _, _ = page_slice(news, page, NEWS_PAGE_SIZE)
+
+    for i, art in enumerate(items):
+        key = article_key(art)
+        with st.container():
+            st.markdown(news_card_html(art), unsafe_allow_html=True)
+            c1, c2 = st.columns([1, 1])
+            with c1:
+                if st.button("📝 Create Content", key=f"create_{i}_{key}"):
+                    # Save the selected article for Tab 2 to render
+                    st.session_state.selected = art
+                    st.session_state.show_selected_in_tab2 = True
+                    st.session_state.selected_notice = key
+                    # Rerun the whole app so the Create Content tab sees it
+                    st.rerun()
+                if st.session_state.get("selected_notice") == key:
+                    st.success("Selected for Create Content. Open the 'Create Content' tab to continue.")
+            with c2:
+                if art.get("url"):
+                    st.link_button("🔗 Open Article", art["url"])
+
+
 # ---------- App ----------
 def main():
     st.set_page_config(
@@ -73,57 +316,8 @@ def main():
         )
         dark_mode = st.toggle("🌙 Dark Mode", value=True)
 
-    # Theme CSS variables
-    if dark_mode:
-        st.markdown(
-            """
-            <style>
-            :root {
-              --bg:#101114; --panel:#1b1d22; --panel-soft:#24272e;
-              --text:#f2f2f2; --muted:#c6c6c6; --accent:#e84a5f;
-            }
-            .stApp { background: var(--bg); color: var(--text); }
-            .news-card {
-              background: var(--panel); color: var(--text);
-              padding: 1rem; border-radius: 12px;
-              border-left: 4px solid var(--accent); margin: 1rem 0;
-              box-shadow: 0 2px 10px rgba(0,0,0,.35);
-            }
-            .content-card {
-              background: var(--panel-soft); color: var(--text);
-              padding: 1rem; border-radius: 12px; border: 1px solid var(--accent);
-              margin: 1rem 0; box-shadow: 0 2px 10px rgba(0,0,0,.35);
-            }
-            </style>
-            """,
-            unsafe_allow_html=True,
-        )
-    else:
-        st.markdown(
-            """
-            <style>
-            :root {
-              --bg:#ffffff; --panel:#f9f9fb; --panel-soft:#f3f7ff;
-              --text:#0f172a; --muted:#475569; --accent:#1f77b4;
-            }
-            .stApp { background: var(--bg); color: var(--text); }
-            .news-card {
-              background: var(--panel); color: var(--text);
-              padding: 1rem; border-radius: 12px;
-              border-left: 4px solid var(--accent); margin: 1rem 0;
-              box-shadow: 0 2px 8px rgba(0,0,0,.08);
-            }
-            .content-card {
-              background: var(--panel-soft); color: var(--text);
-              padding: 1rem; border-radius: 12px; border: 1px solid var(--accent);
-              margin: 1rem 0; box-shadow: 0 2px 8px rgba(0,0,0,.08);
-            }
-            </style>
-            """,
-            unsafe_allow_html=True,
-        )
-   
-  
+    # Theme CSS variables (built once per theme)
+    st.markdown(theme_css(dark_mode), unsafe_allow_html=True)
 
     st.markdown(
     """
@@ -138,10 +332,20 @@ def main():
     )
 
    
-    # Start API once
-    if "api_started" not in st.session_state:
+    # Start API once per process (no-op if it is already running)
+    try:
         start_flask_api()
-        st.session_state.api_started = True
+    except Exception as e:
+        st.error(f"Failed to start Flask API: {e}")
+
+    # Restore the latest stored articles after a browser refresh
+    if "news" not in st.session_state:
+        data = call_api(
+            "/articles",
+            params={"category": news_category, "country": news_country, "limit": 5},
+            timeout=5,
+        )
+        st.session_state.news = data.get("articles", []) if data.get("success") else []
 
     tab1, tab2, tab3, tab4 = st.tabs(
         ["📰 Fetch News", "📝 Create Content", "📊 Series", "📈 Analytics"]
@@ -152,40 +356,30 @@ def main():
         st.header("📰 Fetch News")
         if st.button("🔄 Fetch Latest News", type="primary"):
             with st.spinner("Generating fresh headlines..."):
-                data = call_api(
+                # Headlines are listed as soon as each one is generated
+                data, arrived, live = {}, [], st.empty()
+                for art in stream_articles(
                     "/generate_news",
-                    params={"category": news_category, "country": news_country, "limit": 5},
-                )
+                    {"category": news_category, "country": news_country, "limit": 5},
+                    data,
+                ):
+                    arrived.append(art)
+                    live.markdown("\n".join(f"- {a.get('title', '')}" for a in arrived))
+                live.empty()
                 if data.get("success"):
                     st.session_state.news = data["articles"]
-                    st.success(f"Fetched {data['count']} fresh articles")
+                    st.session_state.news_page = 1
+                    st.session_state.pop("selected_notice", None)
+                    st.success(f"Fetched {len(data['articles'])} fresh articles")
+                    if data.get("partial"):
+                        st.warning(
+                            f"Only {data['salvaged']} of {data['requested']} articles "
+                            "could be recovered from the model output"
+                        )
                 else:
                     st.error(data.get("error"))
 
-        if "news" in st.session_state and st.session_state.news:
-            for i, art in enumerate(st.session_state.news):
-                with st.container():
-                    st.markdown(
-                        f"""
-                        <div class="news-card">
-                          <h3 style="margin:.1rem 0 0.6rem 0;">{art.get('title','')}</h3>
-                          <p style="margin:.2rem 0; color: var(--muted);">{art.get('source','Unknown')} — {art.get('published_at','')}</p>
-                          <p style="margin:.4rem 0 0.6rem 0;">{art.get('description','')}</p>
-                          {"<a href='"+art.get("url","")+"' target='_blank'>Read more</a>" if art.get("url") else ""}
-                        </div>
-                        """,
-                        unsafe_allow_html=True,
-                    )
-                    c1, c2 = st.columns([1, 1])
-                    with c1:
-                        if st.button("📝 Create Content", key=f"create_{i}"):
-                            # Save the selected article for Tab 2 to render
-                            st.session_state.selected = art
-                            st.session_state.show_selected_in_tab2 = True
-                            st.success("Selected for Create Content. Open the 'Create Content' tab to continue.")
-                    with c2:
-                        if art.get("url"):
-                            st.link_button("🔗 Open Article", art["url"])
+        render_news_list()
 
     # === Tab 2: Create Content ===
     with tab2:
@@ -194,38 +388,57 @@ def main():
         # Show the selected article card right below the title
         if st.session_state.get("selected"):
             art = st.session_state["selected"]
-            st.markdown(
-                f"""
-                <div class="content-card">
-                  <h4 style="margin:0 0 .5rem 0;">{art.get('title','(No title)')}</h4>
-                  <p style="margin:.25rem 0;"><strong>Source:</strong> {art.get('source','Unknown')}</p>
-                  <p style="margin:.25rem 0; opacity:.9;">{art.get('description','')}</p>
-                  <small>{art.get('published_at','')}</small>
-                  {"<p style='margin-top:.5rem;'><a href='"+art.get("url","")+"' target='_blank'>Read full article</a></p>" if art.get("url") else ""}
-                </div>
-                """,
-                unsafe_allow_html=True,
-            )
+            st.markdown(content_card_html(art), unsafe_allow_html=True)
 
             st.caption(f"Platform: {platform.title()} • Tone: {tone}")
 
-            if st.button("🚀 Generate Post", type="primary"):
-                with st.spinner("Generating post..."):
+            c1, c2 = st.columns([1, 1])
+            with c1:
+                generate_one = st.button("🚀 Generate Post", type="primary")
+            with c2:
+                generate_all = st.button("🌐 Generate for All Platforms")
+
+            if generate_one:
+                render_stream(
+                    "/create_social_content",
+                    {
+                        **article_ref(art),
+                        "platform": platform,
+                        "tone": tone,
+                        "include_hashtags": True,
+                        "include_link": True,
+                    },
+                    "content",
+                    "Generated Content",
+                    180,
+                )
+
+            if generate_all:
+                # One batch call; the API runs the platform posts concurrently
+                with st.spinner("Generating posts for every platform..."):
                     res = call_api(
-                        "/create_social_content",
+                        "/create_social_content/batch",
                         method="POST",
                         data={
-                            "article": art,
-                            "platform": platform,
+                            **article_ref(art),
                             "tone": tone,
                             "include_hashtags": True,
                             "include_link": True,
                         },
                     )
-                    if res.get("success"):
-                        st.text_area("Generated Content", res["content"], height=180)
-                    else:
-                        st.error(res.get("error"))
+                if res.get("success"):
+                    for item in res["results"]:
+                        if item.get("success"):
+                            st.text_area(
+                                item["platform"].title(),
+                                item["content"],
+                                height=160,
+                                key=f"all_{item['platform']}",
+                            )
+                        else:
+                            st.error(f"{item['platform'].title()}: {item.get('error')}")
+                else:
+                    st.error(res.get("error"))
         else:
             st.info("Select an article in the 'Fetch News' tab (click its Create Content button).")
 
@@ -234,21 +447,18 @@ def main():
         st.header("📊 Create Content Series")
         if "news" in st.session_state and len(st.session_state.news) >= 2:
             if st.button("🎬 Generate Series"):
-                with st.spinner("Creating series..."):
-                    res = call_api(
-                        "/create_content_series",
-                        method="POST",
-                        data={
-                            "articles": st.session_state.news[:3],
-                            "platform": platform,
-                            "theme": "Daily Update",
-                            "tone": tone,
-                        },
-                    )
-                    if res.get("success"):
-                        st.text_area("Series Content", res["series"], height=320)
-                    else:
-                        st.error(res.get("error"))
+                render_stream(
+                    "/create_content_series",
+                    {
+                        **article_refs(st.session_state.news[:3]),
+                        "platform": platform,
+                        "theme": "Daily Update",
+                        "tone": tone,
+                    },
+                    "series",
+                    "Series Content",
+                    320,
+                )
         else:
             st.info("Fetch at least 2 articles to build a series.")
 
@@ -256,13 +466,52 @@ def main():
     with tab4:
         st.header("📈 News Analysis & Strategy")
         if "news" in st.session_state and st.session_state.news:
-            if st.button("🔍 Analyze"):
-                with st.spinner("Analyzing..."):
-                    res = call_api("/analyze_news", method="POST", data={"articles": st.session_state.news})
+            c1, c2, c3 = st.columns([1, 1, 1])
+            with c1:
+                analyze = st.button("🔍 Analyze")
+            with c2:
+                analyze_and_series = st.button("⚡ Analyze + Series")
+            with c3:
+                # Scores are computed locally; GPT only writes the strategy narrative
+                narrative = st.checkbox("✍️ Add GPT narrative", value=False)
+
+            if analyze:
+                result = render_stream(
+                    "/analyze_news",
+                    {**article_refs(st.session_state.news), "narrative": narrative},
+                    "analysis",
+                    "Analysis",
+                    320,
+                )
+                render_analytics(result.get("analytics"))
+
+            if analyze_and_series:
+                with st.spinner("Running analysis and series in parallel..."):
+                    analysis, series = run_jobs(
+                        [
+                            {
+                                "type": "analysis",
+                                **article_refs(st.session_state.news),
+                                "narrative": narrative,
+                            },
+                            {
+                                "type": "series",
+                                **article_refs(st.session_state.news[:3]),
+                                "platform": platform,
+                                "theme": "Daily Update",
+                                "tone": tone,
+                            },
+                        ]
+                    )
+                for res, field, label in (
+                    (analysis, "analysis", "Analysis"),
+                    (series, "series", "Series Content"),
+                ):
                     if res.get("success"):
-                        st.text_area("Analysis", res["analysis"], height=320)
+                        st.text_area(label, res[field], height=320, key=f"job_{field}")
                     else:
                         st.error(res.get("error"))
+                render_analytics(analysis.get("analytics"))
         else:
             st.info("Fetch articles first to run analytics.")
 
@@ -0,0 +1,154 @@
+# ================================
+# Article store (article_store.py)
+# ================================
+"""
+SQLite store for generated articles.
+
+Every article returned by /generate_news is saved here (deduplicated by a
+content hash of title + description) and gets a stable integer `id`. The
+downstream routes accept `article_id` / `article_ids` instead of full article
+payloads, and articles survive Streamlit refreshes and are shared by users.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+ARTICLE_FIELDS = ("title", "description", "source", "published_at", "url")
+
+
+class UnknownArticle(KeyError):
+    """Raised when a request references article IDs that are not stored."""
+
+    def __init__(self, ids):
+        super().__init__(ids)
+        self.ids = ids
+
+    def __str__(self):
+        return f"Unknown article id(s): {', '.join(str(i) for i in self.ids)}"
+
+
+def content_hash(article):
+    text = "\n".join(
+        " ".join(str(article.get(k) or "").lower().split()) for k in ("title", "description")
+    )
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class ArticleStore:
+    def __init__(self, path="articles.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                content_hash TEXT NOT NULL UNIQUE,
+                country TEXT,
+                category TEXT,
+                title TEXT,
+                description TEXT,
+                source TEXT,
+                published_at TEXT,
+                url TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_articles_country ON articles(country);
+            CREATE INDEX IF NOT EXISTS idx_articles_category ON articles(category);
+            CREATE INDEX IF NOT EXISTS idx_articles_published ON articles(published_at);
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _to_dict(row):
+        article = {k: row[k] for k in ARTICLE_FIELDS}
+        article["id"] = row["id"]
+        return article
+
+    def add_many(self, articles, country=None, category=None):
+        """Store articles (skipping duplicates) and return them with their `id`."""
+        stored = []
+        now = time.time()
+        with self._lock:
+            for article in articles:
+                if not isinstance(article, dict):
+                    continue
+                digest = content_hash(article)
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO articles (content_hash, country, category, title, "
+                    "description, source, published_at, url, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        digest,
+                        country,
+                        category,
+                        *(str(article.get(k) or "") for k in ARTICLE_FIELDS),
+                        now,
+                    ),
+                )
+                row = self._conn.execute(
+                    "SELECT id FROM articles WHERE content_hash = ?", (digest,)
+                ).fetchone()
+                stored.append({**article, "id": row["id"]})
+            self._conn.commit()
+        return stored
+
+    def get(self, article_id):
+        return self.get_many([article_id])[0]
+
+    def get_many(self, ids):
+        """Return articles in the order of `ids`; raises UnknownArticle if any is missing."""
+        try:
+            ids = [int(i) for i in ids]
+        except (TypeError, ValueError):
+            raise UnknownArticle(list(ids))
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM articles WHERE id IN ({placeholders})", ids
+            ).fetchall()
+        by_id = {row["id"]: self._to_dict(row) for row in rows}
+        missing = [i for i in ids if i not in by_id]
+        if missing:
+            raise UnknownArticle(missing)
+        return [by_id[i] for i in ids]
+
+    def recent(self, country=None, category=None, limit=20):
+        """Newest stored articles, optionally filtered by country/category."""
+        clauses, params = [], []
+        if country:
+            clauses.append("country = ?")
+            params.append(country)
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM articles {where} ORDER BY published_at DESC, id DESC LIMIT ?",
+                (*params, int(limit)),
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def article_from_request(self, data):
+        """The article for a single-post request: `article_id` or inline `article`."""
+        if data.get("article_id") is not None:
+            return self.get(data["article_id"])
+        return data.get("article", {}) or {}
+
+    def articles_from_request(self, data):
+        """The articles for a multi-article request: `article_ids` or inline `articles`."""
+        if data.get("article_ids"):
+            return self.get_many(data["article_ids"])
+        return data.get("articles", []) or []
+
+
+def store_from_env():
+    return ArticleStore(os.getenv("ARTICLE_STORE_PATH", "articles.db"))
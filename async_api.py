@@ -0,0 +1,792 @@
+# ================================
+# GPT News API — asyncio mode (async_api.py)
+# ================================
+"""
+Asyncio variant of flask_api.py with the same routes and JSON contract.
+
+Requests are served by an ASGI server (uvicorn) and upstream calls go through
+AsyncOpenAI on pooled httpx connections, so a slow completion holds a
+coroutine instead of an OS thread. Blocking work (SQLite stores, NumPy
+analytics, importing openai) runs in worker threads, off the event loop.
+
+Select it at startup with API_MODE=async (see flask_api.py), or run directly:
+    uvicorn async_api:app --port 5001
+
+Pool tuning:
+    OPENAI_MAX_CONNECTIONS   max open upstream connections (default 1000)
+    OPENAI_POOL_SIZE         connections per httpx pool (default 32)
+    OPENAI_MAX_KEEPALIVE     idle keep-alive connections kept (default: all)
+    OPENAI_TIMEOUT           per-request upstream timeout in seconds (default 60)
+"""
+import asyncio
+import itertools
+import math
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from quart import Quart, Response, g, request
+from quart_cors import cors
+from quart.wrappers.response import DataBody
+
+from admission import (
+    ADMITTED_ROUTES,
+    AsyncAdmissionController,
+    Rejected,
+    admission_from_env,
+    client_id,
+)
+from analytics import narrative_requested
+from article_store import UnknownArticle, store_from_env
+import generation
+from generation import BATCH_MAX_WORKERS, completion_text
+from jobs import CANCELLED, FAILED, SUCCEEDED, UnknownJob, job_request, job_store_from_env
+from model_router import AsyncModelRouter, hedge_default_from_env, router_config_from_env
+import metrics
+from json_salvage import ArticleStreamParser
+from mapreduce import AsyncMapReducer, map_reduce_requested, mapreduce_from_env
+from prompts import ANALYSIS_MAX_ARTICLES, SERIES_MAX_ARTICLES, InvalidGPTJSON, InvalidRequest
+from prewarm import claim_scheduler, news_cache_key, prewarm_enabled, prewarmer_from_env
+from response_cache import MISS, STALE, SQLiteBackend, cache_from_env
+from semantic_cache import (
+    article_text,
+    reuse_post,
+    semantic_cache_from_env,
+    semantic_cache_requested,
+    social_scope,
+)
+from serialization import compress_body, compressible, encode_body
+from singleflight import AsyncSingleFlight, request_key
+from streaming import (
+    SSE_HEADERS,
+    SSE_MIMETYPE,
+    chunk_text,
+    sse_complete,
+    sse_event,
+    wants_stream,
+)
+
+load_dotenv()
+
+app = cors(Quart(__name__), allow_origin="*")
+
+OPENAI_KEY = os.getenv("OPENAI_API_KEY")
+MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "1000"))
+POOL_SIZE = max(1, int(os.getenv("OPENAI_POOL_SIZE", "32")))
+MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", str(MAX_CONNECTIONS)))
+UPSTREAM_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "8"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "200"))
+
+client = None  # built on first use (get_client), so workers answer /health sooner
+_client_lock = threading.Lock()
+response_cache = cache_from_env()
+article_store = store_from_env()
+semantic_cache = semantic_cache_from_env()
+single_flight = AsyncSingleFlight()
+admission = admission_from_env(AsyncAdmissionController)
+job_store = job_store_from_env()
+job_slots = asyncio.Semaphore(JOB_MAX_WORKERS)
+_job_tasks = {}  # job id -> Task, for jobs queued or running in this process
+
+
+class ClientShards:
+    """
+    Round-robin over several AsyncOpenAI clients, each on its own small httpx
+    pool, built as they are first picked. httpcore scans every connection in
+    a pool for each request it queues, so one pool of hundreds of connections
+    spends more CPU per call than the upstream wait it overlaps; pools of
+    OPENAI_POOL_SIZE keep that scan short. Quacks like the client where the
+    routes use it (`.chat`, `close()`).
+    """
+
+    def __init__(self, make, count):
+        self._make = make  # () -> AsyncOpenAI
+        self._clients = [None] * max(1, count)
+        self._turn = itertools.count()
+
+    @property
+    def chat(self):
+        i = next(self._turn) % len(self._clients)
+        if self._clients[i] is None:
+            self._clients[i] = self._make()
+        return self._clients[i].chat
+
+    async def close(self):
+        for shard in self._clients:
+            if shard is not None:
+                await shard.close()
+
+
+def _make_client(base_url=None, api_key=None):
+    """Sharded AsyncOpenAI clients (also used for routed backends)."""
+    # Imported on first use: openai takes longer to import than the rest of the app
+    import httpx
+
+    try:
+        from openai import AsyncOpenAI
+    except ImportError:
+        import openai  # type: ignore
+        AsyncOpenAI = getattr(openai, "AsyncOpenAI")
+
+    shards = math.ceil(MAX_CONNECTIONS / POOL_SIZE)
+    limits = httpx.Limits(
+        max_connections=min(POOL_SIZE, MAX_CONNECTIONS),
+        max_keepalive_connections=math.ceil(MAX_KEEPALIVE / shards),
+    )
+
+    def shard():
+        return AsyncOpenAI(
+            api_key=api_key or OPENAI_KEY or "none",
+            base_url=base_url,
+            http_client=httpx.AsyncClient(limits=limits, timeout=UPSTREAM_TIMEOUT),
+        )
+
+    return ClientShards(shard, shards)
+
+
+def get_client():
+    """The default AsyncOpenAI client (None without OPENAI_API_KEY)."""
+    global client
+    if client is None and OPENAI_KEY:
+        with _client_lock:
+            if client is None:
+                client = _make_client()
+    return client
+
+
+async def ensure_client():
+    """get_client() for coroutines: the first call (importing openai) runs in a thread."""
+    if client is None and OPENAI_KEY:
+        await asyncio.to_thread(get_client)
+    return client
+
+
+# The response cache only blocks (and leaves the event loop) on the SQLite backend
+_CACHE_BLOCKS = isinstance(response_cache.backend, SQLiteBackend)
+
+
+async def _cache(method, *args):
+    if _CACHE_BLOCKS:
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
+
+
+def jsonify(payload):
+    """JSON (orjson when installed) or MessagePack, as the request's Accept prefers."""
+    body, mimetype = encode_body(payload, request.headers.get("Accept"))
+    response = Response(body, mimetype=mimetype)
+    response.vary.add("Accept")
+    return response
+
+
+# Per-endpoint model routing (MODEL_ROUTES); backend clients are created on first use
+router = AsyncModelRouter(
+    router_config_from_env(), _make_client, get_client,
+    hedge_default=hedge_default_from_env(),
+)
+
+
+@app.before_serving
+async def _start_background():
+    start_background()
+
+
+@app.after_serving
+async def _close_client():
+    prewarmer.stop()
+    # Unfinished jobs are failed as interrupted when the next process starts
+    for task in list(_job_tasks.values()):
+        task.cancel()
+    for routed in router.clients():
+        await routed.close()
+    if client is not None:
+        await client.close()
+
+
+@app.before_request
+async def _start_request():
+    g.start = time.perf_counter()
+    g.upstream = metrics.UpstreamClock()
+    metrics.request_upstream.set(g.upstream)
+    g.in_flight_route = request.endpoint or "unknown"
+    metrics.requests_in_flight.inc(g.in_flight_route)
+
+
+@app.before_request
+async def _rate_limit_request():
+    if request.endpoint not in ADMITTED_ROUTES or not admission.enabled:
+        return None
+    try:
+        admission.check_rate(client_id(request.headers, request.remote_addr), request.endpoint)
+    except Rejected as e:
+        return _fail(e)
+    return None
+
+
+@app.after_request
+async def _record_request(response):
+    route = request.endpoint or "unknown"
+    elapsed = time.perf_counter() - g.start
+    metrics.requests_total.inc(route, request.method, str(response.status_code))
+    metrics.request_seconds.observe(elapsed, route)
+    if response.mimetype != SSE_MIMETYPE:
+        metrics.local_overhead_seconds.observe(max(0.0, elapsed - g.upstream.seconds), route)
+    return response
+
+
+@app.after_request
+async def _compress_response(response):
+    """gzip/brotli for buffered bodies of at least COMPRESS_MIN_BYTES."""
+    if not isinstance(response.response, DataBody) or not compressible(
+        response.mimetype, response.headers
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    body, coding = compress_body(
+        await response.get_data(), request.headers.get("Accept-Encoding")
+    )
+    if coding is not None:
+        response.set_data(body)
+        response.headers["Content-Encoding"] = coding
+    return response
+
+
+@app.teardown_request
+async def _end_request(exc=None):
+    # Streamed responses can tear down twice; only the first one counts
+    metrics.request_upstream.set(None)
+    route = g.pop("in_flight_route", None)
+    if route is not None:
+        metrics.requests_in_flight.dec(route)
+
+
+def _fail(error, status=500, kind=None, retry_after=None, **extra):
+    if kind is None and isinstance(error, Rejected):
+        status, kind, retry_after = error.status, error.reason, error.retry_after
+    elif kind is None and metrics.classify_error(error) == "upstream_rate_limit":
+        status, retry_after = 503, admission.retry_after()
+    metrics.record_error(request.endpoint, kind or error)
+    headers = {"Retry-After": str(retry_after)} if retry_after else {}
+    return jsonify({"success": False, "error": str(error), **extra}), status, headers
+
+
+@app.route("/health", methods=["GET"])
+async def health():
+    return jsonify({"status": "ok", "message": "GPT News API running"})
+
+
+@app.route("/metrics", methods=["GET"])
+async def prometheus_metrics():
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
+
+async def _upstream(backend, create_kwargs, timeout=None):
+    model = backend.model
+    extra = {"timeout": timeout} if timeout else {}
+    await ensure_client()
+    try:
+        with metrics.upstream_timer(model):
+            resp = await backend.client().chat.completions.create(**create_kwargs, **extra)
+    except Exception as e:
+        admission.upstream_failed(e)
+        raise
+    admission.upstream_succeeded()
+    metrics.record_usage(model, getattr(resp, "usage", None))
+    return resp
+
+
+async def _complete(endpoint, **create_kwargs):
+    async def call():
+        async with admission.slot(endpoint):
+            return await router.complete(
+                endpoint, create_kwargs["model"], create_kwargs, _upstream
+            )
+
+    with metrics.upstream_wait():
+        return await single_flight.do(request_key(endpoint=endpoint, **create_kwargs), call)
+
+
+async def _stream_deltas(endpoint, create_kwargs):
+    backend = router.pick(endpoint, create_kwargs["model"])
+    model = backend.model
+    await ensure_client()
+    async with admission.slot(endpoint):
+        start = time.monotonic()
+        try:
+            with metrics.upstream_timer(model):
+                stream = await backend.client().chat.completions.create(
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **{**create_kwargs, "model": model},
+                )
+                async for chunk in stream:
+                    metrics.record_usage(model, getattr(chunk, "usage", None))
+                    yield chunk_text(chunk)
+        except Exception as e:
+            admission.upstream_failed(e)
+            backend.record(time.monotonic() - start, e)
+            raise
+        admission.upstream_succeeded()
+        backend.record(time.monotonic() - start)
+
+
+def _stream_completion(endpoint, create_kwargs, build_payload):
+    route = request.endpoint
+
+    async def generate():
+        parts = []
+        try:
+            async for delta in _stream_deltas(endpoint, create_kwargs):
+                if delta:
+                    parts.append(delta)
+                    yield sse_event("token", {"delta": delta})
+            yield sse_event("done", build_payload("".join(parts).strip()))
+        except Exception as e:
+            metrics.record_error(route, e)
+            yield sse_event("error", {"success": False, "error": str(e)})
+
+    return Response(generate(), mimetype=SSE_MIMETYPE, headers=SSE_HEADERS)
+
+
+async def _fetch_news(country, category, limit, today):
+    resp = await _complete("news", **generation.news_kwargs(country, category, limit, today))
+
+    payload = generation.news_result(completion_text(resp), limit)
+    payload["articles"] = await asyncio.to_thread(
+        article_store.add_many, payload["articles"], country, category
+    )
+    return payload
+
+
+async def _news_events(payload):
+    for i, article in enumerate(payload["articles"]):
+        yield sse_event("article", {"index": i, "article": article})
+    yield sse_event("done", payload)
+
+
+def _stream_news(key, country, category, limit, today):
+    route = request.endpoint
+
+    async def generate():
+        parser = ArticleStreamParser()
+        parts, articles = [], []
+        try:
+            create_kwargs = generation.news_kwargs(country, category, limit, today)
+            async for delta in _stream_deltas("news", create_kwargs):
+                parts.append(delta)
+                for article in parser.feed(delta)[: limit - len(articles)]:
+                    stored = await asyncio.to_thread(
+                        article_store.add_many, [article], country, category
+                    )
+                    article = stored[0]
+                    yield sse_event("article", {"index": len(articles), "article": article})
+                    articles.append(article)
+
+            payload = generation.news_result("".join(parts), limit)
+            payload["articles"] = articles
+            await _cache(response_cache.set, key, payload)
+            yield sse_event("done", payload)
+        except Exception as e:
+            metrics.record_error(route, e)
+            yield sse_event("error", {"success": False, "error": str(e)})
+
+    return Response(
+        generate(), mimetype=SSE_MIMETYPE, headers={**SSE_HEADERS, "X-Cache": MISS}
+    )
+
+
+async def _refresh_news(key, country, category, limit, today):
+    try:
+        payload = await _fetch_news(country, category, limit, today)
+    except Exception as e:
+        await _cache(response_cache.end_refresh, key, None, e)
+    else:
+        await _cache(response_cache.end_refresh, key, payload)
+
+
+# Background pre-warming (PREWARM=1): the scheduler runs in its own thread and
+# hands each fetch to the serving event loop
+_serving_loop = None
+
+
+def _prewarm_fetch(country, category, limit, today):
+    coro = _fetch_news(country, category, limit, today)
+    return asyncio.run_coroutine_threadsafe(coro, _serving_loop).result()
+
+
+prewarmer = prewarmer_from_env(response_cache, _prewarm_fetch)
+
+
+def start_background():
+    """
+    Per-process background work, run when the server starts serving (never on
+    import): fail jobs orphaned by dead workers and start the pre-warm
+    scheduler on this event loop.
+    """
+    global _serving_loop
+    job_store.recover_orphans()
+    if OPENAI_KEY and prewarm_enabled() and claim_scheduler(response_cache):
+        _serving_loop = asyncio.get_running_loop()
+        prewarmer.start()
+
+
+def _cached_json(payload, cache_state, age=0.0):
+    resp = jsonify(payload)
+    resp.headers["X-Cache"] = cache_state
+    resp.headers["Age"] = str(int(age))
+    return resp
+
+
+@app.route("/generate_news", methods=["GET"])
+async def generate_news():
+    try:
+        if await ensure_client() is None:
+            return _fail("OpenAI API key missing", 400, kind="missing_api_key")
+
+        country, category, limit, today = generation.news_params(request.args)
+
+        prewarmer.record(country, category)
+        key = news_cache_key(country, category, limit, today)
+        cached, state, age = await _cache(response_cache.get, key)
+        if state == STALE and response_cache.begin_refresh(key):
+            asyncio.create_task(_refresh_news(key, country, category, limit, today))
+        stream = wants_stream(None, request.args)
+        if state != MISS and stream:
+            return Response(
+                _news_events(cached), mimetype=SSE_MIMETYPE,
+                headers={**SSE_HEADERS, "X-Cache": state, "Age": str(int(age))},
+            )
+        if state != MISS:
+            return _cached_json(cached, state, age)
+        if stream:
+            return _stream_news(key, country, category, limit, today)
+
+        try:
+            payload = await _fetch_news(country, category, limit, today)
+        except InvalidGPTJSON as e:
+            return _fail(e, 502, raw=e.raw)
+
+        await _cache(response_cache.set, key, payload)
+        return _cached_json(payload, MISS)
+
+    except Exception as e:
+        return _fail(e)
+
+
+@app.route("/cache/stats", methods=["GET"])
+async def cache_stats():
+    return jsonify(
+        {
+            "success": True,
+            "cache": response_cache.stats(),
+            "singleflight": single_flight.stats(),
+            "semantic": semantic_cache.stats(),
+            "prewarm": prewarmer.stats(),
+            "admission": admission.stats(),
+            "routing": router.stats(),
+            "mapreduce": map_reducer.stats(),
+            "jobs": {**job_store.stats(), "pending": len(_job_tasks)},
+        }
+    )
+
+
+@app.route("/articles", methods=["GET"])
+async def list_articles():
+    try:
+        limit = int(request.args.get("limit", 20))
+    except ValueError:
+        return _fail("limit must be an integer", 400, kind="bad_request")
+    articles = await asyncio.to_thread(
+        article_store.recent, request.args.get("country"), request.args.get("category"), limit
+    )
+    return jsonify({"success": True, "articles": articles, "count": len(articles)})
+
+
+@app.route("/articles/<int:article_id>", methods=["GET"])
+async def get_article(article_id):
+    try:
+        article = await asyncio.to_thread(article_store.get, article_id)
+        return jsonify({"success": True, "article": article})
+    except UnknownArticle as e:
+        return _fail(e, 404)
+
+
+async def _generate_social_post(data):
+    article = await asyncio.to_thread(article_store.article_from_request, data)
+    data = {**data, "article": article}
+
+    use_semantic = semantic_cache_requested(data)
+    if use_semantic:
+        text, scope = article_text(article), social_scope(data)
+        cached, source_url, score = semantic_cache.lookup(text, scope)
+        if cached is not None:
+            return reuse_post(cached, source_url, article, score)
+
+    platform, create_kwargs = generation.social_kwargs(data)
+    resp = await _complete("social", **create_kwargs)
+
+    payload = generation.social_payload(completion_text(resp), platform)
+    if use_semantic:
+        semantic_cache.store(text, scope, payload, article.get("url", ""))
+        payload = {**payload, "cache_similarity": None}
+    return payload
+
+
+@app.route("/create_social_content", methods=["POST"])
+async def create_social_content():
+    try:
+        if await ensure_client() is None:
+            return _fail("OpenAI API key missing", 400, kind="missing_api_key")
+
+        data = await request.get_json(silent=True) or {}
+        if wants_stream(data, request.args):
+            data["article"] = await asyncio.to_thread(article_store.article_from_request, data)
+            platform, create_kwargs = generation.social_kwargs(data)
+            return _stream_completion(
+                "social", create_kwargs,
+                lambda content: generation.social_payload(content, platform),
+            )
+
+        return jsonify(await _generate_social_post(data))
+
+    except UnknownArticle as e:
+        return _fail(e, 404)
+    except Exception as e:
+        return _fail(e)
+
+
+@app.route("/create_social_content/batch", methods=["POST"])
+async def create_social_content_batch():
+    try:
+        if await ensure_client() is None:
+            return _fail("OpenAI API key missing", 400, kind="missing_api_key")
+
+        items = generation.batch_items(await request.get_json(silent=True) or {})
+        items = await asyncio.to_thread(generation.resolve_batch_articles, article_store, items)
+
+        gate = asyncio.Semaphore(BATCH_MAX_WORKERS)
+
+        async def _run(i, item):
+            try:
+                async with gate:
+                    return generation.batch_result(i, item, await _generate_social_post(item))
+            except Exception as e:
+                return generation.batch_result(i, item, error=e)
+
+        results = await asyncio.gather(*(_run(i, item) for i, item in enumerate(items)))
+        return jsonify(generation.batch_payload(list(results)))
+
+    except InvalidRequest as e:
+        return _fail(e, 400, kind="bad_request")
+    except Exception as e:
+        return _fail(e)
+
+
+# ---------- Map/reduce digests for large article sets ----------
+async def _digest_completion(messages):
+    return completion_text(await _complete("digest", **generation.digest_kwargs(messages)))
+
+
+# Map width follows the upstream concurrency limit admission adapts (AIMD)
+map_reducer = mapreduce_from_env(AsyncMapReducer, _digest_completion, limit=lambda: admission.limit)
+
+
+async def _series_kwargs(data):
+    """(platform, theme, create kwargs); many articles are digested by map/reduce first."""
+    articles = await asyncio.to_thread(article_store.articles_from_request, data)
+    digest = None
+    if map_reduce_requested(data, articles, SERIES_MAX_ARTICLES):
+        digest = await map_reducer.digest(articles, "series")
+    return generation.series_kwargs(data, articles, digest)
+
+
+async def _generate_series(data):
+    platform, theme, create_kwargs = await _series_kwargs(data)
+    resp = await _complete("series", **create_kwargs)
+    return generation.series_payload(completion_text(resp), platform, theme)
+
+
+@app.route("/create_content_series", methods=["POST"])
+async def create_content_series():
+    try:
+        if await ensure_client() is None:
+            return _fail("OpenAI API key missing", 400, kind="missing_api_key")
+
+        data = await request.get_json(silent=True) or {}
+        if wants_stream(data, request.args):
+            platform, theme, create_kwargs = await _series_kwargs(data)
+            return _stream_completion(
+                "series", create_kwargs,
+                lambda content: generation.series_payload(content, platform, theme),
+            )
+
+        return jsonify(await _generate_series(data))
+
+    except UnknownArticle as e:
+        return _fail(e, 404)
+    except InvalidRequest as e:
+        return _fail(e, 400, kind="bad_request")
+    except Exception as e:
+        return _fail(e)
+
+
+def _local_analysis(data):
+    articles = article_store.articles_from_request(data)
+    return articles, generation.local_analysis(articles)
+
+
+async def _analysis_kwargs(data):
+    articles, analytics = await asyncio.to_thread(_local_analysis, data)
+    digest = None
+    if map_reduce_requested(data, articles, ANALYSIS_MAX_ARTICLES):
+        digest = await map_reducer.digest(articles, "analysis")
+    return analytics, generation.analysis_kwargs(articles, analytics, digest)
+
+
+async def _generate_analysis(data):
+    if not narrative_requested(data):
+        _, analytics = await asyncio.to_thread(_local_analysis, data)
+        return generation.local_analysis_payload(analytics)
+
+    analytics, create_kwargs = await _analysis_kwargs(data)
+    resp = await _complete("analysis", **create_kwargs)
+    return generation.analysis_payload(completion_text(resp), analytics)
+
+
+@app.route("/analyze_news", methods=["POST"])
+async def analyze_news():
+    try:
+        data = await request.get_json(silent=True) or {}
+        if not narrative_requested(data):
+            # Local only: no upstream call, so no API key needed
+            payload = await _generate_analysis(data)
+            if wants_stream(data, request.args):
+                return Response(
+                    sse_complete(payload, "analysis"), mimetype=SSE_MIMETYPE, headers=SSE_HEADERS
+                )
+            return jsonify(payload)
+
+        if await ensure_client() is None:
+            return _fail("OpenAI API key missing", 400, kind="missing_api_key")
+
+        if wants_stream(data, request.args):
+            analytics, create_kwargs = await _analysis_kwargs(data)
+            return _stream_completion(
+                "analysis", create_kwargs,
+                lambda content: generation.analysis_payload(content, analytics),
+            )
+
+        return jsonify(await _generate_analysis(data))
+
+    except UnknownArticle as e:
+        return _fail(e, 404)
+    except Exception as e:
+        return _fail(e)
+
+
+# ---------- Background jobs ----------
+JOB_HANDLERS = {
+    "social": _generate_social_post,
+    "series": _generate_series,
+    "analysis": _generate_analysis,
+}
+
+
+async def _run_job(job_id, job_type, data):
+    try:
+        async with job_slots:
+            if not await asyncio.to_thread(job_store.start, job_id):
+                metrics.jobs_total.inc(job_type, CANCELLED)  # cancelled while queued
+                return
+            start = time.perf_counter()
+            try:
+                result = await JOB_HANDLERS[job_type](data)
+            except Exception as e:
+                metrics.record_error("run_job", e)
+                failed = await asyncio.to_thread(
+                    job_store.fail, job_id, e, metrics.classify_error(e)
+                )
+                status = FAILED if failed else CANCELLED
+            else:
+                finished = await asyncio.to_thread(job_store.finish, job_id, result)
+                status = SUCCEEDED if finished else CANCELLED
+            metrics.jobs_total.inc(job_type, status)
+            metrics.job_seconds.observe(time.perf_counter() - start, job_type)
+    except asyncio.CancelledError:
+        metrics.jobs_total.inc(job_type, CANCELLED)
+        raise
+    finally:
+        _job_tasks.pop(job_id, None)
+        metrics.jobs_pending.set(len(_job_tasks))
+
+
+@app.route("/jobs", methods=["POST"])
+async def submit_job():
+    try:
+        job_type, data = job_request(await request.get_json(silent=True) or {})
+        if generation.job_needs_upstream(job_type, data) and await ensure_client() is None:
+            return _fail("OpenAI API key missing", 400, kind="missing_api_key")
+        await asyncio.to_thread(generation.check_job, article_store, job_type, data)
+        if len(_job_tasks) >= JOB_MAX_PENDING:
+            return _fail(
+                "Job queue full, try again later", 503, kind="queue_full",
+                retry_after=admission.retry_after(),
+            )
+
+        job = await asyncio.to_thread(job_store.create, job_type, data)
+        _job_tasks[job["id"]] = asyncio.ensure_future(_run_job(job["id"], job_type, data))
+        metrics.jobs_pending.set(len(_job_tasks))
+        return jsonify({"success": True, "job": job}), 202, {"Location": f"/jobs/{job['id']}"}
+
+    except UnknownArticle as e:
+        return _fail(e, 404)
+    except InvalidRequest as e:
+        return _fail(e, 400, kind="bad_request")
+    except Exception as e:
+        return _fail(e)
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+async def get_job(job_id):
+    try:
+        job = await asyncio.to_thread(job_store.get, job_id)
+        return jsonify({"success": True, "job": job})
+    except UnknownJob as e:
+        return _fail(e, 404)
+
+
+@app.route("/jobs/<job_id>", methods=["DELETE"])
+async def cancel_job(job_id):
+    """
+    Cancel a queued or running job. A running job's task is cancelled; its
+    upstream call is aborted unless an identical request is still waiting on it.
+    """
+    try:
+        cancelled, job = await asyncio.to_thread(job_store.cancel, job_id)
+    except UnknownJob as e:
+        return _fail(e, 404)
+    if not cancelled:
+        return _fail(f"Job already {job['status']}", 409, kind="conflict", job=job)
+    task = _job_tasks.get(job_id)
+    if task is not None:
+        task.cancel()
+    return jsonify({"success": True, "job": job})
+
+
+def run(port):
+    """Serve this app with uvicorn on 127.0.0.1:`port`."""
+    import uvicorn
+
+    uvicorn.run(
+        app,
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+        backlog=int(os.getenv("API_BACKLOG", "4096")),
+    )
+
+
+if __name__ == "__main__":
+    run(int(os.getenv("NEWS_API_PORT", "5001")))
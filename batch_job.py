@@ -0,0 +1,323 @@
+# ================================
+# Offline batch job (batch_job.py)
+# ================================
+"""
+Turn a JSONL or CSV file of articles into social posts without going through
+HTTP, using the same generation path as /create_social_content.
+
+    python batch_job.py articles.jsonl posts.jsonl --platforms twitter,linkedin
+    python batch_job.py articles.csv posts.jsonl --concurrency 16 --rpm 500
+
+Input is read one row at a time. A JSONL row is either an article
+({"title", "description", "url", ...}) or a request body
+({"article": {...}, "platform": ..., "tone": ...} or {"article_id": 12}); a CSV
+row has article columns plus optional platform/tone/custom_angle columns.
+Every row is expanded like a /create_social_content/batch body, so rows
+without a platform fan out to --platforms.
+
+Results are appended to the output JSONL as they finish, one line per post.
+The output doubles as the checkpoint: on restart, items already written with
+"success": true are skipped, so a crashed run resumes where it stopped
+(failed items are retried; rows that cannot be read are recorded once). Upstream 429s pause every worker for the
+Retry-After period and are retried with backoff; --rpm caps the request rate.
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from metrics import classify_error
+from prompts import InvalidRequest, expand_batch_items
+
+ARTICLE_FIELDS = ("title", "description", "url", "source", "published_at")
+OPTION_FIELDS = (
+    "platform", "tone", "include_hashtags", "include_link", "custom_angle", "semantic_cache",
+)
+
+
+# ---------- Input ----------
+def _csv_value(value):
+    lowered = (value or "").strip().lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    return value
+
+
+def _row_body(row):
+    """Normalize one input row into a single-article request body."""
+    if "article" in row or "article_id" in row:
+        return row
+    body = {k: row[k] for k in OPTION_FIELDS if row.get(k) not in (None, "")}
+    body["article"] = {k: row[k] for k in ARTICLE_FIELDS if row.get(k) not in (None, "")}
+    return body
+
+
+def read_rows(path, on_bad_row=None):
+    """
+    Yield (line_number, request_body) from a JSONL or CSV file, streaming.
+    A JSONL line that is not a JSON object is skipped and reported to
+    on_bad_row(line_number, error) instead of aborting the run.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            for line_no, row in enumerate(csv.DictReader(f), start=1):
+                yield line_no, _row_body({k: _csv_value(v) for k, v in row.items()})
+        else:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    if on_bad_row is not None:
+                        on_bad_row(line_no, f"invalid JSON: {e}")
+                    continue
+                if not isinstance(row, dict):
+                    if on_bad_row is not None:
+                        on_bad_row(line_no, "row is not a JSON object")
+                    continue
+                yield line_no, _row_body(row)
+
+
+def iter_items(path, defaults, on_bad_row=None):
+    """Yield (item_id, request_body) for every post to generate."""
+    for line_no, body in read_rows(path, on_bad_row):
+        body = {**defaults, **body}
+        if "platform" in body:
+            body.pop("targets", None)
+        try:
+            items = expand_batch_items(body)
+        except InvalidRequest as e:
+            if on_bad_row is not None:
+                on_bad_row(line_no, str(e))
+            continue
+        for target_no, item in enumerate(items):
+            yield f"{line_no}:{target_no}:{item.get('platform', 'twitter')}", item
+
+
+def count_items(path, defaults):
+    """Posts the input expands to (a row with its own platform is one post)."""
+    return sum(1 for _ in iter_items(path, defaults))
+
+
+# ---------- Checkpoint / output ----------
+def load_done(output_path):
+    """
+    Ids not to redo: posts written successfully and input rows already
+    recorded as unreadable. Drops a half-written last line.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[: data.rfind(b"\n") + 1]
+    for line in data.splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if record.get("success") or record.get("kind") == "invalid_row":
+            done.add(record.get("id"))
+    return done
+
+
+class JSONLWriter:
+    def __init__(self, path):
+        self._f = open(path, "a", encoding="utf-8")
+
+    def write(self, record):
+        self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+
+# ---------- Rate limiting ----------
+class RateLimiter:
+    """Spaces request starts to `rpm` per minute and pauses everyone on a 429."""
+
+    def __init__(self, rpm=0):
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+        self._paused_until = 0.0
+        self.rate_limited = 0
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next, self._paused_until)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def pause(self, seconds):
+        with self._lock:
+            self.rate_limited += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def _retry_after(error, attempt):
+    response = getattr(error, "response", None)
+    header = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+    try:
+        return float(header)
+    except (TypeError, ValueError):
+        return min(60.0, 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def generate(generate_post, item, limiter, retries):
+    """One post, retrying rate limits, timeouts and connection errors."""
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        try:
+            return generate_post(item)
+        except Exception as e:
+            kind = classify_error(e)
+            if attempt == retries or kind not in (
+                "upstream_rate_limit", "upstream_timeout", "upstream_connection"
+            ):
+                raise
+            delay = _retry_after(e, attempt)
+            if kind == "upstream_rate_limit":
+                limiter.pause(delay)
+            else:
+                time.sleep(delay)
+
+
+# ---------- Progress ----------
+def _format_eta(seconds):
+    if seconds is None:
+        return "?"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def report(started, completed, failed, skipped, total, limiter):
+    elapsed = time.monotonic() - started
+    rate = completed / elapsed if elapsed > 0 else 0.0
+    remaining = total - skipped - completed if total is not None else None
+    eta = remaining / rate if rate > 0 and remaining is not None else None
+    of = f"/{total - skipped}" if total is not None else ""
+    print(
+        f"[batch] {completed}{of} done ({failed} failed, {skipped} resumed) "
+        f"{rate:.2f} posts/s, ETA {_format_eta(eta)}, 429s {limiter.rate_limited}",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+# ---------- Main ----------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("input", help="articles as .jsonl or .csv")
+    parser.add_argument("output", help="posts are appended here as JSONL")
+    parser.add_argument("--platforms", default="twitter",
+                        help="comma-separated platforms for rows without one ('all' for every one)")
+    parser.add_argument("--tone", default="informative")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("BATCH_MAX_WORKERS", "8")))
+    parser.add_argument("--rpm", type=float, default=0, help="max upstream requests per minute")
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--progress-interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    # Import here so --help works without an API key or the API's dependencies
+    import flask_api
+
+    if flask_api.get_client() is None:
+        print("OPENAI_API_KEY is not set.", file=sys.stderr)
+        return 2
+    # This job owns retries (with a shared 429 pause) instead of the SDK, for the
+    # default client and for every client the router creates for other backends
+    flask_api.client = flask_api.get_client().with_options(max_retries=0)
+    make_client = flask_api.router.client_factory
+    flask_api.router.client_factory = (
+        lambda base_url, api_key: make_client(base_url, api_key).with_options(max_retries=0)
+    )
+    # --concurrency and --rpm pace the upstream here, not the server's admission slots
+    flask_api.admission.enabled = False
+
+    defaults = {"tone": args.tone}
+    if args.platforms.lower() != "all":
+        platforms = [p.strip() for p in args.platforms.split(",") if p.strip()]
+        defaults["targets"] = [{"platform": p} for p in platforms]
+
+    total = count_items(args.input, defaults)
+    done = load_done(args.output)
+    writer = JSONLWriter(args.output)
+    limiter = RateLimiter(args.rpm)
+
+    started = last_report = time.monotonic()
+    completed = failed = skipped = 0
+    pending = {}
+
+    def bad_row(line_no, error):
+        nonlocal failed
+        # Recorded by an earlier run: the row is no more readable now
+        if str(line_no) in done:
+            return
+        print(f"[batch] line {line_no} skipped: {error}", file=sys.stderr, flush=True)
+        writer.write({"id": str(line_no), "success": False, "error": error,
+                      "kind": "invalid_row"})
+        failed += 1
+
+    def collect(futures):
+        nonlocal completed, failed, last_report
+        for future in futures:
+            item_id, item = pending.pop(future)
+            record = {
+                "id": item_id,
+                "platform": item.get("platform", "twitter"),
+                "tone": item.get("tone", "informative"),
+                "title": (item.get("article") or {}).get("title", ""),
+                "url": (item.get("article") or {}).get("url", ""),
+            }
+            try:
+                record.update(future.result())
+            except Exception as e:
+                record.update({"success": False, "error": str(e), "kind": classify_error(e)})
+                failed += 1
+            writer.write(record)
+            completed += 1
+        if time.monotonic() - last_report >= args.progress_interval:
+            report(started, completed, failed, skipped, total, limiter)
+            last_report = time.monotonic()
+
+    try:
+        with ThreadPoolExecutor(args.concurrency, thread_name_prefix="batch-job") as pool:
+            for item_id, item in iter_items(args.input, defaults, bad_row):
+                if item_id in done:
+                    skipped += 1
+                    continue
+                # Keep only a bounded window of items in memory
+                while len(pending) >= args.concurrency * 2:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                future = pool.submit(
+                    generate, flask_api._generate_social_post, item, limiter, args.retries
+                )
+                pending[future] = (item_id, item)
+
+            while pending:
+                finished, _ = wait(pending, timeout=args.progress_interval,
+                                   return_when=FIRST_COMPLETED)
+                collect(finished)
+    finally:
+        writer.close()
+
+    report(started, completed, failed, skipped, total, limiter)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
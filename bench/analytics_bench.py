@@ -0,0 +1,83 @@
+# ================================
+# Local analytics benchmark (bench/analytics_bench.py)
+# ================================
+"""
+Throughput of the local /analyze_news engine (analytics.py).
+
+Scores batches of synthetic articles (sentiment, TF-IDF themes, hashtags)
+and reports the median time per batch and articles per second:
+
+    python bench/analytics_bench.py
+    python bench/analytics_bench.py --sizes 10,1000,20000 --repeats 5 --llm-seconds 6
+
+With --llm-seconds (the observed latency of one GPT analysis call), the
+report also shows how that compares to the local analysis of each batch.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from analytics import NEGATIVE_WORDS, POSITIVE_WORDS, STOPWORDS, analyze_articles  # noqa: E402
+
+TOPIC_WORDS = (
+    "markets stocks bank rates election budget climate energy vaccine hospital chip startup "
+    "league final court policy trade tariffs oil housing jobs wages students satellite rocket "
+    "museum festival film album drought harvest airline railway port ceasefire summit"
+).split()
+
+
+def synthetic_articles(n, rng):
+    positive, negative, stop = sorted(POSITIVE_WORDS), sorted(NEGATIVE_WORDS), sorted(STOPWORDS)
+
+    def sentence(length):
+        words = []
+        for _ in range(length):
+            roll = rng.random()
+            pool = positive if roll < 0.1 else negative if roll < 0.2 else (
+                stop if roll < 0.55 else TOPIC_WORDS)
+            words.append(rng.choice(pool))
+        return " ".join(words).capitalize()
+
+    return [
+        {"id": i, "title": sentence(8), "description": f"{sentence(14)}. {sentence(12)}."}
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="10,100,1000,5000")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--llm-seconds", type=float, default=0.0,
+                        help="latency of one GPT analysis call, for comparison")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    header = f"{'articles':>8}  {'ms/batch':>10}  {'articles/s':>11}"
+    if args.llm_seconds:
+        header += f"  {'vs 1 LLM call':>14}"
+    print(header)
+    for size in [int(s) for s in args.sizes.split(",")]:
+        articles = synthetic_articles(size, rng)
+        analyze_articles(articles)  # warm-up
+        samples = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            analyze_articles(articles)
+            samples.append(time.perf_counter() - start)
+        seconds = statistics.median(samples)
+        line = f"{size:>8}  {seconds * 1000:>10.2f}  {size / seconds:>11.0f}"
+        if args.llm_seconds:
+            line += f"  {args.llm_seconds / seconds:>13.0f}x"
+        print(line, flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# ================================
+# Fake OpenAI server (bench/fake_openai.py)
+# ================================
+"""
+Local stand-in for the OpenAI chat-completions API, for offline benchmarks.
+
+Implements POST /v1/chat/completions (plain and stream=true) on asyncio with
+only the standard library, so thousands of slow concurrent requests cost a
+coroutine each. Latency, token rate and error injection are configurable:
+
+    python bench/fake_openai.py --port 5900 --latency-ms 800 --jitter-ms 200 \
+        --tokens-per-sec 300 --error-rate 0.01 --rate-limit-rate 0.01
+
+Point the API at it with OPENAI_BASE_URL=http://127.0.0.1:5900/v1 and any
+OPENAI_API_KEY.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from datetime import datetime
+
+WORDS = (
+    "markets rally policy energy launch growth climate chip league vaccine startup "
+    "election storm record deal court rates study tour trial robot budget talks"
+).split()
+
+
+class FakeOpenAI:
+    def __init__(
+        self,
+        latency_ms=500,
+        jitter_ms=100,
+        tokens_per_sec=0.0,
+        completion_tokens=120,
+        error_rate=0.0,
+        rate_limit_rate=0.0,
+        seed=None,
+    ):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.tokens_per_sec = tokens_per_sec
+        self.completion_tokens = completion_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    # ---------- content ----------
+    def _text(self, n_words):
+        return " ".join(self.rng.choice(WORDS) for _ in range(n_words))
+
+    def _news_json(self, messages, wrapped=False):
+        user = messages[-1].get("content", "") if messages else ""
+        match = re.search(r"Number of items:\s*(\d+)", user)
+        count = int(match.group(1)) if match else 5
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+        articles = [
+            {
+                "title": self._text(8).capitalize(),
+                "description": self._text(25).capitalize() + ".",
+                "source": "Fake Wire",
+                "published_at": today,
+                "url": f"https://example.com/news/{uuid.uuid4().hex[:12]}",
+            }
+            for _ in range(count)
+        ]
+        # Structured-output requests get the schema's {"articles": [...]} shape
+        return json.dumps({"articles": articles} if wrapped else articles)
+
+    def completion_text(self, body):
+        messages = body.get("messages") or []
+        system = messages[0].get("content", "") if messages else ""
+        if "Return ONLY valid JSON" in system:
+            response_format = body.get("response_format") or {}
+            return self._news_json(messages, response_format.get("type") == "json_schema")
+        limit = int(body.get("max_tokens") or self.completion_tokens)
+        return self._text(min(self.completion_tokens, limit)) + " #news #fake"
+
+    # ---------- HTTP ----------
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = b""
+                if "content-length" in headers:
+                    body = await reader.readexactly(int(headers["content-length"]))
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self.route(method, path, body, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _send(self, writer, status, payload, extra_headers=()):
+        data = json.dumps(payload).encode("utf-8")
+        head = [
+            f"HTTP/1.1 {status}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(data)}",
+            *extra_headers,
+        ]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+
+    async def route(self, method, path, body, writer):
+        if method == "GET" and path.rstrip("/") in ("/health", "/v1/models"):
+            self._send(writer, "200 OK", {"status": "ok", "requests": self.requests})
+            return
+        if method != "POST" or not path.rstrip("/").endswith("/chat/completions"):
+            self._send(writer, "404 Not Found", {"error": {"message": "not found"}})
+            return
+
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            request = json.loads(body or b"{}")
+            await asyncio.sleep(max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)))
+
+            roll = self.rng.random()
+            if roll < self.rate_limit_rate:
+                self._send(
+                    writer,
+                    "429 Too Many Requests",
+                    {"error": {"message": "Rate limit reached", "type": "requests"}},
+                    ("Retry-After: 1",),
+                )
+                return
+            if roll < self.rate_limit_rate + self.error_rate:
+                self._send(
+                    writer,
+                    "500 Internal Server Error",
+                    {"error": {"message": "Injected upstream error", "type": "server_error"}},
+                )
+                return
+
+            text = self.completion_text(request)
+            if request.get("stream"):
+                await self._stream(writer, request, text)
+            else:
+                await self._complete(writer, request, text)
+        finally:
+            self.in_flight -= 1
+
+    def _usage(self, request, text):
+        prompt_chars = sum(len(m.get("content") or "") for m in request.get("messages") or [])
+        completion = max(1, len(text) // 4)
+        prompt = max(1, prompt_chars // 4)
+        return {
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "total_tokens": prompt + completion,
+        }
+
+    async def _complete(self, writer, request, text):
+        usage = self._usage(request, text)
+        if self.tokens_per_sec:
+            await asyncio.sleep(usage["completion_tokens"] / self.tokens_per_sec)
+        self._send(
+            writer,
+            "200 OK",
+            {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": text},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage,
+            },
+        )
+
+    async def _stream(self, writer, request, text):
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        def send(data):
+            frame = f"data: {data}\n\n".encode("utf-8")
+            writer.write(f"{len(frame):x}\r\n".encode("latin-1") + frame + b"\r\n")
+
+        pieces = re.findall(r"\S+\s*", text)
+        delay = (1.0 / self.tokens_per_sec) if self.tokens_per_sec else 0.0
+        for i, piece in enumerate(pieces):
+            send(
+                json.dumps(
+                    {
+                        "id": chunk_id,
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": request.get("model", "fake"),
+                        "choices": [
+                            {
+                                "index": 0,
+                                "delta": {"content": piece},
+                                "finish_reason": "stop" if i == len(pieces) - 1 else None,
+                            }
+                        ],
+                    }
+                )
+            )
+            await writer.drain()
+            if delay:
+                await asyncio.sleep(delay)
+        send("[DONE]")
+        writer.write(b"0\r\n\r\n")
+
+
+async def serve(fake, host="127.0.0.1", port=5900, ready=None):
+    server = await asyncio.start_server(fake.handle, host, port, backlog=4096)
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5900)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0,
+                        help="completion token rate; 0 = instant body after latency")
+    parser.add_argument("--completion-tokens", type=int, default=120)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 500s")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of 429s")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    fake = FakeOpenAI(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tokens_per_sec=args.tokens_per_sec,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    )
+    print(f"Fake OpenAI listening on http://{args.host}:{args.port}/v1", flush=True)
+    try:
+        asyncio.run(serve(fake, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,491 @@
+# ================================
+# Load test / benchmark (bench/loadtest.py)
+# ================================
+"""
+Offline throughput and tail-latency benchmark for the API.
+
+Starts bench/fake_openai.py and the API (flask_api.py, in sync or async mode)
+pointed at it, drives the endpoints with N concurrent keep-alive clients, and
+reports p50/p95/p99 latency, RPS, error rate and API process RSS.
+
+    python bench/loadtest.py --mode sync --concurrency 50 --duration 20
+    python bench/loadtest.py --mode async --concurrency 2000 --endpoints analyze_news \
+        --latency-ms 3000 --save-baseline async-2k
+    python bench/loadtest.py --mode async --compare async-2k
+
+Baselines are stored in bench/baselines/<name>.json; --compare prints the
+deltas against one and exits non-zero when a metric regresses by more than
+--threshold. Needs only the standard library plus the API's own requirements.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_DIR = os.path.join(BENCH_DIR, "baselines")
+
+COUNTRIES = ["us", "in", "uk", "ca", "au", "fr", "de", "jp"]
+CATEGORIES = ["general", "technology", "business", "health", "science", "sports", "entertainment"]
+PLATFORMS = ["twitter", "linkedin", "instagram", "facebook", "tiktok"]
+
+DEFAULT_ENDPOINTS = (
+    "health,generate_news,create_social_content,create_social_content_batch,"
+    "create_content_series,analyze_news"
+)
+
+
+# ---------- Request scenarios ----------
+def _article(n):
+    return {
+        "title": f"Benchmark headline {n}",
+        "description": f"Synthetic description number {n} for load testing the API.",
+        "source": "Bench",
+        "published_at": time.strftime("%Y-%m-%d"),
+        "url": f"https://example.com/{n}",
+    }
+
+
+def build_request(endpoint, n, rng):
+    """Return (method, path, body) for one request; n varies the payload."""
+    if endpoint == "health":
+        return "GET", "/health", None
+    if endpoint == "generate_news":
+        query = f"country={rng.choice(COUNTRIES)}&category={rng.choice(CATEGORIES)}&limit=5"
+        return "GET", f"/generate_news?{query}", None
+    if endpoint == "create_social_content":
+        return "POST", "/create_social_content", {
+            "article": _article(n), "platform": rng.choice(PLATFORMS), "tone": "informative"
+        }
+    if endpoint == "create_social_content_stream":
+        return "POST", "/create_social_content", {
+            "article": _article(n), "platform": rng.choice(PLATFORMS), "stream": True
+        }
+    if endpoint == "create_social_content_batch":
+        return "POST", "/create_social_content/batch", {"article": _article(n)}
+    if endpoint == "create_content_series":
+        return "POST", "/create_content_series", {
+            "articles": [_article(f"{n}-{i}") for i in range(3)], "platform": "twitter"
+        }
+    # The analysis scenarios ask for the GPT narrative, so they reach the upstream
+    if endpoint == "analyze_news":
+        return "POST", "/analyze_news", {
+            "articles": [_article(f"{n}-{i}") for i in range(5)], "narrative": True
+        }
+    if endpoint == "analyze_news_stream":
+        return "POST", "/analyze_news", {
+            "articles": [_article(f"{n}-{i}") for i in range(5)], "narrative": True, "stream": True
+        }
+    if endpoint == "analyze_news_local":
+        return "POST", "/analyze_news", {"articles": [_article(f"{n}-{i}") for i in range(5)]}
+    raise ValueError(f"Unknown endpoint: {endpoint}")
+
+
+# ---------- Minimal keep-alive HTTP/1.1 client ----------
+class Connection:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        head = f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+        if body is not None:
+            head += "Content-Type: application/json\r\n"
+        head += f"Content-Length: {len(data)}\r\n\r\n"
+        self.writer.write(head.encode("latin-1") + data)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            parts = []
+            while True:
+                size = int((await self.reader.readline()).strip().split(b";")[0], 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                parts.append((await self.reader.readexactly(size + 2))[:-2])
+            payload = b"".join(parts)
+        elif "content-length" in headers:
+            payload = await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            payload = await self.reader.read()
+            self.close()
+
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, payload
+
+
+# ---------- Process helpers ----------
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_healthy(url, timeout=30.0):
+    deadline = time.time() + timeout
+    delay = 0.05
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2) as r:
+                if r.status == 200:
+                    return True
+        except Exception:
+            pass
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
+    return False
+
+
+def process_tree(pid):
+    pids = [pid]
+    for p in list(pids):
+        try:
+            with open(f"/proc/{p}/task/{p}/children") as f:
+                pids.extend(int(c) for c in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def rss_mb(pid):
+    """Resident set size of a process and its children, in MB (Linux /proc)."""
+    total = 0
+    for p in process_tree(pid):
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+        except OSError:
+            pass
+    return round(total / 1024.0, 1)
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or hard > soft:
+        target = 65536 if hard == resource.RLIM_INFINITY else hard
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+
+
+# ---------- Load driver ----------
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    """samples: list of (latency_s, ok) -> latency/throughput summary (ms)."""
+    latencies = sorted(s[0] for s in samples)
+    errors = sum(1 for s in samples if not s[1])
+    count = len(samples)
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "rps": round(count / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(1000 * sum(latencies) / count, 2) if count else 0.0,
+        "p50_ms": round(1000 * percentile(latencies, 50), 2),
+        "p95_ms": round(1000 * percentile(latencies, 95), 2),
+        "p99_ms": round(1000 * percentile(latencies, 99), 2),
+        "max_ms": round(1000 * latencies[-1], 2) if latencies else 0.0,
+    }
+
+
+async def run_load(host, port, endpoints, concurrency, duration, requests_total, identical, seed):
+    rng = random.Random(seed)
+    samples = {e: [] for e in endpoints}
+    counter = iter(range(10**12))
+    deadline = time.perf_counter() + duration if duration else None
+    budget = [requests_total]
+
+    def take():
+        if budget[0] is not None:
+            if budget[0] <= 0:
+                return False
+            budget[0] -= 1
+        return deadline is None or time.perf_counter() < deadline
+
+    async def worker(wid):
+        conn = Connection(host, port)
+        i = wid
+        while take():
+            endpoint = endpoints[i % len(endpoints)]
+            i += 1
+            n = 0 if identical else next(counter)
+            method, path, body = build_request(endpoint, n, rng)
+            start = time.perf_counter()
+            try:
+                status, _ = await conn.request(method, path, body)
+                ok = status < 400
+            except Exception:
+                conn.close()
+                ok = False
+            samples[endpoint].append((time.perf_counter() - start, ok))
+        conn.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    return samples, time.perf_counter() - start
+
+
+def run_benchmark(args):
+    raise_fd_limit()
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    for e in endpoints:
+        build_request(e, 0, random.Random())
+
+    fake_port = args.fake_port or free_port()
+    api_port = args.api_port or free_port()
+    workdir = tempfile.mkdtemp(prefix="newsbench-")
+    procs = []
+
+    try:
+        fake = subprocess.Popen(
+            [
+                sys.executable, os.path.join(BENCH_DIR, "fake_openai.py"),
+                "--port", str(fake_port),
+                "--latency-ms", str(args.latency_ms),
+                "--jitter-ms", str(args.jitter_ms),
+                "--tokens-per-sec", str(args.tokens_per_sec),
+                "--error-rate", str(args.error_rate),
+                "--rate-limit-rate", str(args.rate_limit_rate),
+            ],
+            stdout=subprocess.DEVNULL,
+        )
+        procs.append(fake)
+
+        env = os.environ.copy()
+        env.update(
+            {
+                "NEWS_API_PORT": str(api_port),
+                "API_MODE": args.mode,
+                "OPENAI_API_KEY": "sk-bench",
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+                "ARTICLE_STORE_PATH": os.path.join(workdir, "articles.db"),
+                "CACHE_PATH": os.path.join(workdir, "cache.db"),
+            }
+        )
+        if args.no_cache:
+            env.update({"CACHE_TTL": "0", "CACHE_STALE_TTL": "0"})
+        # All load comes from one address, so per-client limits would cap it
+        env["ADMISSION"] = "1" if args.admission else "0"
+        api = subprocess.Popen(
+            [sys.executable, os.path.join(REPO_DIR, "flask_api.py")],
+            cwd=REPO_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=None if args.verbose else subprocess.DEVNULL,
+        )
+        procs.append(api)
+
+        if not wait_healthy(f"http://127.0.0.1:{fake_port}/health"):
+            raise SystemExit("Fake OpenAI server did not start")
+        if not wait_healthy(f"http://127.0.0.1:{api_port}/health"):
+            raise SystemExit("API did not become healthy")
+
+        rss_start = rss_mb(api.pid)
+        rss_samples = [rss_start]
+
+        async def sample_rss(stop):
+            while not stop.is_set():
+                rss_samples.append(rss_mb(api.pid))
+                try:
+                    await asyncio.wait_for(stop.wait(), 0.5)
+                except asyncio.TimeoutError:
+                    pass
+
+        async def main():
+            stop = asyncio.Event()
+            sampler = asyncio.create_task(sample_rss(stop))
+            try:
+                return await run_load(
+                    "127.0.0.1", api_port, endpoints, args.concurrency,
+                    args.duration, args.requests, args.identical, args.seed,
+                )
+            finally:
+                stop.set()
+                await sampler
+
+        samples, elapsed = asyncio.run(main())
+        rss_end = rss_mb(api.pid)
+    finally:
+        for p in reversed(procs):
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+    everything = [s for values in samples.values() for s in values]
+    return {
+        "config": {
+            "mode": args.mode,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "requests": args.requests,
+            "endpoints": endpoints,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "tokens_per_sec": args.tokens_per_sec,
+            "error_rate": args.error_rate,
+            "rate_limit_rate": args.rate_limit_rate,
+            "cache": not args.no_cache,
+            "admission": args.admission,
+            "identical": args.identical,
+        },
+        "elapsed_s": round(elapsed, 2),
+        "overall": summarize(everything, elapsed),
+        "endpoints": {e: summarize(s, elapsed) for e, s in samples.items()},
+        "rss_mb": {"start": rss_start, "peak": max(rss_samples), "end": rss_end},
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+# ---------- Reporting ----------
+def print_report(result):
+    cfg = result["config"]
+    print(
+        f"\nmode={cfg['mode']} concurrency={cfg['concurrency']} elapsed={result['elapsed_s']}s "
+        f"upstream={cfg['latency_ms']}±{cfg['jitter_ms']}ms"
+    )
+    header = f"{'endpoint':32} {'reqs':>7} {'err%':>6} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = list(result["endpoints"].items()) + [("OVERALL", result["overall"])]
+    for name, s in rows:
+        print(
+            f"{name:32} {s['requests']:>7} {100 * s['error_rate']:>5.1f}% {s['rps']:>9.1f} "
+            f"{s['p50_ms']:>8.1f}ms {s['p95_ms']:>7.1f}ms {s['p99_ms']:>7.1f}ms"
+        )
+    rss = result["rss_mb"]
+    print(f"\nAPI RSS: start {rss['start']} MB, peak {rss['peak']} MB, end {rss['end']} MB")
+
+
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "error_rate")
+HIGHER_IS_BETTER = ("rps",)
+
+
+def compare(result, baseline, threshold):
+    """Print per-metric deltas vs. baseline; return the list of regressions."""
+    regressions = []
+    print(f"\nComparison against baseline from {baseline.get('timestamp', '?')}:")
+    names = [("OVERALL", result["overall"], baseline["overall"])]
+    for name, stats in result["endpoints"].items():
+        if name in baseline.get("endpoints", {}):
+            names.append((name, stats, baseline["endpoints"][name]))
+
+    for name, now, before in names:
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            old, new = before.get(metric, 0.0), now.get(metric, 0.0)
+            if not old:
+                continue
+            change = (new - old) / old
+            worse = change > threshold if metric in LOWER_IS_BETTER else change < -threshold
+            flag = "  REGRESSION" if worse else ""
+            print(f"  {name:32} {metric:10} {old:>10.2f} -> {new:>10.2f} ({change:+.1%}){flag}")
+            if worse:
+                regressions.append((name, metric, old, new))
+
+    old_peak = baseline.get("rss_mb", {}).get("peak")
+    new_peak = result["rss_mb"]["peak"]
+    if old_peak:
+        change = (new_peak - old_peak) / old_peak
+        worse = change > threshold
+        print(f"  {'RSS peak (MB)':43} {old_peak:>10.1f} -> {new_peak:>10.1f} ({change:+.1%})"
+              f"{'  REGRESSION' if worse else ''}")
+        if worse:
+            regressions.append(("rss", "peak", old_peak, new_peak))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds; 0 = use --requests")
+    parser.add_argument("--requests", type=int, default=None, help="stop after this many requests")
+    parser.add_argument("--endpoints", default=DEFAULT_ENDPOINTS,
+                        help="comma list; also create_social_content_stream, analyze_news_stream, "
+                             "analyze_news_local")
+    parser.add_argument("--identical", action="store_true",
+                        help="send identical payloads (exercises request coalescing)")
+    parser.add_argument("--no-cache", action="store_true", help="disable the response cache")
+    parser.add_argument("--admission", action="store_true",
+                        help="keep API admission control (rate limits, queueing) enabled")
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--fake-port", type=int, default=None)
+    parser.add_argument("--api-port", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="write the full JSON result here")
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="relative change that counts as a regression")
+    parser.add_argument("--verbose", action="store_true", help="show API stderr")
+    args = parser.parse_args()
+    if not args.duration and not args.requests:
+        parser.error("give --duration or --requests")
+
+    result = run_benchmark(args)
+    print_report(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save_baseline}.json")
+        with open(path, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nSaved baseline to {path}")
+
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as f:
+            baseline = json.load(f)
+        if compare(result, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
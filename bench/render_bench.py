@@ -0,0 +1,103 @@
+# ================================
+# Streamlit rerun benchmark (bench/render_bench.py)
+# ================================
+"""
+Rerun time of the Streamlit app as the fetched article list grows.
+
+Runs app.py headless with Streamlit's AppTest, preloads N synthetic articles
+into session state and times full reruns (what every sidebar change or
+button click costs), with pagination (NEWS_PAGE_SIZE) and with every card
+rendered (page size 0, the old behaviour).
+
+    python bench/render_bench.py
+    python bench/render_bench.py --counts 10,100,500 --reruns 10 --page-size 20
+
+A stub answers /health on NEWS_API_PORT so the app does not start the API.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from serve import HEALTH_MESSAGE  # noqa: E402
+
+
+class _HealthStub(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps({"message": HEALTH_MESSAGE}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _articles(n):
+    return [
+        {
+            "id": i,
+            "title": f"Benchmark headline {i}",
+            "description": f"Synthetic description number {i} for the render benchmark. " * 3,
+            "source": "Bench",
+            "published_at": time.strftime("%Y-%m-%d"),
+            "url": f"https://example.com/{i}",
+        }
+        for i in range(n)
+    ]
+
+
+def time_reruns(count, page_size, reruns):
+    """Median and max seconds of a full rerun with `count` articles loaded."""
+    from streamlit.testing.v1 import AppTest
+
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    os.environ["NEWS_PAGE_SIZE"] = str(page_size)
+    at = AppTest.from_file(os.path.join(REPO_DIR, "app.py"), default_timeout=120)
+    at.session_state["news"] = _articles(count)
+    at.run()  # first run fills the card cache
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    samples = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--counts", default="10,50,100,200,500")
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--port", type=int, default=5099)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), _HealthStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["NEWS_API_PORT"] = str(args.port)
+
+    print(f"{'articles':>8}  {'paged (ms)':>12}  {'all cards (ms)':>15}")
+    try:
+        for count in [int(c) for c in args.counts.split(",")]:
+            paged, _ = time_reruns(count, args.page_size, args.reruns)
+            full, _ = time_reruns(count, 0, args.reruns)
+            print(f"{count:>8}  {paged * 1000:>12.1f}  {full * 1000:>15.1f}", flush=True)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# ================================
+# Startup and serialization benchmark (bench/startup_bench.py)
+# ================================
+"""
+Worker startup and per-response encoding cost of the API.
+
+Startup: import time of flask_api / async_api in a fresh interpreter, as the
+servers now start (openai, httpx and numpy deferred to first use) and with
+those loaded up front as before, plus the time from process start until
+/health answers.
+
+Serialization: per-response cost and size of typical payloads (health, a news
+list, an analysis) with Flask's stock JSON provider, orjson and MessagePack,
+and what gzip/brotli add on top:
+
+    python bench/startup_bench.py
+    python bench/startup_bench.py --imports 10 --articles 50 --number 2000
+
+Optional encoders/compressors that are not installed are skipped.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from analytics import analyze_articles  # noqa: E402
+from serialization import brotli, compress_body, dumps, msgpack, orjson  # noqa: E402
+
+# What importing the server used to load up front
+EAGER = {
+    "flask_api": "import numpy, openai; flask_api.get_client()",
+    "async_api": "import numpy, openai, httpx",
+}
+
+
+def _env():
+    return {
+        **os.environ,
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "sk-bench"),
+        "PYTHONPATH": REPO_DIR,
+        "PREWARM": "0",
+    }
+
+
+def import_seconds(module, eager, runs):
+    """Median seconds to import `module` (and the eager extras) in a new interpreter."""
+    extra = EAGER[module] if eager else "pass"
+    code = (
+        "import time; start = time.perf_counter(); "
+        f"import {module}; {extra}; print(time.perf_counter() - start)"
+    )
+    samples = [
+        float(subprocess.run(
+            [sys.executable, "-c", code], env=_env(), cwd=REPO_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1])
+        for _ in range(runs)
+    ]
+    return statistics.median(samples)
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def seconds_to_health(mode, timeout=30.0):
+    """Seconds from spawning the API (API_MODE=mode) until /health answers."""
+    port = _free_port()
+    env = {**_env(), "API_MODE": mode, "NEWS_API_PORT": str(port)}
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_DIR, "flask_api.py")], env=env, cwd=REPO_DIR,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                    return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        return float("nan")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def payloads(n_articles):
+    articles = [
+        {
+            "id": i,
+            "title": f"Markets rally as central bank signals rate pause ({i})",
+            "description": "Stocks rose for a third day as investors bet on a pause in "
+                           "rate hikes, while energy shares slipped on weaker oil. " * 2,
+            "source": "Bench Wire",
+            "published_at": "2026-10-17",
+            "url": f"https://example.com/story/{i}",
+        }
+        for i in range(n_articles)
+    ]
+    analytics = analyze_articles(articles)
+    return {
+        "health": {"status": "ok", "message": "GPT News API running"},
+        "news": {"success": True, "articles": articles, "count": len(articles)},
+        "analysis": {"success": True, "analysis": "Narrative paragraph. " * 180,
+                     "analytics": analytics},
+    }
+
+
+def encoders():
+    from flask import Flask
+
+    stock = Flask("bench").json  # what flask.jsonify used
+    found = {"flask json": lambda p: stock.dumps(p).encode()}
+    if orjson is not None:
+        found["orjson"] = dumps
+    if msgpack is not None:
+        found["msgpack"] = lambda p: msgpack.packb(p, use_bin_type=True, default=str)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--imports", type=int, default=5, help="fresh interpreters per figure")
+    parser.add_argument("--articles", type=int, default=25, help="articles in the news payload")
+    parser.add_argument("--number", type=int, default=1000, help="encodes per timing")
+    args = parser.parse_args()
+
+    print("Startup (median seconds)")
+    print(f"{'server':>10}  {'lazy import':>12}  {'eager import':>13}  {'to /health':>11}")
+    for module, mode in (("flask_api", "sync"), ("async_api", "async")):
+        lazy = import_seconds(module, False, args.imports)
+        eager = import_seconds(module, True, args.imports)
+        health = seconds_to_health(mode)
+        print(f"{module:>10}  {lazy:>12.3f}  {eager:>13.3f}  {health:>11.3f}", flush=True)
+
+    print("\nEncoding (µs per response, bytes)")
+    print(f"{'payload':>9}  {'encoder':>10}  {'µs':>8}  {'bytes':>7}  "
+          f"{'+gzip µs':>9}  {'gzip B':>7}  {'+br µs':>7}  {'br B':>6}")
+    for name, payload in payloads(args.articles).items():
+        for label, encode in encoders().items():
+            body = encode(payload)
+            seconds = timeit.timeit(lambda: encode(payload), number=args.number) / args.number
+            line = f"{name:>9}  {label:>10}  {seconds * 1e6:>8.1f}  {len(body):>7}"
+            for coding in ("gzip", "br"):
+                if coding == "br" and brotli is None:
+                    line += f"  {'-':>7}  {'-':>6}"
+                    continue
+                packed, used = compress_body(body, coding)
+                rounds = max(1, args.number // 10)
+                cost = timeit.timeit(lambda: compress_body(body, coding), number=rounds) / rounds
+                width = (9, 7) if coding == "gzip" else (7, 6)
+                line += f"  {cost * 1e6:>{width[0]}.1f}  {len(packed) if used else '-':>{width[1]}}"
+            print(line, flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# ================================
+# Card rendering (cards.py)
+# ================================
+"""
+HTML for the Streamlit theme and article cards, memoized across reruns.
+
+Streamlit re-executes app.py on every interaction, so caches defined there
+would start empty each time; this module is imported once per process.
+Cards are cached by article content (the fields they show) and card kind.
+The markup only refers to CSS variables, so switching theme swaps the
+(cached) style block and reuses every card.
+"""
+import hashlib
+import json
+from functools import lru_cache
+
+CARD_FIELDS = ("title", "source", "published_at", "description", "url")
+
+THEMES = {
+    True: {  # dark
+        "vars": "--bg:#101114; --panel:#1b1d22; --panel-soft:#24272e;\n"
+                "  --text:#f2f2f2; --muted:#c6c6c6; --accent:#e84a5f;",
+        "shadow": "rgba(0,0,0,.35)",
+        "blur": "10px",
+    },
+    False: {  # light
+        "vars": "--bg:#ffffff; --panel:#f9f9fb; --panel-soft:#f3f7ff;\n"
+                "  --text:#0f172a; --muted:#475569; --accent:#1f77b4;",
+        "shadow": "rgba(0,0,0,.08)",
+        "blur": "8px",
+    },
+}
+
+
+@lru_cache(maxsize=None)
+def theme_css(dark_mode):
+    theme = THEMES[bool(dark_mode)]
+    return f"""
+<style>
+:root {{
+  {theme["vars"]}
+}}
+.stApp {{ background: var(--bg); color: var(--text); }}
+.news-card {{
+  background: var(--panel); color: var(--text);
+  padding: 1rem; border-radius: 12px;
+  border-left: 4px solid var(--accent); margin: 1rem 0;
+  box-shadow: 0 2px {theme["blur"]} {theme["shadow"]};
+}}
+.content-card {{
+  background: var(--panel-soft); color: var(--text);
+  padding: 1rem; border-radius: 12px; border: 1px solid var(--accent);
+  margin: 1rem 0; box-shadow: 0 2px {theme["blur"]} {theme["shadow"]};
+}}
+</style>
+"""
+
+
+def _content(article):
+    return tuple(str(article.get(f) or "") for f in CARD_FIELDS)
+
+
+def article_key(article):
+    """Stable widget key for an article: its store id, else a content hash."""
+    if article.get("id") is not None:
+        return f"id{article['id']}"
+    raw = json.dumps(_content(article), ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+
+@lru_cache(maxsize=2048)
+def _news_card(title, source, published_at, description, url):
+    link = f"<a href='{url}' target='_blank'>Read more</a>" if url else ""
+    return f"""
+<div class="news-card">
+  <h3 style="margin:.1rem 0 0.6rem 0;">{title}</h3>
+  <p style="margin:.2rem 0; color: var(--muted);">{source or 'Unknown'} — {published_at}</p>
+  <p style="margin:.4rem 0 0.6rem 0;">{description}</p>
+  {link}
+</div>
+"""
+
+
+@lru_cache(maxsize=256)
+def _content_card(title, source, published_at, description, url):
+    link = (
+        f"<p style='margin-top:.5rem;'><a href='{url}' target='_blank'>Read full article</a></p>"
+        if url else ""
+    )
+    return f"""
+<div class="content-card">
+  <h4 style="margin:0 0 .5rem 0;">{title or '(No title)'}</h4>
+  <p style="margin:.25rem 0;"><strong>Source:</strong> {source or 'Unknown'}</p>
+  <p style="margin:.25rem 0; opacity:.9;">{description}</p>
+  <small>{published_at}</small>
+  {link}
+</div>
+"""
+
+
+def news_card_html(article):
+    return _news_card(*_content(article))
+
+
+def content_card_html(article):
+    return _content_card(*_content(article))
+
+
+def page_slice(items, page, page_size):
+    """(items on `page` (1-based, clamped), page, page count); page_size 0 = all."""
+    if page_size <= 0 or len(items) <= page_size:
+        return items, 1, 1
+    pages = -(-len(items) // page_size)
+    page = min(max(1, int(page)), pages)
+    start = (page - 1) * page_size
+    return items[start:start + page_size], page, pages
@@ -1,19 +1,45 @@
 # ================================
 # GPT News API (flask_api.py)
 # ================================
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, stream_with_context
 from flask_cors import CORS
+import contextvars
 import os
+import threading
+import time
 from dotenv import load_dotenv
-import json
-from datetime import datetime
-
-# OpenAI client import compatible with openai>=1.x
-try:
-    from openai import OpenAI
-except ImportError:
-    import openai  # type: ignore
-    OpenAI = getattr(openai, "OpenAI")
+from concurrent.futures import ThreadPoolExecutor
+
+from admission import ADMITTED_ROUTES, Rejected, admission_from_env, client_id
+from analytics import narrative_requested
+from article_store import UnknownArticle, store_from_env
+import generation
+from generation import BATCH_MAX_WORKERS, completion_text
+from jobs import CANCELLED, FAILED, SUCCEEDED, UnknownJob, job_request, job_store_from_env
+from model_router import ModelRouter, hedge_default_from_env, router_config_from_env
+import metrics
+from json_salvage import ArticleStreamParser
+from mapreduce import MapReducer, map_reduce_requested, mapreduce_from_env
+from prompts import ANALYSIS_MAX_ARTICLES, SERIES_MAX_ARTICLES, InvalidGPTJSON, InvalidRequest
+from prewarm import claim_scheduler, news_cache_key, prewarm_enabled, prewarmer_from_env
+from response_cache import MISS, STALE, cache_from_env
+from semantic_cache import (
+    article_text,
+    reuse_post,
+    semantic_cache_from_env,
+    semantic_cache_requested,
+    social_scope,
+)
+from serialization import compress_body, compressible, encode_body
+from singleflight import SingleFlight, request_key
+from streaming import (
+    SSE_HEADERS,
+    SSE_MIMETYPE,
+    chunk_text,
+    sse_complete,
+    sse_event,
+    wants_stream,
+)
 
 load_dotenv()
 
@@ -21,9 +47,126 @@ app = Flask(__name__)
 CORS(app)
 
 OPENAI_KEY = os.getenv("OPENAI_API_KEY")
-client = None
-if OPENAI_KEY:
-    client = OpenAI(api_key=OPENAI_KEY)
+client = None  # built on first use (get_client), so workers answer /health sooner
+_client_lock = threading.Lock()
+
+
+def _openai_class():
+    # Imported on first use: openai takes longer to import than the rest of the app
+    try:
+        from openai import OpenAI
+    except ImportError:
+        import openai  # type: ignore
+        OpenAI = getattr(openai, "OpenAI")
+    return OpenAI
+
+
+def get_client():
+    """The default OpenAI client (None without OPENAI_API_KEY)."""
+    global client
+    if client is None and OPENAI_KEY:
+        with _client_lock:
+            if client is None:
+                client = _openai_class()(api_key=OPENAI_KEY)
+    return client
+
+
+def jsonify(payload):
+    """JSON (orjson when installed) or MessagePack, as the request's Accept prefers."""
+    body, mimetype = encode_body(payload, request.headers.get("Accept"))
+    response = Response(body, mimetype=mimetype)
+    response.vary.add("Accept")
+    return response
+
+response_cache = cache_from_env()
+article_store = store_from_env()
+semantic_cache = semantic_cache_from_env()
+single_flight = SingleFlight()
+admission = admission_from_env()
+
+# Per-endpoint model routing (MODEL_ROUTES); other backends get their own client
+router = ModelRouter(
+    router_config_from_env(),
+    lambda base_url, api_key: _openai_class()(
+        base_url=base_url, api_key=api_key or OPENAI_KEY or "none"
+    ),
+    get_client,
+    hedge_default=hedge_default_from_env(),
+)
+
+# Background jobs (POST /jobs): results live in a SQLite store shared by workers
+JOB_MAX_WORKERS = int(os.getenv("JOB_MAX_WORKERS", "8"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "200"))
+job_store = job_store_from_env()
+job_pool = ThreadPoolExecutor(max_workers=JOB_MAX_WORKERS, thread_name_prefix="job")
+_job_futures = {}  # job id -> Future, for jobs queued or running in this process
+
+
+@app.before_request
+def _start_request():
+    g.start = time.perf_counter()
+    g.upstream = metrics.UpstreamClock()
+    metrics.request_upstream.set(g.upstream)
+    g.in_flight_route = request.endpoint or "unknown"
+    metrics.requests_in_flight.inc(g.in_flight_route)
+
+
+@app.before_request
+def _rate_limit_request():
+    """Per-route/client token buckets for the GPT-backed routes (slots are per upstream call)."""
+    if request.endpoint not in ADMITTED_ROUTES or not admission.enabled:
+        return None
+    try:
+        admission.check_rate(client_id(request.headers, request.remote_addr), request.endpoint)
+    except Rejected as e:
+        return _fail(e)
+    return None
+
+
+@app.after_request
+def _record_request(response):
+    route = request.endpoint or "unknown"
+    elapsed = time.perf_counter() - g.start
+    metrics.requests_total.inc(route, request.method, str(response.status_code))
+    metrics.request_seconds.observe(elapsed, route)
+    if not response.is_streamed:
+        metrics.local_overhead_seconds.observe(max(0.0, elapsed - g.upstream.seconds), route)
+    return response
+
+
+@app.after_request
+def _compress_response(response):
+    """gzip/brotli for buffered bodies of at least COMPRESS_MIN_BYTES."""
+    if response.is_streamed or not compressible(response.mimetype, response.headers):
+        return response
+    response.vary.add("Accept-Encoding")
+    body, coding = compress_body(response.get_data(), request.headers.get("Accept-Encoding"))
+    if coding is not None:
+        response.set_data(body)
+        response.headers["Content-Encoding"] = coding
+    return response
+
+
+@app.teardown_request
+def _end_request(exc=None):
+    # Streamed responses can tear down twice; only the first one counts
+    metrics.request_upstream.set(None)
+    route = g.pop("in_flight_route", None)
+    if route is not None:
+        metrics.requests_in_flight.dec(route)
+
+
+def _fail(error, status=500, kind=None, retry_after=None, **extra):
+    """Count the error by class for /metrics and build the JSON error response."""
+    if kind is None and isinstance(error, Rejected):
+        # Refused by admission control (rate bucket, full queue, expired wait)
+        status, kind, retry_after = error.status, error.reason, error.retry_after
+    elif kind is None and metrics.classify_error(error) == "upstream_rate_limit":
+        # Upstream is throttling us: answer fast with a hint instead of a 500
+        status, retry_after = 503, admission.retry_after()
+    metrics.record_error(request.endpoint, kind or error)
+    headers = {"Retry-After": str(retry_after)} if retry_after else {}
+    return jsonify({"success": False, "error": str(error), **extra}), status, headers
 
 
 @app.route("/health", methods=["GET"])
@@ -31,216 +174,542 @@ def health():
     return jsonify({"status": "ok", "message": "GPT News API running"})
 
 
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Prometheus text exposition of request, upstream, token and error metrics."""
+    return Response(metrics.render(), mimetype=metrics.CONTENT_TYPE)
+
+
+def _upstream(backend, create_kwargs, timeout=None):
+    """One upstream call on a routed backend, feeding metrics and admission control."""
+    model = backend.model
+    extra = {"timeout": timeout} if timeout else {}
+    try:
+        with metrics.upstream_timer(model):
+            resp = backend.client().chat.completions.create(**create_kwargs, **extra)
+    except Exception as e:
+        admission.upstream_failed(e)
+        raise
+    admission.upstream_succeeded()
+    metrics.record_usage(model, getattr(resp, "usage", None))
+    return resp
+
+
+def _complete(endpoint, **create_kwargs):
+    """
+    Run a completion on the endpoint's routed backends (`model` is the default
+    when no route is configured), sharing one upstream call among identical
+    concurrent requests. Only the call that goes upstream holds an admission
+    slot (or raises Rejected when none frees up in time).
+    """
+
+    def call():
+        with admission.slot(endpoint):
+            return router.complete(endpoint, create_kwargs["model"], create_kwargs, _upstream)
+
+    with metrics.upstream_wait():
+        return single_flight.do(request_key(endpoint=endpoint, **create_kwargs), call)
+
+
+def _stream_deltas(endpoint, create_kwargs):
+    """Yield text deltas from the endpoint's first healthy backend (streams are not hedged)."""
+    backend = router.pick(endpoint, create_kwargs["model"])
+    model = backend.model
+    with admission.slot(endpoint):
+        start = time.monotonic()
+        try:
+            with metrics.upstream_timer(model):
+                stream = backend.client().chat.completions.create(
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **{**create_kwargs, "model": model},
+                )
+                for chunk in stream:
+                    metrics.record_usage(model, getattr(chunk, "usage", None))
+                    yield chunk_text(chunk)
+        except Exception as e:
+            admission.upstream_failed(e)
+            backend.record(time.monotonic() - start, e)
+            raise
+        admission.upstream_succeeded()
+        backend.record(time.monotonic() - start)
+
+
+def _stream_completion(endpoint, create_kwargs, build_payload):
+    """
+    Stream a completion as SSE: `token` events, then a `done` event carrying
+    build_payload(full_text) — the same body the non-streaming route returns.
+    """
+
+    route = request.endpoint
+
+    def generate():
+        parts = []
+        try:
+            for delta in _stream_deltas(endpoint, create_kwargs):
+                if delta:
+                    parts.append(delta)
+                    yield sse_event("token", {"delta": delta})
+            yield sse_event("done", build_payload("".join(parts).strip()))
+        except Exception as e:
+            metrics.record_error(route, e)
+            yield sse_event("error", {"success": False, "error": str(e)})
+
+    return Response(
+        stream_with_context(generate()), mimetype=SSE_MIMETYPE, headers=SSE_HEADERS
+    )
+
+
+def _fetch_news(country, category, limit, today):
+    """Call GPT for `limit` articles and return the /generate_news payload."""
+    resp = _complete("news", **generation.news_kwargs(country, category, limit, today))
+
+    payload = generation.news_result(completion_text(resp), limit)
+    payload["articles"] = article_store.add_many(payload["articles"], country, category)
+    return payload
+
+
+def _news_events(payload):
+    for i, article in enumerate(payload["articles"]):
+        yield sse_event("article", {"index": i, "article": article})
+    yield sse_event("done", payload)
+
+
+def _stream_news(key, country, category, limit, today):
+    """
+    SSE for /generate_news: an `article` event as soon as each article object
+    is complete in the model output, then `done` with the usual payload.
+    """
+    route = request.endpoint
+
+    def generate():
+        parser = ArticleStreamParser()
+        parts, articles = [], []
+        try:
+            create_kwargs = generation.news_kwargs(country, category, limit, today)
+            for delta in _stream_deltas("news", create_kwargs):
+                parts.append(delta)
+                for article in parser.feed(delta)[: limit - len(articles)]:
+                    article = article_store.add_many([article], country, category)[0]
+                    yield sse_event("article", {"index": len(articles), "article": article})
+                    articles.append(article)
+
+            payload = generation.news_result("".join(parts), limit)
+            payload["articles"] = articles
+            response_cache.set(key, payload)
+            yield sse_event("done", payload)
+        except Exception as e:
+            metrics.record_error(route, e)
+            yield sse_event("error", {"success": False, "error": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=SSE_MIMETYPE,
+        headers={**SSE_HEADERS, "X-Cache": MISS},
+    )
+
+
+# Background pre-warming of popular country/category pairs (PREWARM=1)
+prewarmer = prewarmer_from_env(response_cache, _fetch_news)
+_background_lock = threading.Lock()
+_background_started = False
+
+
+def start_background():
+    """
+    Per-process background work: fail jobs orphaned by dead workers and start
+    the pre-warm scheduler. Only the server calls this (__main__, or the first
+    request in a gunicorn worker), so importing the module (batch_job.py)
+    spends no upstream quota and leaves the server's jobs alone.
+    """
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    job_store.recover_orphans()
+    if prewarm_enabled() and OPENAI_KEY and claim_scheduler(response_cache):
+        prewarmer.start()
+
+
+@app.before_request
+def _start_background_once():
+    if not _background_started:
+        start_background()
+
+
+def _cached_json(payload, cache_state, age=0.0):
+    resp = jsonify(payload)
+    resp.headers["X-Cache"] = cache_state
+    resp.headers["Age"] = str(int(age))
+    return resp
+
+
 @app.route("/generate_news", methods=["GET"])
 def generate_news():
     """
     Generate top news summaries via GPT for a given country/category.
     Freshness: published_at must be today or within the last 2 days.
+    Responses are cached per (country, category, limit, date).
+    With stream=true, articles are sent as SSE events as they are generated.
     """
     try:
-        if client is None:
-            return jsonify({"success": False, "error": "OpenAI API key missing"}), 400
-
-        country = request.args.get("country", "us")
-        category = request.args.get("category", "general")
-        limit = int(request.args.get("limit", 5))
-
-        today = datetime.utcnow().strftime("%Y-%m-%d")
-
-        system_prompt = f"""You are a global news summarizer.
-Return ONLY valid JSON (no markdown, no commentary).
-JSON must be an array of objects with keys:
-- title
-- description
-- source
-- published_at  (must be {today} or within the last 2 days; use ISO-like YYYY-MM-DD)
-- url
-Constraints:
-- Focus on the requested country and category.
-- Return exactly the requested number of items.
-- Be realistic and timely, but you may invent plausible headlines if needed.
-- Do NOT include anything older than 2 days.
-"""
-
-        user_prompt = f"Country: {country}\nCategory: {category}\nNumber of items: {limit}"
-
-        resp = client.chat.completions.create(
-            model="gpt-4.1-nano",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.5,
-            max_tokens=600,
-        )
-
-        content = resp.choices[0].message.content.strip()
+        if get_client() is None:
+            return _fail("OpenAI API key missing", 400, kind="missing_api_key")
+
+        country, category, limit, today = generation.news_params(request.args)
+
+        prewarmer.record(country, category)
+        key = news_cache_key(country, category, limit, today)
+        cached, state, age = response_cache.get(key)
+        if state == STALE:
+            response_cache.revalidate(
+                key, lambda: _fetch_news(country, category, limit, today)
+            )
+        stream = wants_stream(None, request.args)
+        if state != MISS and stream:
+            return Response(
+                _news_events(cached), mimetype=SSE_MIMETYPE,
+                headers={**SSE_HEADERS, "X-Cache": state, "Age": str(int(age))},
+            )
+        if state != MISS:
+            return _cached_json(cached, state, age)
+        if stream:
+            return _stream_news(key, country, category, limit, today)
 
         try:
-            articles = json.loads(content)
-            if not isinstance(articles, list):
-                raise ValueError("Expected list of articles")
-        except Exception as e:
-            return jsonify(
-                {"success": False, "error": f"Invalid JSON from GPT: {e}", "raw": content}
-            ), 502
+            payload = _fetch_news(country, category, limit, today)
+        except InvalidGPTJSON as e:
+            return _fail(e, 502, raw=e.raw)
 
-        return jsonify(
-            {"success": True, "articles": articles[:limit], "count": len(articles)}
-        )
+        response_cache.set(key, payload)
+        return _cached_json(payload, MISS)
 
     except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+        return _fail(e)
+
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    """Response cache hit/eviction counters and request-coalescing counters."""
+    return jsonify(
+        {
+            "success": True,
+            "cache": response_cache.stats(),
+            "singleflight": single_flight.stats(),
+            "semantic": semantic_cache.stats(),
+            "prewarm": prewarmer.stats(),
+            "admission": admission.stats(),
+            "routing": router.stats(),
+            "mapreduce": map_reducer.stats(),
+            "jobs": {**job_store.stats(), "pending": len(_job_futures)},
+        }
+    )
+
+
+@app.route("/articles", methods=["GET"])
+def list_articles():
+    """Stored articles, newest first, filtered by country/category."""
+    try:
+        limit = int(request.args.get("limit", 20))
+    except ValueError:
+        return _fail("limit must be an integer", 400, kind="bad_request")
+    articles = article_store.recent(
+        request.args.get("country"), request.args.get("category"), limit
+    )
+    return jsonify({"success": True, "articles": articles, "count": len(articles)})
+
+
+@app.route("/articles/<int:article_id>", methods=["GET"])
+def get_article(article_id):
+    """One stored article by id."""
+    try:
+        return jsonify({"success": True, "article": article_store.get(article_id)})
+    except UnknownArticle as e:
+        return _fail(e, 404)
+
+
+def _generate_social_post(data):
+    """Generate one social post from a /create_social_content request body."""
+    article = article_store.article_from_request(data)
+    data = {**data, "article": article}
+
+    use_semantic = semantic_cache_requested(data)
+    if use_semantic:
+        text, scope = article_text(article), social_scope(data)
+        cached, source_url, score = semantic_cache.lookup(text, scope)
+        if cached is not None:
+            return reuse_post(cached, source_url, article, score)
+
+    platform, create_kwargs = generation.social_kwargs(data)
+    resp = _complete("social", **create_kwargs)
+
+    payload = generation.social_payload(completion_text(resp), platform)
+    if use_semantic:
+        semantic_cache.store(text, scope, payload, article.get("url", ""))
+        payload = {**payload, "cache_similarity": None}
+    return payload
 
 
 @app.route("/create_social_content", methods=["POST"])
 def create_social_content():
     """Generate platform-specific social post for a single article."""
     try:
-        if client is None:
-            return jsonify({"success": False, "error": "OpenAI API key missing"}), 400
+        if get_client() is None:
+            return _fail("OpenAI API key missing", 400, kind="missing_api_key")
 
         data = request.json or {}
-        article = data.get("article", {}) or {}
-        platform = data.get("platform", "twitter")
-        tone = data.get("tone", "informative")
-        include_hashtags = data.get("include_hashtags", True)
-        include_link = data.get("include_link", True)
-        custom_angle = data.get("custom_angle", "")
-
-        title = article.get("title", "")
-        description = article.get("description", "")
-        url = article.get("url", "")
-
-        platform_configs = {
-            "twitter": {"char_limit": 280, "style": "concise and engaging"},
-            "linkedin": {"char_limit": 700, "style": "professional and insightful"},
-            "instagram": {"char_limit": 500, "style": "visual and catchy"},
-            "facebook": {"char_limit": 400, "style": "conversational"},
-            "tiktok": {"char_limit": 300, "style": "trendy and casual"},
-        }
-        config = platform_configs.get(platform, platform_configs["twitter"])
+        if wants_stream(data, request.args):
+            data["article"] = article_store.article_from_request(data)
+            platform, create_kwargs = generation.social_kwargs(data)
+            return _stream_completion(
+                "social", create_kwargs,
+                lambda content: generation.social_payload(content, platform),
+            )
+
+        return jsonify(_generate_social_post(data))
+
+    except UnknownArticle as e:
+        return _fail(e, 404)
+    except Exception as e:
+        return _fail(e)
 
-        system_prompt = f"""You are a social media strategist. Create an engaging {platform} post.
 
-Requirements:
-- Character limit: {config['char_limit']}
-- Tone: {tone}
-- Style: {config['style']}
-- Include hashtags: {include_hashtags}
-- Include link: {include_link}
-- Custom angle: {custom_angle or "Standard news sharing"}
-Return plain text only (no JSON).
-"""
+@app.route("/create_social_content/batch", methods=["POST"])
+def create_social_content_batch():
+    """Generate several posts concurrently; each item succeeds or fails alone."""
+    try:
+        if get_client() is None:
+            return _fail("OpenAI API key missing", 400, kind="missing_api_key")
+
+        items = generation.batch_items(request.json or {})
+        items = generation.resolve_batch_articles(article_store, items)
+
+        # Each request gets its own BATCH_MAX_WORKERS, as in the async server, so
+        # one large batch cannot queue every other caller behind a shared pool.
+        # Items run in a copy of this request's context so their upstream time
+        # is counted for it (metrics.UpstreamClock).
+        workers = min(BATCH_MAX_WORKERS, len(items))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch") as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, _generate_social_post, item)
+                for item in items
+            ]
+
+        results = []
+        for i, (item, future) in enumerate(zip(items, futures)):
+            try:
+                results.append(generation.batch_result(i, item, future.result()))
+            except Exception as e:
+                results.append(generation.batch_result(i, item, error=e))
+        return jsonify(generation.batch_payload(results))
+
+    except InvalidRequest as e:
+        return _fail(e, 400, kind="bad_request")
+    except Exception as e:
+        return _fail(e)
 
-        user_prompt = f"Title: {title}\nDescription: {description}\nURL: {url if include_link else ''}"
 
-        resp = client.chat.completions.create(
-            model="gpt-4.1",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.7,
-            max_tokens=400,
-        )
+# ---------- Map/reduce digests for large article sets ----------
+def _digest_completion(messages):
+    return completion_text(_complete("digest", **generation.digest_kwargs(messages)))
 
-        content = resp.choices[0].message.content.strip()
 
-        return jsonify({"success": True, "content": content, "platform": platform})
+# Map width follows the upstream concurrency limit admission adapts (AIMD)
+map_reducer = mapreduce_from_env(MapReducer, _digest_completion, limit=lambda: admission.limit)
 
-    except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+
+def _series_kwargs(data):
+    """(platform, theme, create kwargs); many articles are digested by map/reduce first."""
+    articles = article_store.articles_from_request(data)
+    digest = None
+    if map_reduce_requested(data, articles, SERIES_MAX_ARTICLES):
+        digest = map_reducer.digest(articles, "series")
+    return generation.series_kwargs(data, articles, digest)
+
+
+def _generate_series(data):
+    """Generate a series from a /create_content_series request body."""
+    platform, theme, create_kwargs = _series_kwargs(data)
+    resp = _complete("series", **create_kwargs)
+    return generation.series_payload(completion_text(resp), platform, theme)
 
 
 @app.route("/create_content_series", methods=["POST"])
 def create_content_series():
     """Generate a thread/series across multiple articles."""
     try:
-        if client is None:
-            return jsonify({"success": False, "error": "OpenAI API key missing"}), 400
+        if get_client() is None:
+            return _fail("OpenAI API key missing", 400, kind="missing_api_key")
 
         data = request.json or {}
-        articles = data.get("articles", []) or []
-        platform = data.get("platform", "twitter")
-        theme = data.get("theme", "daily roundup")
-        tone = data.get("tone", "informative")
-
-        if len(articles) < 2:
-            return jsonify({"success": False, "error": "Need at least 2 articles"}), 400
-
-        bullets = "\n".join(
-            [f"- {a.get('title')} — {a.get('description')}" for a in articles[:5]]
-        )
-
-        system_prompt = f"""You are a strategist. Create a {platform} series with theme '{theme}'.
-- Tone: {tone}
-- Provide an intro + one post per article
-- If the platform supports threads, number them like (1/n), (2/n)...
-Return plain text only.
-"""
-
-        resp = client.chat.completions.create(
-            model="gpt-4.1",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": bullets},
-            ],
-            temperature=0.7,
-            max_tokens=900,
-        )
-
-        content = resp.choices[0].message.content.strip()
-
-        return jsonify(
-            {"success": True, "series": content, "platform": platform, "theme": theme}
-        )
-
+        if wants_stream(data, request.args):
+            platform, theme, create_kwargs = _series_kwargs(data)
+            return _stream_completion(
+                "series", create_kwargs,
+                lambda content: generation.series_payload(content, platform, theme),
+            )
+
+        return jsonify(_generate_series(data))
+
+    except UnknownArticle as e:
+        return _fail(e, 404)
+    except InvalidRequest as e:
+        return _fail(e, 400, kind="bad_request")
     except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+        return _fail(e)
+
+
+def _local_analysis(data):
+    """Articles plus local analytics for an /analyze_news request body."""
+    articles = article_store.articles_from_request(data)
+    return articles, generation.local_analysis(articles)
+
+
+def _analysis_kwargs(data):
+    """(analytics, create kwargs for the narrative) for an /analyze_news body."""
+    articles, analytics = _local_analysis(data)
+    digest = None
+    if map_reduce_requested(data, articles, ANALYSIS_MAX_ARTICLES):
+        digest = map_reducer.digest(articles, "analysis")
+    return analytics, generation.analysis_kwargs(articles, analytics, digest)
+
+
+def _generate_analysis(data):
+    """Analyze articles locally; the LLM only writes the narrative, if requested."""
+    if not narrative_requested(data):
+        _, analytics = _local_analysis(data)
+        return generation.local_analysis_payload(analytics)
+
+    analytics, create_kwargs = _analysis_kwargs(data)
+    resp = _complete("analysis", **create_kwargs)
+    return generation.analysis_payload(completion_text(resp), analytics)
 
 
 @app.route("/analyze_news", methods=["POST"])
 def analyze_news():
-    """Analyze the set of articles for sentiment, themes, and strategy."""
+    """Sentiment, themes and hashtags computed locally, plus an optional GPT narrative."""
     try:
-        if client is None:
-            return jsonify({"success": False, "error": "OpenAI API key missing"}), 400
-
         data = request.json or {}
-        articles = data.get("articles", []) or []
-
-        text = "\n".join(
-            [f"{a.get('title')}: {a.get('description')}" for a in articles[:10]]
-        )
-
-        system_prompt = """You are a strategist. Analyze these articles and provide:
-1) Sentiment breakdown (positive/negative/neutral %) and brief justification
-2) Key themes and takeaways
-3) Content strategy recommendations
-4) Best posting times by platform (based on general best practices)
-5) Potential viral angles or hooks
-Return structured text (no JSON).
-"""
-
-        resp = client.chat.completions.create(
-            model="gpt-4.1",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": text},
-            ],
-            temperature=0.6,
-            max_tokens=900,
-        )
-
-        content = resp.choices[0].message.content.strip()
-
-        return jsonify({"success": True, "analysis": content})
+        if not narrative_requested(data):
+            # Local only: no upstream call, so no API key needed
+            payload = _generate_analysis(data)
+            if wants_stream(data, request.args):
+                return Response(
+                    sse_complete(payload, "analysis"), mimetype=SSE_MIMETYPE, headers=SSE_HEADERS
+                )
+            return jsonify(payload)
+
+        if get_client() is None:
+            return _fail("OpenAI API key missing", 400, kind="missing_api_key")
+
+        if wants_stream(data, request.args):
+            analytics, create_kwargs = _analysis_kwargs(data)
+            return _stream_completion(
+                "analysis", create_kwargs,
+                lambda content: generation.analysis_payload(content, analytics),
+            )
+
+        return jsonify(_generate_analysis(data))
+
+    except UnknownArticle as e:
+        return _fail(e, 404)
+    except Exception as e:
+        return _fail(e)
+
+
+# ---------- Background jobs ----------
+JOB_HANDLERS = {
+    "social": _generate_social_post,
+    "series": _generate_series,
+    "analysis": _generate_analysis,
+}
+
+
+def _run_job(job_id, job_type, data):
+    if not job_store.start(job_id):
+        metrics.jobs_total.inc(job_type, CANCELLED)  # cancelled while queued
+        return
+    start = time.perf_counter()
+    try:
+        result = JOB_HANDLERS[job_type](data)
+    except Exception as e:
+        metrics.record_error("run_job", e)
+        status = FAILED if job_store.fail(job_id, e, metrics.classify_error(e)) else CANCELLED
+    else:
+        status = SUCCEEDED if job_store.finish(job_id, result) else CANCELLED
+    metrics.jobs_total.inc(job_type, status)
+    metrics.job_seconds.observe(time.perf_counter() - start, job_type)
+
+
+def _job_done(job_id):
+    def done(_future):
+        _job_futures.pop(job_id, None)
+        metrics.jobs_pending.set(len(_job_futures))
 
+    return done
+
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    """Queue a long generation and return its id; poll GET /jobs/<id>."""
+    try:
+        job_type, data = job_request(request.json or {})
+        if generation.job_needs_upstream(job_type, data) and get_client() is None:
+            return _fail("OpenAI API key missing", 400, kind="missing_api_key")
+        generation.check_job(article_store, job_type, data)
+        if len(_job_futures) >= JOB_MAX_PENDING:
+            return _fail(
+                "Job queue full, try again later", 503, kind="queue_full",
+                retry_after=admission.retry_after(),
+            )
+
+        job = job_store.create(job_type, data)
+        future = job_pool.submit(_run_job, job["id"], job_type, data)
+        _job_futures[job["id"]] = future
+        metrics.jobs_pending.set(len(_job_futures))
+        future.add_done_callback(_job_done(job["id"]))
+        return jsonify({"success": True, "job": job}), 202, {"Location": f"/jobs/{job['id']}"}
+
+    except UnknownArticle as e:
+        return _fail(e, 404)
+    except InvalidRequest as e:
+        return _fail(e, 400, kind="bad_request")
     except Exception as e:
-        return jsonify({"success": False, "error": str(e)}), 500
+        return _fail(e)
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    """Status of a job, with its result once it has succeeded."""
+    try:
+        return jsonify({"success": True, "job": job_store.get(job_id)})
+    except UnknownJob as e:
+        return _fail(e, 404)
+
+
+@app.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    """Cancel a queued or running job (a running one's result is discarded)."""
+    try:
+        cancelled, job = job_store.cancel(job_id)
+    except UnknownJob as e:
+        return _fail(e, 404)
+    if not cancelled:
+        return _fail(f"Job already {job['status']}", 409, kind="conflict", job=job)
+    future = _job_futures.get(job_id)
+    if future is not None and future.cancel():
+        metrics.jobs_total.inc(job["type"], CANCELLED)
+    return jsonify({"success": True, "job": job})
 
 
 if __name__ == "__main__":
     port = int(os.getenv("NEWS_API_PORT", "5001"))
-    app.run(host="127.0.0.1", port=port, debug=False, use_reloader=False, threaded=True)
\ No newline at end of file
+    # API_MODE=async serves the same routes from async_api.py on uvicorn
+    if os.getenv("API_MODE", "sync").lower() == "async":
+        import async_api
+
+        async_api.run(port)
+    else:
+        start_background()
+        app.run(host="127.0.0.1", port=port, debug=False, use_reloader=False, threaded=True)
@@ -0,0 +1,197 @@
+# ================================
+# Completion requests and response payloads (generation.py)
+# ================================
+"""
+What each generating route asks the model for and what it returns, shared by
+the threaded (flask_api.py) and asyncio (async_api.py) servers.
+
+These are plain functions: request parameters in, create kwargs or response
+payloads out. Each server keeps its own control flow around them (stores,
+caches, upstream calls, SSE), blocking in one and awaiting in the other.
+"""
+import os
+from datetime import datetime
+
+import metrics
+from analytics import analytics_summary, analyze_articles, narrative_requested
+from article_store import UnknownArticle
+from mapreduce import DIGEST_MAX_TOKENS
+from prompts import (
+    InvalidRequest,
+    build_analysis_messages,
+    build_news_messages,
+    expand_batch_items,
+    news_completion_kwargs,
+    parse_news_payload,
+    series_messages_from_request,
+    social_max_tokens,
+    social_messages_from_request,
+)
+
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+
+
+def completion_text(resp):
+    return resp.choices[0].message.content.strip()
+
+
+# ---------- News ----------
+def news_params(args):
+    """(country, category, limit, today) from /generate_news query args."""
+    return (
+        args.get("country", "us"),
+        args.get("category", "general"),
+        int(args.get("limit", 5)),
+        datetime.utcnow().strftime("%Y-%m-%d"),
+    )
+
+
+def news_kwargs(country, category, limit, today):
+    with metrics.stage_timer("prompt_build"):
+        return news_completion_kwargs(build_news_messages(country, category, limit, today))
+
+
+def news_result(content, limit):
+    """The /generate_news payload parsed (or salvaged) from the model's text."""
+    with metrics.stage_timer("json_parse"):
+        payload = parse_news_payload(content, limit)
+    metrics.news_parse_total.inc("salvaged" if payload.get("partial") else "clean")
+    return payload
+
+
+# ---------- Social posts ----------
+def social_kwargs(data):
+    """(platform, create kwargs) for a request body whose `article` is resolved."""
+    with metrics.stage_timer("prompt_build"):
+        platform, messages = social_messages_from_request(data)
+    return platform, {
+        "model": "gpt-4.1",
+        "messages": messages,
+        "temperature": 0.7,
+        "max_tokens": social_max_tokens(platform),
+    }
+
+
+def social_payload(content, platform):
+    return {"success": True, "content": content, "platform": platform}
+
+
+# ---------- Batches ----------
+def batch_items(data):
+    """Single-post bodies of a /create_social_content/batch body (InvalidRequest if bad)."""
+    items = expand_batch_items(data)
+    if not items:
+        raise InvalidRequest("No articles or items given")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise InvalidRequest(f"Batch too large (max {BATCH_MAX_ITEMS} items)")
+    return items
+
+
+def resolve_batch_articles(store, items):
+    """
+    Items with their stored `article_id` inlined as `article`, so each result
+    carries the article's title; blocking. An unknown id is left in place for
+    that item to fail on alone.
+    """
+    resolved = []
+    for item in items:
+        if item.get("article_id") is not None:
+            try:
+                article = store.get(item["article_id"])
+            except UnknownArticle:
+                pass
+            else:
+                item = {k: v for k, v in item.items() if k != "article_id"}
+                item["article"] = article
+        resolved.append(item)
+    return resolved
+
+
+def batch_result(index, item, payload=None, error=None):
+    """One entry of the batch response: the item's post, or why it failed."""
+    result = {
+        "index": index,
+        "platform": item.get("platform", "twitter"),
+        "tone": item.get("tone", "informative"),
+        "title": (item.get("article") or {}).get("title", ""),
+    }
+    if error is not None:
+        metrics.record_error("create_social_content_batch", error)
+        result.update({"success": False, "error": str(error)})
+    else:
+        result.update(payload)
+    return result
+
+
+def batch_payload(results):
+    succeeded = sum(1 for r in results if r["success"])
+    return {
+        "success": True,
+        "results": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+    }
+
+
+# ---------- Map/reduce digests ----------
+def digest_kwargs(messages):
+    return {
+        "model": "gpt-4.1-mini",
+        "messages": messages,
+        "temperature": 0.3,
+        "max_tokens": DIGEST_MAX_TOKENS,
+    }
+
+
+# ---------- Series ----------
+def series_kwargs(data, articles, digest=None):
+    """(platform, theme, create kwargs) for a /create_content_series body."""
+    with metrics.stage_timer("prompt_build"):
+        platform, theme, messages = series_messages_from_request(data, articles, digest)
+    return platform, theme, {
+        "model": "gpt-4.1",
+        "messages": messages,
+        "temperature": 0.7,
+        "max_tokens": 900,
+    }
+
+
+def series_payload(content, platform, theme):
+    return {"success": True, "series": content, "platform": platform, "theme": theme}
+
+
+# ---------- Analysis ----------
+def local_analysis(articles):
+    with metrics.stage_timer("analytics"):
+        return analyze_articles(articles)
+
+
+def local_analysis_payload(analytics):
+    """/analyze_news without a narrative: no upstream call."""
+    return {"success": True, "analysis": analytics_summary(analytics), "analytics": analytics}
+
+
+def analysis_kwargs(articles, analytics, digest=None):
+    with metrics.stage_timer("prompt_build"):
+        messages = build_analysis_messages(articles, analytics, digest)
+    return {"model": "gpt-4.1", "messages": messages, "temperature": 0.6, "max_tokens": 900}
+
+
+def analysis_payload(content, analytics):
+    return {"success": True, "analysis": content, "analytics": analytics}
+
+
+# ---------- Background jobs ----------
+def job_needs_upstream(job_type, data):
+    return not (job_type == "analysis" and not narrative_requested(data))
+
+
+def check_job(store, job_type, data):
+    """Reject bad job bodies at submit time (unknown ids, too few articles); blocking."""
+    if job_type == "social":
+        store.article_from_request(data)
+    else:
+        articles = store.articles_from_request(data)
+        if job_type == "series":
+            series_messages_from_request(data, articles)
@@ -0,0 +1,244 @@
+# ================================
+# Job store (jobs.py)
+# ================================
+"""
+SQLite store for background generation jobs (POST /jobs).
+
+A job is a request body for one of the long-running generations (a social
+post, a content series or an analysis). The API answers POST /jobs at once
+with the job id. A worker pool runs the job and stores its result here. The
+caller polls GET /jobs/<id> for the result, even after its own timeouts.
+
+Status goes queued -> running -> succeeded | failed, or -> cancelled from
+queued/running (a cancelled job's result is discarded). Finished jobs are
+kept for JOB_TTL seconds. All worker processes share the file, so any of
+them can answer a poll or a cancel. Jobs left queued/running by a process
+that has died are marked failed when the next process starts. A process is
+identified by pid, start time and a random token, so a pid reused after a
+container restart does not keep a dead process's jobs "running".
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from prompts import InvalidRequest
+
+JOB_TYPES = ("social", "series", "analysis")
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = (
+    "queued", "running", "succeeded", "failed", "cancelled"
+)
+ACTIVE = (QUEUED, RUNNING)
+
+PURGE_INTERVAL = 60.0
+
+
+class UnknownJob(KeyError):
+    """Raised when a job id is not stored (or has expired)."""
+
+    def __init__(self, job_id):
+        super().__init__(job_id)
+        self.job_id = job_id
+
+    def __str__(self):
+        return f"Unknown job id: {self.job_id}"
+
+
+def job_request(data):
+    """Split a POST /jobs body into (job type, generation request body)."""
+    data = dict(data)
+    job_type = data.pop("type", None)
+    if job_type not in JOB_TYPES:
+        raise InvalidRequest(f"Job type must be one of: {', '.join(JOB_TYPES)}")
+    return job_type, data
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_started(pid):
+    """Start time of `pid` in clock ticks since boot (Linux /proc), or "-" if unknown."""
+    try:
+        with open(f"/proc/{pid}/stat", encoding="ascii", errors="replace") as f:
+            return f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return "-"
+
+
+# This process's job owner: host, pid, process start time and a random token,
+# so a pid reused after a restart (often PID 1 in a container) is not mistaken
+# for the process that queued the job
+PROCESS_OWNER = ":".join(
+    (socket.gethostname(), str(os.getpid()), _process_started(os.getpid()), uuid.uuid4().hex[:12])
+)
+
+
+def _owner_alive(owner):
+    """Whether the process that wrote `owner` (on this host) still runs."""
+    if owner == PROCESS_OWNER:
+        return True
+    parts = owner.split(":")
+    pid = int(parts[1])
+    if pid == os.getpid():
+        return False  # same pid, different process (or an older instance of it)
+    if not _pid_alive(pid):
+        return False
+    # host:pid:start:token; owners written before the start time was stored
+    # can only be checked by pid
+    return len(parts) < 3 or parts[2] == "-" or parts[2] == _process_started(pid)
+
+
+class JobStore:
+    def __init__(self, path="jobs.db", ttl=86400.0):
+        self.path = path
+        self.ttl = float(ttl)
+        self.owner = PROCESS_OWNER
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                status TEXT NOT NULL,
+                request TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                error_kind TEXT,
+                owner TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+            CREATE INDEX IF NOT EXISTS idx_jobs_expires ON jobs(expires_at);
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _to_dict(row):
+        job = {
+            k: row[k]
+            for k in ("id", "type", "status", "created_at", "started_at", "finished_at", "expires_at")
+        }
+        if row["status"] == SUCCEEDED:
+            job["result"] = json.loads(row["result"])
+        elif row["error"]:
+            job["error"] = row["error"]
+            job["error_kind"] = row["error_kind"]
+        return job
+
+    def create(self, job_type, request):
+        """Store a queued job and return it."""
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, type, status, request, owner, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, job_type, QUEUED, json.dumps(request), self.owner, now, now + self.ttl),
+            )
+            self._conn.commit()
+        self.purge_expired()
+        return self.get(job_id)
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE id = ? AND expires_at > ?", (job_id, time.time())
+            ).fetchone()
+        if row is None:
+            raise UnknownJob(job_id)
+        return self._to_dict(row)
+
+    def _transition(self, job_id, from_statuses, status, finished=False, **fields):
+        now = time.time()
+        sets = {"status": status, **fields}
+        if finished:
+            sets.update(finished_at=now, expires_at=now + self.ttl)
+        assignments = ", ".join(f"{k} = ?" for k in sets)
+        placeholders = ",".join("?" * len(from_statuses))
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ? AND status IN ({placeholders})",
+                (*sets.values(), job_id, *from_statuses),
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def start(self, job_id):
+        """Mark a queued job running; False if it was cancelled meanwhile."""
+        return self._transition(job_id, (QUEUED,), RUNNING, started_at=time.time())
+
+    def finish(self, job_id, result):
+        return self._transition(
+            job_id, (RUNNING,), SUCCEEDED, finished=True, result=json.dumps(result)
+        )
+
+    def fail(self, job_id, error, kind):
+        return self._transition(
+            job_id, (RUNNING,), FAILED, finished=True, error=str(error), error_kind=kind
+        )
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns (cancelled?, job)."""
+        cancelled = self._transition(job_id, ACTIVE, CANCELLED, finished=True)
+        return cancelled, self.get(job_id)
+
+    def purge_expired(self, force=False):
+        """Delete expired jobs (at most once per PURGE_INTERVAL unless forced)."""
+        now = time.time()
+        if not force and now - self._last_purge < PURGE_INTERVAL:
+            return 0
+        self._last_purge = now
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM jobs WHERE expires_at <= ?", (now,))
+            self._conn.commit()
+        return cursor.rowcount
+
+    def recover_orphans(self):
+        """Fail active jobs owned by processes on this host that no longer run."""
+        host = socket.gethostname()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, owner FROM jobs WHERE status IN (?, ?) AND owner LIKE ?",
+                (*ACTIVE, f"{host}:%"),
+            ).fetchall()
+        orphans = [row["id"] for row in rows if not _owner_alive(row["owner"])]
+        for job_id in orphans:
+            self._transition(
+                job_id, ACTIVE, FAILED, finished=True,
+                error="Interrupted by a server restart; submit the job again",
+                error_kind="interrupted",
+            )
+        return len(orphans)
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) AS n FROM jobs WHERE expires_at > ? GROUP BY status",
+                (time.time(),),
+            ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+def job_store_from_env():
+    return JobStore(
+        os.getenv("JOB_STORE_PATH", "jobs.db"), float(os.getenv("JOB_TTL", "86400"))
+    )
@@ -0,0 +1,97 @@
+# ================================
+# Tolerant JSON parsing (json_salvage.py)
+# ================================
+"""
+Incremental parser for the JSON array of articles that /generate_news asks
+the model for.
+
+It scans text as it arrives and yields every complete top-level object of the
+first array it sees, so:
+- a streamed completion hands over articles one by one before the array ends;
+- truncated output (e.g. cut off by max_tokens) still yields every article
+  that was finished;
+- markdown fences, leading commentary and a {"articles": [...]} wrapper (the
+  structured-output shape) are skipped over.
+"""
+import json
+import re
+
+_FENCE_RE = re.compile(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$")
+
+
+def strip_code_fences(text):
+    return _FENCE_RE.sub("", text or "")
+
+
+class ArticleStreamParser:
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._obj_start = None
+        self.count = 0
+
+    def feed(self, text):
+        """Add more text; return the article dicts completed by it."""
+        if self._finished or not text:
+            return []
+        self._buf += text
+        found = []
+        buf = self._buf
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if not self._started:
+                if ch == "[":
+                    self._started = True
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+                if self._depth == 1:
+                    self._obj_start = i
+            elif ch == "}" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    item = self._load(buf[self._obj_start:i + 1])
+                    if isinstance(item, dict):
+                        found.append(item)
+                    self._obj_start = None
+            elif ch == "]" and self._depth == 0:
+                self._finished = True
+                break
+            i += 1
+        self._pos = i
+
+        # Drop text that can no longer be part of a pending object
+        keep_from = self._obj_start if self._obj_start is not None else self._pos
+        self._buf = buf[keep_from:]
+        self._pos -= keep_from
+        if self._obj_start is not None:
+            self._obj_start = 0
+
+        self.count += len(found)
+        return found
+
+    @staticmethod
+    def _load(text):
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+
+
+def salvage_articles(text):
+    """Every complete article object found in `text` (possibly truncated)."""
+    return ArticleStreamParser().feed(text)
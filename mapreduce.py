@@ -0,0 +1,269 @@
+# ================================
+# Map/reduce digests (mapreduce.py)
+# ================================
+"""
+Digest article sets that are too large for one series/analysis prompt.
+
+Instead of keeping only the first few articles, the list is split into
+token-bounded chunks, each chunk is condensed by a cheap model (map, run
+concurrently, at most MAPREDUCE_CONCURRENCY calls per request and never more
+than the upstream concurrency limit the admission controller has currently
+adapted to), and the partial digests are merged a few at
+a time (reduce) until one digest is left. The final series/narrative prompt
+is then built from that digest (prompts.build_series_messages(digest=...)).
+
+Every node is cached by the content of its inputs, so a re-run after a few
+articles were added only recomputes the chunks they landed in and the merges
+above them:
+- chunk boundaries are content-defined (an article whose content hash hits
+  1 in MAPREDUCE_CHUNK_ITEMS ends its chunk, as does the token budget), so an
+  insertion does not shift every later chunk;
+- digests are grouped for merging the same way (1 in MAPREDUCE_FANIN, at
+  least 2 and at most 2 * MAPREDUCE_FANIN per group), which also keeps the
+  number of levels logarithmic.
+
+Requests with more articles than one prompt covers use it by default; send
+"map_reduce": false (or set MAPREDUCE_ENABLED=0) to keep the old cutoff.
+"""
+import asyncio
+import contextvars
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from article_store import content_hash
+from prompt_budget import count_tokens, fit_text
+from prompts import build_digest_messages, build_merge_messages
+from response_cache import HIT, MemoryBackend, ResponseCache, SQLiteBackend, make_cache_key
+
+# Per-article share of a chunk and the size of one digest (tokens)
+ITEM_TOKENS = 120
+DIGEST_MAX_TOKENS = 500
+
+
+def map_reduce_requested(data, articles, max_items):
+    """True when `articles` exceed what one prompt covers and the request allows it."""
+    if len(articles) <= max_items:
+        return False
+    default = os.getenv("MAPREDUCE_ENABLED", "1").lower() in ("1", "true", "yes")
+    value = data.get("map_reduce", default)
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def _cut_here(digest_hex, every):
+    return every <= 1 or int(digest_hex[:8], 16) % every == 0
+
+
+def chunk_articles(articles, max_tokens=1500, target_items=8):
+    """Split articles into token-bounded chunks with content-defined boundaries."""
+    chunks, current, tokens = [], [], 0
+    for article in articles:
+        if not isinstance(article, dict):
+            continue
+        item = {
+            "title": str(article.get("title") or ""),
+            "description": fit_text(article.get("description"), ITEM_TOKENS),
+        }
+        size = count_tokens(item["title"]) + count_tokens(item["description"]) + 4
+        if current and tokens + size > max_tokens:
+            chunks.append(current)
+            current, tokens = [], 0
+        current.append(item)
+        tokens += size
+        if len(current) >= 2 and _cut_here(content_hash(article), target_items):
+            chunks.append(current)
+            current, tokens = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def group_digests(digests, fanin=4):
+    """Content-defined groups of 2..2*fanin digests (one group when <= fanin)."""
+    if len(digests) <= fanin:
+        return [list(digests)]
+    groups, current = [], []
+    for digest in digests:
+        current.append(digest)
+        key = hashlib.sha1(digest.encode("utf-8")).hexdigest()
+        if len(current) >= 2 and (_cut_here(key, fanin) or len(current) >= 2 * fanin):
+            groups.append(current)
+            current = []
+    if len(current) == 1 and groups:
+        groups[-1].extend(current)
+    elif current:
+        groups.append(current)
+    return groups
+
+
+def _node_key(focus, stage, parts):
+    raw = "\x00".join(parts)
+    return make_cache_key("mapreduce", focus, stage, hashlib.sha1(raw.encode("utf-8")).hexdigest())
+
+
+class _MapReduce:
+    """Chunking, node cache and counters shared by the thread and asyncio reducers."""
+
+    def __init__(self, complete, cache, chunk_tokens=1500, chunk_items=8, fanin=4,
+                 concurrency=8, limit=None):
+        self.complete = complete  # messages -> digest text
+        self.limit = limit  # () -> current upstream concurrency limit (AIMD), or None
+        self.cache = cache
+        self.chunk_tokens = int(chunk_tokens)
+        self.chunk_items = max(1, int(chunk_items))
+        self.fanin = max(2, int(fanin))
+        self.concurrency = max(1, int(concurrency))
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.computed = 0
+        self.cached = 0
+        self.last = {}
+
+    def width(self):
+        """Digest calls one run may have in flight right now."""
+        width = self.concurrency
+        if self.limit is not None:
+            width = min(width, int(self.limit()))
+        return max(1, width)
+
+    def _map_nodes(self, articles, focus):
+        return [
+            (_node_key(focus, "map", [content_hash(a) for a in chunk]),
+             build_digest_messages(chunk, focus), "map")
+            for chunk in chunk_articles(articles, self.chunk_tokens, self.chunk_items)
+        ]
+
+    def _reduce_nodes(self, digests, focus):
+        return [
+            (_node_key(focus, "reduce", group), build_merge_messages(group, focus), "reduce")
+            for group in group_digests(digests, self.fanin)
+        ]
+
+    def _cached(self, key, stage):
+        value, state, _ = self.cache.get(key)
+        if state == HIT:
+            metrics.mapreduce_nodes_total.inc(stage, "cached")
+            with self._lock:
+                self.cached += 1
+            return value
+        return None
+
+    def _store(self, key, stage, text):
+        self.cache.set(key, text)
+        metrics.mapreduce_nodes_total.inc(stage, "computed")
+        with self._lock:
+            self.computed += 1
+        return text
+
+    def _finish(self, articles, chunks, levels, width):
+        with self._lock:
+            self.runs += 1
+            self.last = {"articles": len(articles), "chunks": chunks, "levels": levels,
+                         "concurrency": width}
+
+    def stats(self):
+        with self._lock:
+            nodes = self.computed + self.cached
+            return {
+                "runs": self.runs,
+                "nodes_computed": self.computed,
+                "nodes_cached": self.cached,
+                "node_hit_ratio": round(self.cached / nodes, 4) if nodes else 0.0,
+                "last_run": dict(self.last),
+                "chunk_tokens": self.chunk_tokens,
+                "chunk_items": self.chunk_items,
+                "fanin": self.fanin,
+                "concurrency": self.concurrency,
+                "width": self.width(),
+                "cache": self.cache.stats(),
+            }
+
+
+class MapReducer(_MapReduce):
+    """Thread-pool reducer for the Flask server (`complete` is blocking)."""
+
+    def _node(self, node):
+        key, messages, stage = node
+        cached = self._cached(key, stage)
+        if cached is not None:
+            return cached
+        return self._store(key, stage, self.complete(messages))
+
+    def _run_nodes(self, pool, nodes):
+        # Each node runs in a copy of the caller's context, so per-request
+        # state (the request's upstream clock in metrics) follows it
+        futures = [pool.submit(contextvars.copy_context().run, self._node, n) for n in nodes]
+        return [f.result() for f in futures]
+
+    def digest(self, articles, focus):
+        """One digest of all `articles` for `focus` ("series" or "analysis")."""
+        nodes = self._map_nodes(articles, focus)
+        chunks, levels, width = len(nodes), 1, self.width()
+        with ThreadPoolExecutor(max_workers=width, thread_name_prefix="mapreduce") as pool:
+            digests = self._run_nodes(pool, nodes)
+            while len(digests) > 1:
+                digests = self._run_nodes(pool, self._reduce_nodes(digests, focus))
+                levels += 1
+        self._finish(articles, chunks, levels, width)
+        return digests[0] if digests else ""
+
+
+class AsyncMapReducer(_MapReduce):
+    """asyncio reducer for the Quart server (`complete` is a coroutine function)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # A SQLite node cache blocks, so it is read and written in a thread
+        self._blocking = isinstance(self.cache.backend, SQLiteBackend)
+
+    async def _cache_call(self, method, *args):
+        if self._blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def _node(self, node, slots):
+        key, messages, stage = node
+        cached = await self._cache_call(self._cached, key, stage)
+        if cached is not None:
+            return cached
+        async with slots:
+            text = await self.complete(messages)
+        return await self._cache_call(self._store, key, stage, text)
+
+    async def digest(self, articles, focus):
+        nodes = self._map_nodes(articles, focus)
+        chunks, levels, width = len(nodes), 1, self.width()
+        slots = asyncio.Semaphore(width)
+        digests = list(await asyncio.gather(*(self._node(n, slots) for n in nodes)))
+        while len(digests) > 1:
+            nodes = self._reduce_nodes(digests, focus)
+            digests = list(await asyncio.gather(*(self._node(n, slots) for n in nodes)))
+            levels += 1
+        self._finish(articles, chunks, levels, width)
+        return digests[0] if digests else ""
+
+
+def chunk_cache_from_env():
+    """Node cache: in memory, or SQLite (CHUNK_CACHE_PATH) when CACHE_BACKEND=sqlite."""
+    max_entries = int(os.getenv("CHUNK_CACHE_MAX_ENTRIES", "2048"))
+    if os.getenv("CACHE_BACKEND", "memory").lower() == "sqlite":
+        backend = SQLiteBackend(os.getenv("CHUNK_CACHE_PATH", "chunk_cache.db"), max_entries)
+    else:
+        backend = MemoryBackend(max_entries)
+    return ResponseCache(backend, ttl=float(os.getenv("CHUNK_CACHE_TTL", "86400")), stale_ttl=0)
+
+
+def mapreduce_from_env(cls, complete, limit=None):
+    return cls(
+        complete,
+        chunk_cache_from_env(),
+        chunk_tokens=int(os.getenv("MAPREDUCE_CHUNK_TOKENS", "1500")),
+        chunk_items=int(os.getenv("MAPREDUCE_CHUNK_ITEMS", "8")),
+        fanin=int(os.getenv("MAPREDUCE_FANIN", "4")),
+        concurrency=int(os.getenv("MAPREDUCE_CONCURRENCY", "8")),
+        limit=limit,
+    )
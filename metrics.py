@@ -0,0 +1,310 @@
+# ================================
+# Prometheus-style metrics (metrics.py)
+# ================================
+"""
+Minimal, dependency-free metrics registry rendered in the Prometheus text
+exposition format at /metrics.
+
+What is recorded:
+- per-route request counts (by status) and latency histograms
+- upstream LLM latency per model vs. local overhead per route
+- calls per routed backend and hedged requests
+- time spent in local stages (prompt building, JSON parsing)
+- prompt/completion token counts per model
+- in-flight gauges for routes and upstream calls
+- error counters by class (upstream timeout, invalid JSON, missing key, ...)
+- how often the news JSON had to be salvaged from malformed output
+- admission control: rejections by reason, queue depth and the adaptive limit
+- background jobs by type and final status, and how long they ran
+- map/reduce digest nodes by stage, computed vs. served from the node cache
+"""
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs += [f'{n}="{_escape(v)}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labelvalues, amount=1.0):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0.0)
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labelvalues)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labelvalues, amount=1.0):
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value, *labelvalues):
+        with self._lock:
+            self._values[labelvalues] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, *labelvalues):
+        with self._lock:
+            state = self._values.get(labelvalues)
+            if state is None:
+                state = self._values[labelvalues] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            for labelvalues, (counts, total, count) in sorted(self._values.items()):
+                for bound, n in zip(self.buckets, counts):
+                    le = _labels(self.labelnames, labelvalues, (("le", bound),))
+                    lines.append(f"{self.name}_bucket{le} {n}")
+                inf = _labels(self.labelnames, labelvalues, (("le", "+Inf"),))
+                lines.append(f"{self.name}_bucket{inf} {count}")
+                base = _labels(self.labelnames, labelvalues)
+                lines.append(f"{self.name}_sum{base} {total}")
+                lines.append(f"{self.name}_count{base} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+requests_total = REGISTRY.register(
+    Counter("news_api_requests_total", "HTTP requests by route, method and status.",
+            ("route", "method", "status"))
+)
+request_seconds = REGISTRY.register(
+    Histogram("news_api_request_seconds", "End-to-end request latency by route.", ("route",))
+)
+requests_in_flight = REGISTRY.register(
+    Gauge("news_api_requests_in_flight", "Requests currently being handled.", ("route",))
+)
+upstream_seconds = REGISTRY.register(
+    Histogram("news_api_upstream_seconds", "Upstream LLM call latency by model.", ("model",))
+)
+upstream_in_flight = REGISTRY.register(
+    Gauge("news_api_upstream_in_flight", "Upstream LLM calls in flight.", ("model",))
+)
+local_overhead_seconds = REGISTRY.register(
+    Histogram("news_api_local_overhead_seconds",
+              "Request latency not spent waiting on the upstream LLM.", ("route",))
+)
+stage_seconds = REGISTRY.register(
+    Histogram("news_api_stage_seconds", "Local processing stages (prompt_build, json_parse).",
+              ("stage",), buckets=FAST_BUCKETS)
+)
+tokens_total = REGISTRY.register(
+    Counter("news_api_llm_tokens_total", "LLM tokens by model and kind (prompt/completion).",
+            ("model", "kind"))
+)
+backend_calls_total = REGISTRY.register(
+    Counter("news_api_backend_calls_total",
+            "Upstream calls per routed backend by outcome (ok or error class).",
+            ("backend", "outcome"))
+)
+hedged_requests_total = REGISTRY.register(
+    Counter("news_api_hedged_requests_total",
+            "Hedged upstream requests by endpoint (fired / won by the hedge).",
+            ("endpoint", "outcome"))
+)
+news_parse_total = REGISTRY.register(
+    Counter("news_api_news_parse_total",
+            "Parsed /generate_news completions by outcome (clean/salvaged).", ("outcome",))
+)
+admission_rejected_total = REGISTRY.register(
+    Counter("news_api_admission_rejected_total",
+            "Refused by admission control by route (rate buckets) or upstream endpoint "
+            "(concurrency slots) and reason.", ("route", "reason"))
+)
+admission_in_flight = REGISTRY.register(
+    Gauge("news_api_admission_in_flight", "Upstream calls holding an admission slot.")
+)
+admission_queue_depth = REGISTRY.register(
+    Gauge("news_api_admission_queue_depth", "Upstream calls waiting for an admission slot.")
+)
+admission_limit = REGISTRY.register(
+    Gauge("news_api_admission_limit", "Current adaptive concurrency limit.")
+)
+jobs_total = REGISTRY.register(
+    Counter("news_api_jobs_total", "Background jobs by type and final status.",
+            ("type", "status"))
+)
+job_seconds = REGISTRY.register(
+    Histogram("news_api_job_seconds", "Background job run time by type.", ("type",))
+)
+jobs_pending = REGISTRY.register(
+    Gauge("news_api_jobs_pending", "Background jobs queued or running in this process.")
+)
+mapreduce_nodes_total = REGISTRY.register(
+    Counter("news_api_mapreduce_nodes_total",
+            "Map/reduce digest nodes by stage (map/reduce) and outcome (computed/cached).",
+            ("stage", "outcome"))
+)
+errors_total = REGISTRY.register(
+    Counter("news_api_errors_total", "Failed requests by route and error class.",
+            ("route", "kind"))
+)
+
+
+def classify_error(error):
+    """Map an exception to a stable error-class label."""
+    name = type(error).__name__
+    if name in ("APITimeoutError", "TimeoutError", "ReadTimeout", "ConnectTimeout"):
+        return "upstream_timeout"
+    if name == "RateLimitError":
+        return "upstream_rate_limit"
+    if name == "APIConnectionError":
+        return "upstream_connection"
+    if name in ("APIStatusError", "APIError", "InternalServerError", "BadRequestError",
+                "AuthenticationError", "PermissionDeniedError", "NotFoundError"):
+        return "upstream_error"
+    if name == "InvalidGPTJSON":
+        return "invalid_json"
+    if name == "UnknownArticle":
+        return "unknown_article"
+    if name == "UnknownJob":
+        return "unknown_job"
+    if isinstance(error, KeyError):
+        return "missing_key"
+    if isinstance(error, (ValueError, TypeError)):
+        return "bad_request"
+    return "internal"
+
+
+def record_error(route, error):
+    kind = error if isinstance(error, str) else classify_error(error)
+    errors_total.inc(route or "unknown", kind)
+
+
+def record_usage(model, usage):
+    if usage is None:
+        return
+    tokens_total.inc(model, "prompt", amount=getattr(usage, "prompt_tokens", 0) or 0)
+    tokens_total.inc(model, "completion", amount=getattr(usage, "completion_tokens", 0) or 0)
+
+
+@contextmanager
+def stage_timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(time.perf_counter() - start, stage)
+
+
+@contextmanager
+def upstream_timer(model):
+    upstream_in_flight.inc(model)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        upstream_seconds.observe(time.perf_counter() - start, model)
+        upstream_in_flight.dec(model)
+
+
+class UpstreamClock:
+    """
+    Wall time one request spent waiting on the upstream. Concurrent calls
+    (batch items, map/reduce nodes) count once, for as long as any of them
+    runs, so the remainder of the request is its local overhead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = 0
+        self._since = 0.0
+        self.seconds = 0.0
+
+    @contextmanager
+    def timing(self):
+        with self._lock:
+            if not self._running:
+                self._since = time.perf_counter()
+            self._running += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._running -= 1
+                if not self._running:
+                    self.seconds += time.perf_counter() - self._since
+
+
+# The serving request's clock. Worker threads see it when they run in a copy
+# of the request's context (contextvars.copy_context().run); asyncio tasks
+# inherit it.
+request_upstream = ContextVar("request_upstream", default=None)
+
+
+def upstream_wait():
+    """Time a call into the current request's UpstreamClock (no-op outside requests)."""
+    clock = request_upstream.get()
+    return clock.timing() if clock is not None else nullcontext()
+
+
+def render():
+    return REGISTRY.render()
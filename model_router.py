@@ -0,0 +1,345 @@
+# ================================
+# Model routing (model_router.py)
+# ================================
+"""
+Per-endpoint routing of completions over an ordered list of backends.
+
+A backend is a model name, optionally on another OpenAI-compatible server
+(`base_url`, e.g. a local vLLM/Ollama endpoint). For each endpoint
+(news, social, series, analysis, and digest for map/reduce chunks):
+- backends are tried in order; a timeout or error fails over to the next;
+- with hedging on, a second request is sent to the next backend (or the same
+  one if there is only one) when the first has not answered by its observed
+  p95 latency, and the first response wins;
+- each backend keeps a window of recent latencies and its error streak; a
+  backend that fails repeatedly is moved to the back for a cooldown, and the
+  "fastest" strategy orders healthy backends by p95.
+
+Without configuration every endpoint uses the model the route passes in on
+the default client, so behaviour is unchanged. Configure with MODEL_ROUTES
+(JSON) or MODEL_ROUTES_FILE:
+
+    {"social": {"backends": ["gpt-4.1",
+                             {"model": "llama3.1", "base_url": "http://localhost:11434/v1"}],
+                "timeout": 20, "hedge": true},
+     "news": ["gpt-4.1-nano", "gpt-4.1-mini"]}
+"""
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from urllib.parse import urlparse
+
+import metrics
+
+EJECT_AFTER_ERRORS = 3
+EJECT_SECONDS = 30.0
+MIN_SAMPLES = 20
+
+
+class Backend:
+    def __init__(self, model, client, base_url=None):
+        self.model = model
+        self.base_url = base_url
+        self.client = client  # zero-arg callable returning the SDK client
+        host = urlparse(base_url).netloc if base_url else "openai"
+        self.name = f"{model}@{host}"
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=200)
+        self.calls = 0
+        self.errors = 0
+        self.error_streak = 0
+        self.ejected_until = 0.0
+
+    def record(self, seconds, error=None):
+        with self._lock:
+            self.calls += 1
+            if error is None:
+                self._latencies.append(seconds)
+                self.error_streak = 0
+            else:
+                self.errors += 1
+                self.error_streak += 1
+                if self.error_streak >= EJECT_AFTER_ERRORS:
+                    self.ejected_until = time.monotonic() + EJECT_SECONDS
+        outcome = "ok" if error is None else metrics.classify_error(error)
+        metrics.backend_calls_total.inc(self.name, outcome)
+
+    def percentile(self, q):
+        """Latency quantile of recent successes, or None with too few samples."""
+        with self._lock:
+            samples = sorted(self._latencies)
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(math.ceil(q * len(samples))) - 1)]
+
+    def healthy(self, now):
+        return now >= self.ejected_until
+
+    def stats(self):
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "backend": self.name,
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_streak": self.error_streak,
+            "ejected": not self.healthy(time.monotonic()),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class Route:
+    def __init__(self, endpoint, backends, timeout=None, hedge=False, hedge_after=5.0,
+                 hedge_quantile=0.95, strategy="ordered"):
+        self.endpoint = endpoint
+        self.backends = backends
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.hedge_quantile = hedge_quantile
+        self.strategy = strategy
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+
+class _Router:
+    """Route table, backend selection and stats shared by both servers."""
+
+    def __init__(self, config, client_factory, default_client, hedge_default=False):
+        self.config = config or {}
+        self.client_factory = client_factory  # (base_url, api_key) -> client
+        self.default_client = default_client  # () -> the server's main client
+        self.hedge_default = hedge_default
+        self._lock = threading.Lock()
+        self._routes = {}
+        self._clients = {}
+
+    def _client_for(self, base_url, api_key_env):
+        if not base_url and not api_key_env:
+            return self.default_client
+
+        def client():
+            key = (base_url, api_key_env)
+            with self._lock:
+                if key not in self._clients:
+                    api_key = os.getenv(api_key_env) if api_key_env else None
+                    self._clients[key] = self.client_factory(base_url, api_key)
+                return self._clients[key]
+
+        return client
+
+    def clients(self):
+        """Clients created for non-default backends (to close on shutdown)."""
+        with self._lock:
+            return list(self._clients.values())
+
+    def route(self, endpoint, default_model):
+        with self._lock:
+            route = self._routes.get(endpoint)
+        if route is not None:
+            return route
+
+        spec = self.config.get(endpoint) or [default_model]
+        if isinstance(spec, list):
+            spec = {"backends": spec}
+        backends = []
+        for entry in spec.get("backends") or [default_model]:
+            if isinstance(entry, str):
+                entry = {"model": entry}
+            backends.append(
+                Backend(
+                    entry.get("model", default_model),
+                    self._client_for(entry.get("base_url"), entry.get("api_key_env")),
+                    entry.get("base_url"),
+                )
+            )
+        route = Route(
+            endpoint,
+            backends,
+            timeout=spec.get("timeout"),
+            hedge=spec.get("hedge", self.hedge_default),
+            hedge_after=float(spec.get("hedge_after", 5.0)),
+            hedge_quantile=float(spec.get("hedge_quantile", 0.95)),
+            strategy=spec.get("strategy", "ordered"),
+        )
+        with self._lock:
+            return self._routes.setdefault(endpoint, route)
+
+    def candidates(self, route):
+        """Healthy backends first (config order, or by p95 for "fastest")."""
+        now = time.monotonic()
+        healthy = [b for b in route.backends if b.healthy(now)]
+        if route.strategy == "fastest":
+            healthy.sort(key=lambda b: b.percentile(0.95) or float("inf"))
+        return healthy + [b for b in route.backends if not b.healthy(now)]
+
+    def pick(self, endpoint, default_model):
+        """The backend a streaming request should use (no hedging for streams)."""
+        return self.candidates(self.route(endpoint, default_model))[0]
+
+    def hedge_delay(self, route, backend):
+        return backend.percentile(route.hedge_quantile) or route.hedge_after
+
+    def stats(self):
+        with self._lock:
+            routes = list(self._routes.values())
+        return {
+            route.endpoint: {
+                "hedge": route.hedge,
+                "timeout": route.timeout,
+                "hedges": route.hedges,
+                "hedge_wins": route.hedge_wins,
+                "failovers": route.failovers,
+                "backends": [b.stats() for b in route.backends],
+            }
+            for route in routes
+        }
+
+
+class ModelRouter(_Router):
+    """Thread-based routing for the threaded Flask server."""
+
+    def __init__(self, *args, max_hedge_workers=128, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool = ThreadPoolExecutor(max_hedge_workers, thread_name_prefix="hedge")
+
+    def _attempt(self, route, backend, create_kwargs, call):
+        start = time.monotonic()
+        try:
+            resp = call(backend, {**create_kwargs, "model": backend.model}, route.timeout)
+        except Exception as e:
+            backend.record(time.monotonic() - start, e)
+            raise
+        backend.record(time.monotonic() - start)
+        return resp
+
+    def _failover(self, route, backends, create_kwargs, call, error=None):
+        for i, backend in enumerate(backends):
+            if i or error is not None:
+                route.failovers += 1
+            try:
+                return self._attempt(route, backend, create_kwargs, call)
+            except Exception as e:
+                error = e
+        raise error
+
+    def complete(self, endpoint, default_model, create_kwargs, call):
+        """
+        Run call(backend, kwargs, timeout) with failover (and hedging when on)
+        across the endpoint's backends; returns the first successful response.
+        """
+        route = self.route(endpoint, default_model)
+        backends = self.candidates(route)
+        if not route.hedge:
+            return self._failover(route, backends, create_kwargs, call)
+
+        primary = backends[0]
+        first = self._pool.submit(self._attempt, route, primary, create_kwargs, call)
+        try:
+            return first.result(timeout=self.hedge_delay(route, primary))
+        except FutureTimeout:
+            pass
+        except Exception as e:
+            return self._failover(route, backends[1:], create_kwargs, call, e)
+
+        secondary = backends[1] if len(backends) > 1 else primary
+        hedge = self._pool.submit(self._attempt, route, secondary, create_kwargs, call)
+        route.hedges += 1
+        metrics.hedged_requests_total.inc(endpoint, "fired")
+        pending, error = {first, hedge}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        route.hedge_wins += 1
+                        metrics.hedged_requests_total.inc(endpoint, "won")
+                    return future.result()
+                error = future.exception()
+        return self._failover(route, backends[2:], create_kwargs, call, error)
+
+
+class AsyncModelRouter(_Router):
+    """Asyncio routing for async_api.py; the losing hedge is cancelled."""
+
+    async def _attempt(self, route, backend, create_kwargs, call):
+        start = time.monotonic()
+        try:
+            resp = await call(backend, {**create_kwargs, "model": backend.model}, route.timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            backend.record(time.monotonic() - start, e)
+            raise
+        backend.record(time.monotonic() - start)
+        return resp
+
+    async def _failover(self, route, backends, create_kwargs, call, error=None):
+        for i, backend in enumerate(backends):
+            if i or error is not None:
+                route.failovers += 1
+            try:
+                return await self._attempt(route, backend, create_kwargs, call)
+            except Exception as e:
+                error = e
+        raise error
+
+    async def complete(self, endpoint, default_model, create_kwargs, call):
+        route = self.route(endpoint, default_model)
+        backends = self.candidates(route)
+        if not route.hedge:
+            return await self._failover(route, backends, create_kwargs, call)
+
+        primary = backends[0]
+        first = asyncio.ensure_future(self._attempt(route, primary, create_kwargs, call))
+        try:
+            done, _ = await asyncio.wait({first}, timeout=self.hedge_delay(route, primary))
+        except asyncio.CancelledError:
+            first.cancel()
+            raise
+        if done:
+            if first.exception() is None:
+                return first.result()
+            return await self._failover(
+                route, backends[1:], create_kwargs, call, first.exception()
+            )
+
+        secondary = backends[1] if len(backends) > 1 else primary
+        hedge = asyncio.ensure_future(self._attempt(route, secondary, create_kwargs, call))
+        route.hedges += 1
+        metrics.hedged_requests_total.inc(endpoint, "fired")
+        pending, error = {first, hedge}, None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            route.hedge_wins += 1
+                            metrics.hedged_requests_total.inc(endpoint, "won")
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        return await self._failover(route, backends[2:], create_kwargs, call, error)
+
+
+def router_config_from_env():
+    """Route table from MODEL_ROUTES (JSON) or the JSON file at MODEL_ROUTES_FILE."""
+    path = os.getenv("MODEL_ROUTES_FILE")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return json.loads(os.getenv("MODEL_ROUTES") or "{}")
+
+
+def hedge_default_from_env():
+    return os.getenv("HEDGE_REQUESTS", "0").lower() in ("1", "true", "yes")
@@ -0,0 +1,241 @@
+# ================================
+# Cache pre-warming (prewarm.py)
+# ================================
+"""
+Background scheduler that keeps /generate_news answers warm.
+
+The UI offers a fixed country x category grid, so the whole key space is
+known up front. Every `interval` seconds the scheduler regenerates the pairs
+whose cached entry is missing or would expire before the next run, most
+requested first. With an interval well below the cache TTL each pair is
+fetched about once per TTL, spread over several runs. Upstream calls are
+spaced by a rate limit, spread with jitter and capped in concurrency, and
+share the cache's refresh claim so a pair is never fetched twice at once.
+
+Under several worker processes only one of them runs the scheduler (see
+claim_scheduler), and only when they share the SQLite cache.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: no gunicorn workers, so a single process
+    fcntl = None
+
+from response_cache import HIT, make_cache_key
+
+log = logging.getLogger(__name__)
+
+COUNTRIES = ["us", "in", "uk", "ca", "au", "fr", "de", "jp"]
+CATEGORIES = [
+    "general", "technology", "business", "health", "science", "sports", "entertainment",
+]
+
+
+def news_cache_key(country, category, limit, today):
+    return make_cache_key("generate_news", country, category, limit, today)
+
+
+def parse_pairs(spec):
+    """'all' (or empty) -> the full grid; otherwise 'us:technology,in:general'."""
+    if not spec or spec.strip().lower() == "all":
+        return [(country, category) for country in COUNTRIES for category in CATEGORIES]
+    pairs = []
+    for item in spec.split(","):
+        country, _, category = item.strip().partition(":")
+        if country and category:
+            pairs.append((country.lower(), category.lower()))
+    return pairs
+
+
+class Prewarmer:
+    def __init__(
+        self, cache, fetch, pairs=None, limit=5, interval=60.0, top_n=0,
+        rate=0.5, jitter=0.1, max_concurrency=2,
+    ):
+        self.cache = cache
+        self.fetch = fetch  # fetch(country, category, limit, today) -> payload
+        self.pairs = list(pairs) if pairs is not None else parse_pairs("all")
+        self._known = frozenset(self.pairs)
+        self.limit = limit
+        self.interval = float(interval)
+        self.top_n = int(top_n)
+        self.rate = float(rate)
+        self.jitter = float(jitter)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._lock = threading.Lock()
+        self._requests = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.warmed = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_run_seconds = 0.0
+        if self.interval * (1 + self.jitter) >= self.cache.ttl:
+            log.warning(
+                "PREWARM_INTERVAL %.0fs is not below CACHE_TTL %.0fs: every pair is "
+                "fetched on every run", self.interval, self.cache.ttl,
+            )
+
+    def record(self, country, category):
+        """
+        Count a /generate_news request so popular pairs are warmed first.
+        Only pairs this scheduler warms are counted (case-insensitively), so
+        client-supplied strings cannot grow the counter.
+        """
+        pair = (str(country).strip().lower(), str(category).strip().lower())
+        if pair not in self._known:
+            return
+        with self._lock:
+            self._requests[pair] += 1
+
+    def ranked_pairs(self):
+        with self._lock:
+            counts = dict(self._requests)
+        order = {pair: i for i, pair in enumerate(self.pairs)}
+        ranked = sorted(self.pairs, key=lambda p: (-counts.get(p, 0), order[p]))
+        return ranked[: self.top_n] if self.top_n > 0 else ranked
+
+    def _needs_refresh(self, key):
+        # Warm what would go stale before the next run (at its latest, jitter
+        # included); anything fresher is left for a later run
+        state, age = self.cache.peek(key)
+        return state != HIT or age + self.interval * (1 + self.jitter) >= self.cache.ttl
+
+    def _warm(self, country, category, today):
+        key = news_cache_key(country, category, self.limit, today)
+        if not self.cache.begin_refresh(key):
+            with self._lock:
+                self.skipped += 1
+            return
+        try:
+            payload = self.fetch(country, category, self.limit, today)
+        except Exception as e:
+            log.warning("Pre-warm failed for %s/%s: %s", country, category, e)
+            self.cache.end_refresh(key, error=e)
+            with self._lock:
+                self.errors += 1
+        else:
+            self.cache.end_refresh(key, payload)
+            with self._lock:
+                self.warmed += 1
+
+    def run_once(self):
+        """Warm every ranked pair that needs it; returns when all calls finish."""
+        start = time.monotonic()
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+        ranked = self.ranked_pairs()
+        due = [
+            (country, category) for country, category in ranked
+            if self._needs_refresh(news_cache_key(country, category, self.limit, today))
+        ]
+        with self._lock:
+            self.skipped += len(ranked) - len(due)
+
+        spacing = 1.0 / self.rate if self.rate > 0 else 0.0
+        with ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="prewarm") as pool:
+            for i, (country, category) in enumerate(due):
+                if self._stop.is_set():
+                    break
+                if i and spacing:
+                    self._stop.wait(spacing * random.uniform(1 - self.jitter, 1 + self.jitter))
+                pool.submit(self._warm, country, category, today)
+        with self._lock:
+            self.runs += 1
+            self.last_run_seconds = time.monotonic() - start
+
+    def _loop(self):
+        # Start with a random offset so several workers do not fire together
+        self._stop.wait(random.uniform(0, self.jitter * self.interval))
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                log.warning("Pre-warm run failed: %s", e)
+            delay = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            self._stop.wait(delay)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="prewarm", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        with self._lock:
+            top = self._requests.most_common(5)
+            return {
+                "enabled": self._thread is not None,
+                "pairs": len(self.pairs),
+                "top_n": self.top_n,
+                "interval": self.interval,
+                "runs": self.runs,
+                "warmed": self.warmed,
+                "skipped": self.skipped,
+                "errors": self.errors,
+                "last_run_seconds": round(self.last_run_seconds, 3),
+                "most_requested": [
+                    {"country": c, "category": k, "requests": n} for (c, k), n in top
+                ],
+            }
+
+
+def prewarm_enabled():
+    return os.getenv("PREWARM", "0").lower() in ("1", "true", "yes")
+
+
+_scheduler_lock = None
+
+
+def claim_scheduler(cache):
+    """
+    Whether this process should run the scheduler. serve.py exports its
+    worker count as SERVE_WORKERS; with more than one worker, a per-worker
+    memory cache is not warmed at all (each worker would fetch the whole grid
+    for itself), and with the shared SQLite cache only the worker holding
+    PREWARM_LOCK runs it. The lock is released when that worker exits, so its
+    replacement takes over.
+    """
+    global _scheduler_lock
+    workers = int(os.getenv("SERVE_WORKERS", "1"))
+    if workers <= 1 or fcntl is None:
+        return True
+    if cache.backend.name != "sqlite":
+        log.warning(
+            "PREWARM=1 with %d workers needs CACHE_BACKEND=sqlite; not pre-warming", workers
+        )
+        return False
+    if _scheduler_lock is None:
+        lock = open(os.getenv("PREWARM_LOCK", cache.backend.path + ".prewarm.lock"), "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return False
+        _scheduler_lock = lock
+    return True
+
+
+def prewarmer_from_env(cache, fetch):
+    """Build the scheduler from PREWARM_* environment variables (not started)."""
+    return Prewarmer(
+        cache,
+        fetch,
+        pairs=parse_pairs(os.getenv("PREWARM_PAIRS", "all")),
+        limit=int(os.getenv("PREWARM_LIMIT", "5")),
+        interval=float(os.getenv("PREWARM_INTERVAL", "60")),
+        top_n=int(os.getenv("PREWARM_TOP_N", "0")),
+        rate=float(os.getenv("PREWARM_RATE", "0.5")),
+        jitter=float(os.getenv("PREWARM_JITTER", "0.1")),
+        max_concurrency=int(os.getenv("PREWARM_CONCURRENCY", "2")),
+    )
@@ -0,0 +1,103 @@
+# ================================
+# Prompt token budgets (prompt_budget.py)
+# ================================
+"""
+Local token counting and input budgets for the prompt builders.
+
+- count_tokens uses tiktoken when installed and a ~4 chars/token estimate
+  otherwise, so it works without extra dependencies.
+- fit_text shortens oversized text to a token budget, keeping whole leading
+  sentences where possible (a cheap extractive summary) before hard-cutting.
+- completion_max_tokens derives the completion limit from a platform's
+  char_limit instead of a flat 400 tokens.
+"""
+import math
+import os
+import re
+
+CHARS_PER_TOKEN = 4
+
+# Input budgets (tokens) for the variable part of each prompt
+BUDGETS = {
+    "social": int(os.getenv("PROMPT_BUDGET_SOCIAL", "400")),
+    "series": int(os.getenv("PROMPT_BUDGET_SERIES", "1200")),
+    "analysis": int(os.getenv("PROMPT_BUDGET_ANALYSIS", "2000")),
+}
+
+# Per-item floor so one long list cannot squeeze every article to nothing
+MIN_ITEM_TOKENS = 24
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_encoders = {}
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to the character estimate
+    tiktoken = None
+
+
+def _encoder(model):
+    if tiktoken is None:
+        return None
+    if model not in _encoders:
+        try:
+            _encoders[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encoders[model] = tiktoken.get_encoding("o200k_base")
+    return _encoders[model]
+
+
+def count_tokens(text, model="gpt-4.1"):
+    if not text:
+        return 0
+    encoder = _encoder(model)
+    if encoder is not None:
+        return len(encoder.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _cut(text, max_tokens, model):
+    encoder = _encoder(model)
+    if encoder is not None:
+        return encoder.decode(encoder.encode(text)[:max_tokens])
+    cut = text[: max_tokens * CHARS_PER_TOKEN]
+    return cut.rsplit(" ", 1)[0] if " " in cut else cut
+
+
+def fit_text(text, max_tokens, model="gpt-4.1"):
+    """Return `text` shortened to at most `max_tokens` tokens."""
+    text = " ".join(str(text or "").split())
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    kept = []
+    for sentence in _SENTENCE_RE.split(text):
+        candidate = " ".join(kept + [sentence])
+        if count_tokens(candidate, model) > max_tokens - 1:
+            break
+        kept.append(sentence)
+    if kept:
+        return " ".join(kept)
+    return _cut(text, max_tokens - 1, model).rstrip(" ,;:") + "…"
+
+
+def fit_articles(articles, budget, model="gpt-4.1"):
+    """
+    Shorten article descriptions so the list fits `budget` tokens in total.
+    Titles are kept; each article gets an equal share of what remains.
+    """
+    articles = [a for a in articles if isinstance(a, dict)]
+    if not articles:
+        return []
+    title_tokens = sum(count_tokens(str(a.get("title") or ""), model) for a in articles)
+    share = max(MIN_ITEM_TOKENS, (budget - title_tokens) // len(articles))
+    return [
+        {**a, "description": fit_text(a.get("description"), share, model)} for a in articles
+    ]
+
+
+def completion_max_tokens(char_limit, ceiling=400):
+    """Completion budget for a post of `char_limit` characters (plus headroom)."""
+    return min(ceiling, math.ceil(char_limit / CHARS_PER_TOKEN * 1.25) + 24)
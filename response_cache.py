@@ -0,0 +1,257 @@
+# ================================
+# Response cache (response_cache.py)
+# ================================
+"""
+Pluggable response cache used by the API routes.
+
+Two backends are available:
+- MemoryBackend: in-process LRU with a size cap (default).
+- SQLiteBackend: on-disk store that survives restarts.
+
+Entries are fresh for `ttl` seconds and may then be served stale for another
+`stale_ttl` seconds while a background refresh runs (stale-while-revalidate).
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+HIT = "HIT"
+STALE = "STALE"
+MISS = "MISS"
+
+
+def make_cache_key(*parts):
+    """Build a stable cache key from route name and parameters."""
+    return "|".join(str(p).strip().lower() for p in parts)
+
+
+class MemoryBackend:
+    """Thread-safe LRU map of key -> (value, stored_at) with a size cap."""
+
+    name = "memory"
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max(1, int(max_entries))
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                self._data.move_to_end(key)
+            return item
+
+    def set(self, key, value, stored_at):
+        with self._lock:
+            self._data[key] = (value, stored_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """On-disk LRU store; values are JSON-encoded."""
+
+    name = "sqlite"
+
+    def __init__(self, path="response_cache.db", max_entries=5000):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS response_cache (
+                   key TEXT PRIMARY KEY,
+                   value TEXT NOT NULL,
+                   stored_at REAL NOT NULL,
+                   accessed_at REAL NOT NULL
+               )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_response_cache_accessed ON response_cache(accessed_at)"
+        )
+        self._conn.commit()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE response_cache SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, value, stored_at):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), stored_at, time.time()),
+            )
+            overflow = self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+            overflow -= self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM response_cache WHERE key IN ("
+                    "SELECT key FROM response_cache ORDER BY accessed_at ASC LIMIT ?)",
+                    (overflow,),
+                )
+                self.evictions += overflow
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+class ResponseCache:
+    """TTL cache with stale-while-revalidate on top of a storage backend."""
+
+    def __init__(self, backend=None, ttl=300, stale_ttl=600):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = float(ttl)
+        self.stale_ttl = float(stale_ttl)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def get(self, key):
+        """Return (value, state, age_seconds); state is HIT, STALE or MISS."""
+        item = self.backend.get(key)
+        now = time.time()
+        if item is not None:
+            value, stored_at = item
+            age = now - stored_at
+            if age <= self.ttl:
+                with self._lock:
+                    self.hits += 1
+                return value, HIT, age
+            if age <= self.ttl + self.stale_ttl:
+                with self._lock:
+                    self.stale_hits += 1
+                return value, STALE, age
+            self.backend.delete(key)
+        with self._lock:
+            self.misses += 1
+        return None, MISS, 0.0
+
+    def peek(self, key):
+        """Return (state, age_seconds) without touching the hit/miss counters."""
+        item = self.backend.get(key)
+        if item is None:
+            return MISS, 0.0
+        age = time.time() - item[1]
+        if age <= self.ttl:
+            return HIT, age
+        return (STALE if age <= self.ttl + self.stale_ttl else MISS), age
+
+    def set(self, key, value):
+        self.backend.set(key, value, time.time())
+
+    def begin_refresh(self, key):
+        """Claim the refresh of `key`; False if another refresh is in flight."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key, value=None, error=None):
+        with self._lock:
+            self._refreshing.discard(key)
+            if error is not None:
+                self.refresh_errors += 1
+            else:
+                self.refreshes += 1
+        if error is None and value is not None:
+            self.set(key, value)
+
+    def revalidate(self, key, producer):
+        """Refresh `key` in a background thread using `producer()`."""
+        if not self.begin_refresh(key):
+            return
+
+        def _run():
+            try:
+                value = producer()
+            except Exception as e:
+                log.warning("Cache refresh failed for %s: %s", key, e)
+                self.end_refresh(key, error=e)
+            else:
+                self.end_refresh(key, value)
+
+        threading.Thread(target=_run, name="cache-refresh", daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            served = self.hits + self.stale_hits
+            return {
+                "backend": self.backend.name,
+                "entries": len(self.backend),
+                "max_entries": self.backend.max_entries,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+                "evictions": self.backend.evictions,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+            }
+
+
+def cache_from_env():
+    """Build the response cache from CACHE_* environment variables."""
+    backend_name = os.getenv("CACHE_BACKEND", "memory").lower()
+    max_entries = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+    if backend_name == "sqlite":
+        backend = SQLiteBackend(os.getenv("CACHE_PATH", "response_cache.db"), max_entries)
+    else:
+        backend = MemoryBackend(max_entries)
+    return ResponseCache(
+        backend,
+        ttl=float(os.getenv("CACHE_TTL", "300")),
+        stale_ttl=float(os.getenv("CACHE_STALE_TTL", "600")),
+    )
@@ -0,0 +1,191 @@
+# ================================
+# Semantic prompt cache (semantic_cache.py)
+# ================================
+"""
+Near-duplicate cache for /create_social_content.
+
+Articles are fingerprinted locally with MinHash over word shingles of
+title + description (no external services). A stored post is reused when the
+estimated Jaccard similarity to a cached article with the same scope
+(platform, tone and post options) reaches the threshold. Candidates are found
+through LSH banding, so lookups stay cheap as the index grows; the index is
+bounded and evicts least-recently-used entries and expired ones.
+"""
+import itertools
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+
+
+def article_text(article):
+    return f"{article.get('title', '')} {article.get('description', '')}"
+
+
+def social_scope(data):
+    """Cache scope for a social post request: only same-option posts are shared."""
+    return (
+        data.get("platform", "twitter"),
+        data.get("tone", "informative"),
+        bool(data.get("include_hashtags", True)),
+        bool(data.get("include_link", True)),
+        data.get("custom_angle", "") or "",
+    )
+
+
+class MinHasher:
+    def __init__(self, num_perm=64, shingle_size=2, seed=7):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        state = seed
+        self._perms = []
+        for _ in range(num_perm):
+            # Small deterministic LCG so signatures are stable across processes
+            state = (state * 6364136223846793005 + 1442695040888963407) & ((1 << 64) - 1)
+            a = (state >> 3) % _PRIME or 1
+            state = (state * 6364136223846793005 + 1442695040888963407) & ((1 << 64) - 1)
+            b = (state >> 3) % _PRIME
+            self._perms.append((a, b))
+
+    def shingles(self, text):
+        words = _WORD_RE.findall(text.lower())
+        if len(words) < self.shingle_size:
+            return {" ".join(words)} if words else set()
+        return {
+            " ".join(words[i:i + self.shingle_size])
+            for i in range(len(words) - self.shingle_size + 1)
+        }
+
+    def signature(self, text):
+        hashes = [zlib.crc32(s.encode("utf-8")) for s in self.shingles(text)]
+        if not hashes:
+            return None
+        return tuple(
+            min(((a * h + b) % _PRIME) & _MASK for h in hashes) for a, b in self._perms
+        )
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+class SemanticCache:
+    def __init__(self, threshold=0.8, max_entries=2000, ttl=3600, num_perm=64, bands=16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # id -> (scope, signature, payload, source_url, stored_at)
+        self._buckets = {}  # (scope, band, band_hash) -> set(id)
+        self._ids = itertools.count()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _band_keys(self, scope, signature):
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows]
+            yield (scope, band, hash(chunk))
+
+    def _remove(self, entry_id):
+        scope, signature, _, _, _ = self._entries.pop(entry_id)
+        for key in self._band_keys(scope, signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def lookup(self, text, scope):
+        """Return (payload, source_url, similarity) of the best match, or (None, None, best)."""
+        signature = self.hasher.signature(text)
+        if signature is None:
+            return None, None, 0.0
+        now = time.time()
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(scope, signature):
+                candidates |= self._buckets.get(key, set())
+
+            best_id, best = None, 0.0
+            for entry_id in candidates:
+                _, cached_sig, _, _, stored_at = self._entries[entry_id]
+                if now - stored_at > self.ttl:
+                    continue
+                score = similarity(signature, cached_sig)
+                if score > best:
+                    best_id, best = entry_id, score
+
+            if best_id is not None and best >= self.threshold:
+                self._entries.move_to_end(best_id)
+                self.hits += 1
+                _, _, payload, source_url, _ = self._entries[best_id]
+                return payload, source_url, best
+            self.misses += 1
+            return None, None, best
+
+    def store(self, text, scope, payload, source_url=""):
+        signature = self.hasher.signature(text)
+        if signature is None:
+            return
+        now = time.time()
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = (scope, signature, payload, source_url, now)
+            for key in self._band_keys(scope, signature):
+                self._buckets.setdefault(key, set()).add(entry_id)
+            while self._entries:
+                oldest_id = next(iter(self._entries))
+                expired = now - self._entries[oldest_id][4] > self.ttl
+                if len(self._entries) <= self.max_entries and not expired:
+                    break
+                self._remove(oldest_id)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+def reuse_post(payload, source_url, article, score):
+    """Adapt a cached post to `article`: swap in its link and report the similarity."""
+    content = payload.get("content", "")
+    url = article.get("url", "")
+    if source_url and url and source_url != url:
+        content = content.replace(source_url, url)
+    return {**payload, "content": content, "cache_similarity": round(score, 4)}
+
+
+def semantic_cache_from_env():
+    return SemanticCache(
+        threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.8")),
+        max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000")),
+        ttl=float(os.getenv("SEMANTIC_CACHE_TTL", "3600")),
+    )
+
+
+def semantic_cache_requested(data):
+    """Opt-in per request (`semantic_cache`); the SEMANTIC_CACHE env flag sets the default."""
+    default = os.getenv("SEMANTIC_CACHE", "0").lower() in ("1", "true", "yes")
+    return bool(data.get("semantic_cache", default))
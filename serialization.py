@@ -0,0 +1,118 @@
+# ================================
+# Response serialization (serialization.py)
+# ================================
+"""
+Response body encoding and compression shared by both API servers.
+
+- JSON is encoded with orjson when it is installed (several times faster
+  than the stdlib on the larger article/analysis payloads), else compact
+  json.dumps; the JSON itself is the same either way.
+- A client that sends `Accept: application/msgpack` (or
+  application/x-msgpack) gets MessagePack instead, when msgpack is installed.
+- Bodies of at least COMPRESS_MIN_BYTES are compressed with brotli (when
+  installed and accepted) or gzip, following Accept-Encoding.
+
+SSE streams are neither re-encoded nor compressed (they must flush per event).
+"""
+import gzip
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: JSON only
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+JSON_MIMETYPE = "application/json"
+MSGPACK_MIMETYPE = "application/msgpack"
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, "application/x-msgpack")
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+
+def _accepted(header):
+    """{media type or coding: q} from an Accept / Accept-Encoding header."""
+    accepted = {}
+    for part in (header or "").split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    return accepted
+
+
+def response_mimetype(accept):
+    """MessagePack if the client asks for it at least as much as JSON, else JSON."""
+    if msgpack is None or not accept:
+        return JSON_MIMETYPE
+    types = _accepted(accept)
+    msgpack_q = max(types.get(t, 0.0) for t in MSGPACK_MIMETYPES)
+    json_q = max(types.get(t, 0.0) for t in (JSON_MIMETYPE, "application/*", "*/*"))
+    return MSGPACK_MIMETYPE if msgpack_q > 0 and msgpack_q >= json_q else JSON_MIMETYPE
+
+
+def dumps(payload):
+    """Compact JSON bytes."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(payload, default=str)
+        except TypeError:  # e.g. non-string keys, which the stdlib converts
+            pass
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str).encode()
+
+
+def encode_body(payload, accept=None):
+    """(body bytes, mimetype) for `payload` in the format the Accept header prefers."""
+    mimetype = response_mimetype(accept)
+    if mimetype == MSGPACK_MIMETYPE:
+        return msgpack.packb(payload, use_bin_type=True, default=str), mimetype
+    return dumps(payload), mimetype
+
+
+def content_coding(accept_encoding):
+    """Coding to use for an Accept-Encoding header: br, gzip or None (brotli wins ties)."""
+    codings = _accepted(accept_encoding)
+    best, best_q = None, 0.0
+    for name in ("br", "gzip") if brotli is not None else ("gzip",):
+        q = codings.get(name, codings.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compress_body(body, accept_encoding, min_bytes=None):
+    """(body, coding) compressed per Accept-Encoding; coding is None if left as is."""
+    if len(body) < (COMPRESS_MIN_BYTES if min_bytes is None else min_bytes):
+        return body, None
+    coding = content_coding(accept_encoding)
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY), coding
+    if coding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), coding
+    return body, None
+
+
+def compressible(mimetype, headers):
+    """Whether a buffered response may be compressed (not SSE, not already encoded)."""
+    return mimetype != "text/event-stream" and "Content-Encoding" not in headers
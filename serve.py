@@ -0,0 +1,150 @@
+# ================================
+# Production launcher (serve.py)
+# ================================
+"""
+Supervised multi-worker launcher for the API.
+
+Runs the API under gunicorn with N worker processes (threaded Flask workers
+for API_MODE=sync, uvicorn workers for API_MODE=async), waits until /health
+answers (polling with backoff), restarts the server if it dies, and forwards
+SIGHUP to gunicorn for a graceful worker reload. If an API is already
+answering on the port, it does nothing.
+
+    python serve.py --workers 4 --port 5001
+    python serve.py --mode async --workers 4
+    kill -HUP <serve.py pid>      # graceful reload
+
+Workers share the SQLite article store (and the SQLite response cache when
+CACHE_BACKEND=sqlite); in-memory caches are per worker. With PREWARM=1 and
+more than one worker, one worker pre-warms the shared SQLite cache for all.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+HEALTH_MESSAGE = "GPT News API running"
+
+
+def api_is_healthy(base_url, timeout=1.0):
+    """True if the news API (not just any server) answers /health on base_url."""
+    try:
+        with urllib.request.urlopen(f"{base_url}/health", timeout=timeout) as r:
+            return r.status == 200 and json.loads(r.read()).get("message") == HEALTH_MESSAGE
+    except Exception:
+        return False
+
+
+def wait_for_health(base_url, timeout=30.0, initial_delay=0.05, max_delay=1.0, proc=None):
+    """Poll /health with exponential backoff; False on timeout or if `proc` exits."""
+    deadline = time.monotonic() + timeout
+    delay = initial_delay
+    while time.monotonic() < deadline:
+        if api_is_healthy(base_url):
+            return True
+        if proc is not None and proc.poll() is not None:
+            return False
+        time.sleep(delay)
+        delay = min(delay * 2, max_delay)
+    return False
+
+
+def _uvicorn_worker_class():
+    # The uvicorn-worker package replaces uvicorn's deprecated gunicorn worker
+    if importlib.util.find_spec("uvicorn_worker") is not None:
+        return "uvicorn_worker.UvicornWorker"
+    return "uvicorn.workers.UvicornWorker"
+
+
+def build_command(mode, host, port, workers, threads, timeout, graceful_timeout):
+    command = [
+        sys.executable, "-m", "gunicorn",
+        "--bind", f"{host}:{port}",
+        "--workers", str(workers),
+        "--timeout", str(timeout),
+        "--graceful-timeout", str(graceful_timeout),
+        "--keep-alive", "5",
+    ]
+    if mode == "async":
+        command += ["--worker-class", _uvicorn_worker_class(), "async_api:app"]
+    else:
+        command += ["--worker-class", "gthread", "--threads", str(threads), "flask_api:app"]
+    return command
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mode", choices=["sync", "async"],
+                        default=os.getenv("API_MODE", "sync").lower())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("NEWS_API_PORT", "5001")))
+    parser.add_argument("--workers", type=int,
+                        default=int(os.getenv("API_WORKERS", str(os.cpu_count() or 2))))
+    parser.add_argument("--threads", type=int, default=int(os.getenv("API_THREADS", "32")),
+                        help="threads per worker in sync mode")
+    parser.add_argument("--timeout", type=int, default=120, help="worker timeout (s)")
+    parser.add_argument("--graceful-timeout", type=int, default=30)
+    parser.add_argument("--startup-timeout", type=float, default=30.0)
+    parser.add_argument("--max-restarts", type=int, default=5,
+                        help="give up after this many crashes within 60 s")
+    args = parser.parse_args()
+
+    base_url = f"http://{args.host}:{args.port}"
+    if api_is_healthy(base_url):
+        print(f"API already running on {base_url}; not starting another.", flush=True)
+        return 0
+
+    api_dir = os.path.dirname(os.path.abspath(__file__))
+    command = build_command(
+        args.mode, args.host, args.port, args.workers, args.threads,
+        args.timeout, args.graceful_timeout,
+    )
+
+    # Lets the workers pick a single pre-warm scheduler among themselves
+    env = {**os.environ, "SERVE_WORKERS": str(args.workers)}
+
+    state = {"proc": None, "stopping": False}
+
+    def forward(signum, _frame):
+        if signum in (signal.SIGTERM, signal.SIGINT):
+            state["stopping"] = True
+        if state["proc"] is not None and state["proc"].poll() is None:
+            state["proc"].send_signal(signum)
+
+    for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+        signal.signal(signum, forward)
+
+    crashes = []
+    while True:
+        started = time.monotonic()
+        state["proc"] = proc = subprocess.Popen(command, cwd=api_dir, env=env)
+        if wait_for_health(base_url, args.startup_timeout, proc=proc):
+            print(
+                f"API ready on {base_url} ({args.mode}, {args.workers} workers) "
+                f"in {time.monotonic() - started:.2f}s",
+                flush=True,
+            )
+        elif proc.poll() is None:
+            print("API did not pass /health in time; still waiting on it.", flush=True)
+
+        returncode = proc.wait()
+        if state["stopping"]:
+            return 0
+
+        now = time.monotonic()
+        crashes = [t for t in crashes if now - t < 60] + [now]
+        if len(crashes) > args.max_restarts:
+            print(f"API exited with {returncode} too often; giving up.", flush=True)
+            return returncode or 1
+        delay = min(2 ** (len(crashes) - 1) * 0.5, 10)
+        print(f"API exited with {returncode}; restarting in {delay:.1f}s.", flush=True)
+        time.sleep(delay)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+# ================================
+# Server-Sent Events helpers (streaming.py)
+# ================================
+"""
+SSE framing shared by the API servers and the Streamlit client.
+
+A streamed generation emits:
+- `token` events: {"delta": "<text>"} as the model produces it
+- one `done` event: the same JSON payload the non-streaming route returns
+- or one `error` event: {"success": false, "error": "..."}
+"""
+import json
+
+SSE_MIMETYPE = "text/event-stream"
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def wants_stream(data=None, args=None):
+    """True when the request body or query string asks for stream=true."""
+    value = (data or {}).get("stream")
+    if value is None and args is not None:
+        value = args.get("stream")
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
+
+
+def sse_event(event, data):
+    """Encode one SSE frame with a JSON data field."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_complete(payload, field):
+    """Frames for an answer that is ready at once: `field` as one token, then done."""
+    return sse_event("token", {"delta": payload[field]}) + sse_event("done", payload)
+
+
+def chunk_text(chunk):
+    """Text delta from a chat.completions stream chunk ('' if none)."""
+    if not chunk.choices:
+        return ""
+    return chunk.choices[0].delta.content or ""
+
+
+def iter_sse(lines):
+    """Parse decoded SSE lines into (event, data) tuples."""
+    event, data_lines = "message", []
+    for line in lines:
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+    if data_lines:
+        yield event, json.loads("\n".join(data_lines))
@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# Modules that open stores on import (the servers) write them here, not in the repo
+_STORE_DIR = tempfile.mkdtemp(prefix="news-api-tests-")
+os.environ.setdefault("ARTICLE_STORE_PATH", os.path.join(_STORE_DIR, "articles.db"))
+os.environ.setdefault("JOB_STORE_PATH", os.path.join(_STORE_DIR, "jobs.db"))
@@ -0,0 +1,156 @@
+# ================================
+# Admission control tests (tests/test_admission.py)
+# ================================
+import asyncio
+
+import pytest
+
+from admission import (
+    AdmissionController,
+    AsyncAdmissionController,
+    Rejected,
+    TokenBucket,
+    _key_hash,
+    client_id,
+)
+
+
+class RateLimitError(Exception):
+    """Named like the SDK's 429 error, which is what classify_error keys on."""
+
+
+def test_bucket_starts_full_and_refills_at_rate():
+    bucket = TokenBucket(rate=2.0, burst=3)
+    now = bucket.updated
+    assert [bucket.take(now) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take(now) == pytest.approx(0.5)
+    assert bucket.take(now + 0.5) == 0.0
+    assert bucket.take(now + 0.5) > 0
+
+
+def test_bucket_refill_is_capped_at_burst():
+    bucket = TokenBucket(rate=10.0, burst=2)
+    now = bucket.updated + 60
+    assert bucket.take(now) == 0.0
+    assert bucket.take(now) == 0.0
+    assert bucket.take(now) > 0
+
+
+def test_client_buckets_are_off_by_default():
+    admission = AdmissionController(client_burst=1, route_rate=1000, route_burst=1000)
+    for _ in range(10):
+        admission.check_rate("ip:10.0.0.1", "/news")
+    assert admission.stats()["clients"] == 0
+
+
+def test_client_bucket_rejects_over_burst():
+    admission = AdmissionController(client_rate=0.001, client_burst=2,
+                                    route_rate=1000, route_burst=1000)
+    admission.check_rate("ip:10.0.0.1", "/news")
+    admission.check_rate("ip:10.0.0.1", "/news")
+    with pytest.raises(Rejected) as rejected:
+        admission.check_rate("ip:10.0.0.1", "/news")
+    assert rejected.value.status == 429
+    assert rejected.value.reason == "client_rate_limited"
+    admission.check_rate("ip:10.0.0.2", "/news")  # other clients are unaffected
+
+
+def test_exempt_clients_skip_the_client_bucket():
+    admission = AdmissionController(client_rate=0.001, client_burst=1,
+                                    route_rate=1000, route_burst=1000)
+    for _ in range(5):
+        admission.check_rate("ip:127.0.0.1", "/news")
+    assert admission.stats()["clients"] == 0
+
+
+def test_client_buckets_are_an_lru_with_a_hard_cap():
+    admission = AdmissionController(client_rate=100, client_burst=100, max_clients=3,
+                                    route_rate=1000, route_burst=10000)
+    for client in ("a", "b", "c"):
+        admission.check_rate(client, "/news")
+    admission.check_rate("a", "/news")  # a is now the most recently seen
+    admission.check_rate("d", "/news")
+    assert list(admission._clients) == ["c", "a", "d"]
+    assert admission.client_evictions == 1
+    for i in range(1000):
+        admission.check_rate(f"ip:{i}", "/news")
+    assert len(admission._clients) == 3
+
+
+def test_client_id_only_trusts_configured_keys():
+    keys = frozenset({_key_hash("secret")})
+    assert client_id({"X-API-Key": "secret"}, "10.0.0.1", keys) == "key:" + _key_hash("secret")
+    assert client_id({"Authorization": "Bearer secret"}, "10.0.0.1", keys).startswith("key:")
+    assert client_id({"X-API-Key": "made-up"}, "10.0.0.1", keys) == "ip:10.0.0.1"
+    assert client_id({}, None, keys) == "ip:unknown"
+
+
+def test_upstream_429_halves_the_limit_once_per_cooldown():
+    admission = AdmissionController(max_concurrent=64, min_concurrent=2)
+    admission.upstream_failed(RateLimitError())
+    assert admission.limit == 32
+    admission.upstream_failed(RateLimitError())  # same burst: still cooling down
+    assert admission.limit == 32
+    assert admission.upstream_rate_limits == 2
+
+
+def test_limit_never_drops_below_min_concurrent():
+    admission = AdmissionController(max_concurrent=8, min_concurrent=3)
+    for _ in range(5):
+        admission.cooldown_until = 0.0
+        admission.upstream_failed(RateLimitError())
+    assert admission.limit == 3
+
+
+def test_other_upstream_errors_leave_the_limit_alone():
+    admission = AdmissionController(max_concurrent=16)
+    admission.upstream_failed(TimeoutError())
+    assert admission.limit == 16
+    assert admission.upstream_rate_limits == 0
+
+
+def test_successes_grow_the_limit_additively_up_to_max():
+    admission = AdmissionController(max_concurrent=8, min_concurrent=2)
+    admission.limit = 4.0
+    for _ in range(4):
+        admission.upstream_succeeded()
+    assert admission.limit == pytest.approx(5.0, abs=0.1)
+    for _ in range(1000):
+        admission.upstream_succeeded()
+    assert admission.limit == 8
+
+
+def test_slot_is_held_only_for_the_call():
+    admission = AdmissionController(max_concurrent=1, queue_timeout=0.01)
+    with admission.slot("social"):
+        assert admission.in_flight == 1
+        with pytest.raises(Rejected) as rejected:
+            with admission.slot("social"):
+                pass
+        assert (rejected.value.status, rejected.value.reason) == (503, "queue_timeout")
+    assert admission.in_flight == 0
+    with admission.slot("social"):
+        pass
+
+
+def test_disabled_controller_hands_out_no_slots():
+    admission = AdmissionController(max_concurrent=1, enabled=False)
+    with admission.slot("social"), admission.slot("social"):
+        assert admission.in_flight == 0
+
+
+def test_async_slot_queues_until_a_call_finishes():
+    admission = AsyncAdmissionController(max_concurrent=1, queue_timeout=5)
+    order = []
+
+    async def call(name, seconds):
+        async with admission.slot("social"):
+            order.append(name)
+            await asyncio.sleep(seconds)
+
+    async def main():
+        await asyncio.gather(call("first", 0.02), call("second", 0))
+        assert admission.in_flight == 0
+
+    asyncio.run(main())
+    assert order == ["first", "second"]
@@ -0,0 +1,49 @@
+# ================================
+# Offline batch job tests (tests/test_batch_job.py)
+# ================================
+import json
+
+from batch_job import iter_items, load_done
+
+
+def _write_lines(path, lines):
+    path.write_text("".join(lines), encoding="utf-8")
+
+
+def test_load_done_keeps_successes_and_recorded_bad_rows(tmp_path):
+    output = tmp_path / "posts.jsonl"
+    _write_lines(output, [
+        json.dumps({"id": "1:0:twitter", "success": True}) + "\n",
+        json.dumps({"id": "2:0:twitter", "success": False, "kind": "upstream_timeout"}) + "\n",
+        json.dumps({"id": "3", "success": False, "kind": "invalid_row"}) + "\n",
+    ])
+    assert load_done(str(output)) == {"1:0:twitter", "3"}
+
+
+def test_load_done_drops_a_half_written_last_line(tmp_path):
+    output = tmp_path / "posts.jsonl"
+    first = json.dumps({"id": "1:0:twitter", "success": True}) + "\n"
+    _write_lines(output, [first, '{"id": "2:0:twitter", "succ'])
+    assert load_done(str(output)) == {"1:0:twitter"}
+    # Appending after the truncation starts on a fresh line
+    assert output.read_text(encoding="utf-8") == first
+
+
+def test_load_done_without_output_yet(tmp_path):
+    assert load_done(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_iter_items_reports_bad_rows_and_keeps_going(tmp_path):
+    source = tmp_path / "articles.jsonl"
+    _write_lines(source, [
+        json.dumps({"title": "A", "url": "https://a"}) + "\n",
+        "not json\n",
+        '["a list"]\n',
+        json.dumps({"article_id": 1, "targets": ["twitter"]}) + "\n",
+        json.dumps({"title": "B", "platform": "linkedin"}) + "\n",
+    ])
+    bad = []
+    items = list(iter_items(str(source), {"targets": [{"platform": "twitter"}]},
+                            lambda line_no, error: bad.append(line_no)))
+    assert [item_id for item_id, _ in items] == ["1:0:twitter", "5:0:linkedin"]
+    assert bad == [2, 3, 4]
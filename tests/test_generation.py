@@ -0,0 +1,76 @@
+# ================================
+# Shared request/payload builder tests (tests/test_generation.py)
+# ================================
+import pytest
+
+import generation
+from article_store import UnknownArticle
+from prompts import InvalidGPTJSON, InvalidRequest
+
+
+class FakeStore:
+    def __init__(self, articles):
+        self.articles = articles
+
+    def get(self, article_id):
+        if article_id not in self.articles:
+            raise UnknownArticle([article_id])
+        return self.articles[article_id]
+
+
+def test_batch_items_rejects_empty_and_oversized_batches(monkeypatch):
+    with pytest.raises(InvalidRequest):
+        generation.batch_items({})
+    monkeypatch.setattr(generation, "BATCH_MAX_ITEMS", 2)
+    with pytest.raises(InvalidRequest):
+        generation.batch_items({"article_ids": [1, 2, 3], "platform": "twitter"})
+
+
+@pytest.mark.parametrize("body", [
+    ["not", "an", "object"],
+    {"items": ["bad"]},
+    {"items": "bad"},
+    {"articles": [{"title": "A"}, 3]},
+    {"article": {"title": "A"}, "targets": ["twitter"]},
+])
+def test_batch_items_rejects_bodies_that_are_not_objects(body):
+    with pytest.raises(InvalidRequest):
+        generation.batch_items(body)
+
+
+def test_stored_articles_are_inlined_so_results_carry_titles():
+    store = FakeStore({1: {"id": 1, "title": "Stored"}})
+    items = generation.batch_items({"article_ids": [1, 999], "platform": "twitter"})
+    resolved = generation.resolve_batch_articles(store, items)
+    assert resolved[0] == {"platform": "twitter", "article": {"id": 1, "title": "Stored"}}
+    assert resolved[1] == items[1]  # unknown: left to fail on its own
+    assert generation.batch_result(0, resolved[0], {"success": True})["title"] == "Stored"
+
+
+def test_batch_results_count_each_item_alone():
+    items = [{"article": {"title": "A"}, "platform": "linkedin"}, {"article_id": 7}]
+    results = [
+        generation.batch_result(0, items[0], {"success": True, "content": "post"}),
+        generation.batch_result(1, items[1], error=TimeoutError("upstream timed out")),
+    ]
+    assert results[0]["title"] == "A" and results[0]["platform"] == "linkedin"
+    assert results[1] == {
+        "index": 1, "platform": "twitter", "tone": "informative", "title": "",
+        "success": False, "error": "upstream timed out",
+    }
+    payload = generation.batch_payload(results)
+    assert (payload["succeeded"], payload["failed"]) == (1, 1)
+
+
+def test_news_result_salvages_truncated_output():
+    content = '{"articles": [{"title": "One", "description": "d"}, {"title": "Tw'
+    payload = generation.news_result(content, 5)
+    assert payload["partial"] and [a["title"] for a in payload["articles"]] == ["One"]
+    with pytest.raises(InvalidGPTJSON):
+        generation.news_result("not json", 5)
+
+
+def test_only_local_analysis_jobs_skip_the_upstream():
+    assert not generation.job_needs_upstream("analysis", {"narrative": False})
+    assert generation.job_needs_upstream("analysis", {"narrative": True})
+    assert generation.job_needs_upstream("social", {})
@@ -0,0 +1,80 @@
+# ================================
+# Job store tests (tests/test_jobs.py)
+# ================================
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from jobs import (
+    CANCELLED, FAILED, PROCESS_OWNER, QUEUED, RUNNING, SUCCEEDED, JobStore, UnknownJob,
+    _owner_alive, _process_started,
+)
+
+HOST = socket.gethostname()
+
+
+def _dead_pid():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def _owner(pid, started=None, host=HOST):
+    started = _process_started(pid) if started is None else started
+    return f"{host}:{pid}:{started}:0123456789ab"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def test_owner_liveness():
+    assert _owner_alive(PROCESS_OWNER)
+    assert _owner_alive(_owner(os.getppid()))
+    assert not _owner_alive(_owner(_dead_pid(), started="-"))
+    # Our pid with another token: an earlier process that had the same pid
+    assert not _owner_alive(_owner(os.getpid()))
+    # A live pid that started at another time was reused by a new process
+    assert not _owner_alive(_owner(os.getppid(), started="1"))
+    # Owners written before start times were stored are checked by pid only
+    assert _owner_alive(f"{HOST}:{os.getppid()}")
+
+
+def test_recover_orphans_fails_only_jobs_of_dead_local_processes(store):
+    jobs = {}
+    for name, owner in [
+        ("ours", PROCESS_OWNER),
+        ("dead", _owner(_dead_pid(), started="-")),
+        ("other_host", _owner(_dead_pid(), started="-", host=HOST + "-elsewhere")),
+    ]:
+        jobs[name] = store.create("social", {"article_id": 1})["id"]
+        store._conn.execute("UPDATE jobs SET owner = ? WHERE id = ?", (owner, jobs[name]))
+    store._conn.commit()
+    store.start(jobs["dead"])
+
+    assert store.recover_orphans() == 1
+    dead = store.get(jobs["dead"])
+    assert dead["status"] == FAILED and dead["error_kind"] == "interrupted"
+    assert store.get(jobs["ours"])["status"] == QUEUED
+    assert store.get(jobs["other_host"])["status"] == QUEUED
+
+
+def test_job_lifecycle(store):
+    job = store.create("series", {"articles": []})
+    assert store.start(job["id"])
+    assert store.get(job["id"])["status"] == RUNNING
+    assert store.finish(job["id"], {"success": True})
+    assert store.get(job["id"])["result"] == {"success": True}
+    assert store.get(job["id"])["status"] == SUCCEEDED
+    assert store.cancel(job["id"]) == (False, store.get(job["id"]))
+
+    queued = store.create("social", {})
+    cancelled, job = store.cancel(queued["id"])
+    assert cancelled and job["status"] == CANCELLED
+    assert not store.start(queued["id"])  # a worker picking it up later skips it
+    with pytest.raises(UnknownJob):
+        store.get("missing")
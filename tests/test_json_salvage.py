@@ -0,0 +1,70 @@
+# ================================
+# Streamed article parsing tests (tests/test_json_salvage.py)
+# ================================
+import json
+
+import pytest
+
+from json_salvage import ArticleStreamParser, salvage_articles
+from prompts import InvalidGPTJSON, parse_news_payload
+
+ARTICLES = [
+    {"title": "Rates on hold {for now}", "description": 'Quote: "no [change]"'},
+    {"title": "Chips rally", "description": "Back\\slash and } brace"},
+    {"title": "Oil slips", "description": "Nested", "tags": {"region": "EU"}},
+]
+
+
+def _feed_in_chunks(text, size):
+    parser, found = ArticleStreamParser(), []
+    for i in range(0, len(text), size):
+        found += parser.feed(text[i:i + size])
+    return parser, found
+
+
+def test_articles_come_out_as_soon_as_each_object_closes():
+    text = json.dumps({"articles": ARTICLES})
+    for size in (1, 3, 17, len(text)):
+        parser, found = _feed_in_chunks(text, size)
+        assert found == ARTICLES
+        assert parser.count == 3
+
+
+def test_a_bare_array_works_too():
+    assert salvage_articles(json.dumps(ARTICLES)) == ARTICLES
+
+
+def test_truncated_output_keeps_the_complete_articles():
+    text = json.dumps({"articles": ARTICLES})
+    cut = text[: text.index("Oil slips")]
+    assert salvage_articles(cut) == ARTICLES[:2]
+
+
+def test_nothing_after_the_array_is_parsed():
+    parser = ArticleStreamParser()
+    assert parser.feed(json.dumps({"articles": ARTICLES[:1]})) == ARTICLES[:1]
+    assert parser.feed('{"title": "late"}') == []
+
+
+def test_invalid_objects_are_skipped():
+    text = '{"articles": [{"title": "ok"}, {"title": nope}, {"title": "also ok"}]}'
+    assert salvage_articles(text) == [{"title": "ok"}, {"title": "also ok"}]
+
+
+def test_fences_and_commentary_before_the_array_are_skipped():
+    text = "Here you go:\n```json\n" + json.dumps(ARTICLES) + "\n```"
+    assert salvage_articles(text) == ARTICLES
+
+
+def test_news_payload_is_marked_partial_only_when_salvaged():
+    clean = parse_news_payload("```json\n" + json.dumps(ARTICLES) + "\n```", 2)
+    assert clean["articles"] == ARTICLES[:2] and "partial" not in clean
+
+    text = json.dumps({"articles": ARTICLES})
+    salvaged = parse_news_payload(text[: text.index("Oil slips")], 5)
+    assert salvaged["partial"] is True and salvaged["salvaged"] == 2
+
+
+def test_output_without_any_complete_article_is_rejected():
+    with pytest.raises(InvalidGPTJSON):
+        parse_news_payload('[{"title": "cut o', 5)
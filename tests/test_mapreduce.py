@@ -0,0 +1,97 @@
+# ================================
+# Map/reduce digest tests (tests/test_mapreduce.py)
+# ================================
+import asyncio
+import contextvars
+
+from mapreduce import AsyncMapReducer, MapReducer, chunk_articles, group_digests
+from prompt_budget import count_tokens
+from response_cache import ResponseCache
+
+ARTICLES = [
+    {"title": f"Story {i}", "description": f"What happened in story number {i}. " * 3}
+    for i in range(60)
+]
+
+
+def _complete(calls):
+    def complete(messages):
+        calls.append(messages)
+        return f"digest {len(calls)}"
+    return complete
+
+
+def _reducer(cls, complete, **kwargs):
+    return cls(complete, ResponseCache(ttl=3600, stale_ttl=0), chunk_tokens=300,
+               chunk_items=4, fanin=3, **kwargs)
+
+
+def test_chunks_respect_the_token_budget_and_keep_every_article():
+    chunks = chunk_articles(ARTICLES, max_tokens=100, target_items=4)
+    assert [item["title"] for chunk in chunks for item in chunk] == [
+        a["title"] for a in ARTICLES
+    ]
+    for chunk in chunks:
+        tokens = sum(count_tokens(i["title"]) + count_tokens(i["description"]) + 4 for i in chunk)
+        assert tokens <= 100 or len(chunk) == 1
+
+
+def test_an_inserted_article_only_changes_the_chunks_around_it():
+    before = chunk_articles(ARTICLES, max_tokens=10_000, target_items=4)
+    extra = {"title": "Breaking", "description": "A new story arrives."}
+    after = chunk_articles(ARTICLES[:30] + [extra] + ARTICLES[30:], 10_000, 4)
+    unchanged = [chunk for chunk in after if chunk in before]
+    assert len(before) > 4
+    assert len(unchanged) >= len(before) - 2
+
+
+def test_digest_groups_hold_two_to_twice_fanin():
+    digests = [f"digest {i}" for i in range(40)]
+    groups = group_digests(digests, fanin=3)
+    assert [d for group in groups for d in group] == digests
+    assert all(2 <= len(group) <= 6 for group in groups)
+    assert group_digests(digests[:3], fanin=3) == [digests[:3]]
+
+
+def test_a_rerun_reuses_every_cached_node():
+    calls = []
+    reducer = _reducer(MapReducer, _complete(calls))
+    first = reducer.digest(ARTICLES, "series")
+    computed = len(calls)
+    assert reducer.last["chunks"] > 1 and reducer.last["levels"] > 1
+
+    assert reducer.digest(ARTICLES, "series") == first
+    assert len(calls) == computed
+    assert reducer.stats()["nodes_cached"] == computed
+
+    reducer.digest(ARTICLES + [{"title": "Late", "description": "One more."}], "series")
+    assert 0 < len(calls) - computed < computed
+
+
+def test_nodes_see_the_callers_context():
+    current = contextvars.ContextVar("current", default=None)
+    seen = []
+
+    def complete(messages):
+        seen.append(current.get())
+        return "digest"
+
+    current.set("request-1")
+    _reducer(MapReducer, complete).digest(ARTICLES, "analysis")
+    assert seen and set(seen) == {"request-1"}
+
+
+def test_async_reducer_builds_the_same_tree():
+    calls, async_calls = [], []
+
+    async def complete(messages):
+        async_calls.append(messages)
+        return f"digest {len(async_calls)}"
+
+    reducer = _reducer(MapReducer, _complete(calls), concurrency=1)
+    async_reducer = _reducer(AsyncMapReducer, complete)
+    reducer.digest(ARTICLES, "series")
+    asyncio.run(async_reducer.digest(ARTICLES, "series"))
+    assert async_reducer.last["chunks"] == reducer.last["chunks"]
+    assert async_reducer.last["levels"] == reducer.last["levels"]
+    assert len(async_calls) == len(calls)
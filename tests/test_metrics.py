@@ -0,0 +1,52 @@
+# ================================
+# Upstream timing tests (tests/test_metrics.py)
+# ================================
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import metrics
+
+
+def _wait(seconds):
+    with metrics.upstream_wait():
+        time.sleep(seconds)
+
+
+def test_concurrent_calls_count_once_as_wall_time():
+    clock = metrics.UpstreamClock()
+    token = metrics.request_upstream.set(clock)
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            for future in [pool.submit(contextvars.copy_context().run, _wait, 0.05)
+                           for _ in range(4)]:
+                future.result()
+        elapsed = time.perf_counter() - start
+    finally:
+        metrics.request_upstream.reset(token)
+    assert 0.05 <= clock.seconds <= elapsed
+
+
+def test_sequential_calls_add_up():
+    clock = metrics.UpstreamClock()
+    token = metrics.request_upstream.set(clock)
+    try:
+        _wait(0.02)
+        _wait(0.02)
+    finally:
+        metrics.request_upstream.reset(token)
+    assert clock.seconds == pytest.approx(0.04, abs=0.02)
+
+
+def test_threads_without_the_request_context_are_not_counted():
+    clock = metrics.UpstreamClock()
+    token = metrics.request_upstream.set(clock)
+    try:
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pool.submit(_wait, 0.02).result()  # new thread, empty context
+    finally:
+        metrics.request_upstream.reset(token)
+    assert clock.seconds == 0.0
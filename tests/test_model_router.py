@@ -0,0 +1,123 @@
+# ================================
+# Model routing tests (tests/test_model_router.py)
+# ================================
+import asyncio
+import time
+
+from model_router import AsyncModelRouter, ModelRouter
+
+HEDGED = {"social": {"backends": ["slow", "fast"], "hedge": True, "hedge_after": 0.02}}
+
+
+def _router(cls, config):
+    return cls(config, lambda base_url, api_key: None, lambda: None)
+
+
+def test_hedge_wins_and_the_losing_request_is_cancelled():
+    cancelled = []
+
+    async def call(backend, kwargs, timeout):
+        try:
+            await asyncio.sleep(1.0 if kwargs["model"] == "slow" else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(kwargs["model"])
+            raise
+        return kwargs["model"]
+
+    async def run():
+        router = _router(AsyncModelRouter, HEDGED)
+        result = await router.complete("social", "slow", {}, call)
+        await asyncio.sleep(0)  # let the cancellation land
+        return router, result
+
+    router, result = asyncio.run(run())
+    assert result == "fast"
+    assert cancelled == ["slow"]
+    route = router.route("social", "slow")
+    assert (route.hedges, route.hedge_wins) == (1, 1)
+
+
+def test_cancelling_the_caller_cancels_the_primary_before_the_hedge():
+    cancelled = []
+
+    async def call(backend, kwargs, timeout):
+        try:
+            await asyncio.sleep(1.0)
+        except asyncio.CancelledError:
+            cancelled.append(kwargs["model"])
+            raise
+
+    async def run():
+        router = _router(AsyncModelRouter, {"social": {"backends": ["slow"], "hedge": True,
+                                                       "hedge_after": 5.0}})
+        task = asyncio.ensure_future(router.complete("social", "slow", {}, call))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert cancelled == ["slow"]
+
+
+def test_primary_answering_in_time_sends_no_hedge():
+    async def call(backend, kwargs, timeout):
+        return kwargs["model"]
+
+    router = _router(AsyncModelRouter, HEDGED)
+    assert asyncio.run(router.complete("social", "slow", {}, call)) == "slow"
+    assert router.route("social", "slow").hedges == 0
+
+
+def test_threaded_hedge_returns_the_faster_backend():
+    def call(backend, kwargs, timeout):
+        time.sleep(0.5 if kwargs["model"] == "slow" else 0.01)
+        return kwargs["model"]
+
+    router = _router(ModelRouter, HEDGED)
+    started = time.monotonic()
+    assert router.complete("social", "slow", {}, call) == "fast"
+    assert time.monotonic() - started < 0.4
+    assert router.route("social", "slow").hedge_wins == 1
+
+
+def test_errors_fail_over_to_the_next_backend():
+    def call(backend, kwargs, timeout):
+        if kwargs["model"] == "broken":
+            raise TimeoutError("upstream timed out")
+        return kwargs["model"]
+
+    router = _router(ModelRouter, {"news": ["broken", "backup"]})
+    assert router.complete("news", "broken", {}, call) == "backup"
+    assert router.route("news", "broken").failovers == 1
+
+
+def test_a_failing_backend_is_ejected_behind_the_healthy_ones():
+    router = _router(ModelRouter, {"news": ["flaky", "backup"]})
+    route = router.route("news", "flaky")
+    flaky = route.backends[0]
+    for _ in range(3):
+        flaky.record(0.1, error=TimeoutError("upstream timed out"))
+    assert not flaky.healthy(time.monotonic())
+    assert [b.model for b in router.candidates(route)] == ["backup", "flaky"]
+    flaky.record(0.1)
+    assert flaky.error_streak == 0
+
+
+def test_fastest_strategy_orders_backends_by_p95():
+    router = _router(ModelRouter, {"news": {"backends": ["slow", "quick"], "strategy": "fastest"}})
+    route = router.route("news", "slow")
+    slow, quick = route.backends
+    assert slow.percentile(0.95) is None  # too few samples yet
+    for _ in range(20):
+        slow.record(0.5)
+        quick.record(0.1)
+    assert [b.model for b in router.candidates(route)] == ["quick", "slow"]
+    assert router.pick("news", "slow") is quick
+
+
+def test_unrouted_endpoints_use_the_default_model_and_client():
+    router = _router(ModelRouter, {})
+    backend = router.pick("analysis", "gpt-4.1")
+    assert backend.model == "gpt-4.1" and backend.client is router.default_client
+    assert backend.name == "gpt-4.1@openai"
@@ -0,0 +1,55 @@
+# ================================
+# Cache pre-warming tests (tests/test_prewarm.py)
+# ================================
+import prewarm
+from prewarm import Prewarmer, claim_scheduler
+from response_cache import ResponseCache, SQLiteBackend
+
+
+def _prewarmer(cache, fetched, **kwargs):
+    def fetch(country, category, limit, today):
+        fetched.append((country, category))
+        return {"news": [], "country": country, "category": category}
+
+    return Prewarmer(cache, fetch, pairs=[("us", "general"), ("in", "technology")],
+                     rate=0, jitter=0, **kwargs)
+
+
+def test_fresh_entries_are_not_refetched_on_the_next_run():
+    fetched = []
+    warmer = _prewarmer(ResponseCache(ttl=300), fetched, interval=60)
+    warmer.run_once()
+    warmer.run_once()
+    assert sorted(fetched) == [("in", "technology"), ("us", "general")]
+    assert warmer.warmed == 2 and warmer.skipped == 2
+
+
+def test_entries_expiring_before_the_next_run_are_refetched(monkeypatch):
+    fetched = []
+    cache = ResponseCache(ttl=300)
+    warmer = _prewarmer(cache, fetched, interval=60)
+    warmer.run_once()
+    # 250 s old + a 60 s wait would be past the TTL
+    monkeypatch.setattr(cache, "peek", lambda k: ("HIT", 250.0))
+    warmer.run_once()
+    assert len(fetched) == 4
+
+
+def test_one_scheduler_per_lock_file_under_several_workers(tmp_path, monkeypatch):
+    monkeypatch.setenv("SERVE_WORKERS", "4")
+    monkeypatch.setattr(prewarm, "_scheduler_lock", None)
+    assert not claim_scheduler(ResponseCache())  # memory cache: per worker, so off
+
+    cache = ResponseCache(SQLiteBackend(str(tmp_path / "cache.db")))
+    assert claim_scheduler(cache)
+    held = prewarm._scheduler_lock
+    monkeypatch.setattr(prewarm, "_scheduler_lock", None)  # as if another worker
+    assert not claim_scheduler(cache)
+    held.close()
+    assert claim_scheduler(cache)
+    prewarm._scheduler_lock.close()
+
+
+def test_single_process_always_runs_the_scheduler(monkeypatch):
+    monkeypatch.delenv("SERVE_WORKERS", raising=False)
+    assert claim_scheduler(ResponseCache())
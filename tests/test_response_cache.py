@@ -0,0 +1,77 @@
+# ================================
+# Response cache tests (tests/test_response_cache.py)
+# ================================
+import threading
+import time
+
+import pytest
+
+from response_cache import HIT, MISS, STALE, MemoryBackend, ResponseCache, SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "cache.db"), max_entries=2)
+    return MemoryBackend(max_entries=2)
+
+
+def _store(cache, key, value, age):
+    cache.backend.set(key, value, time.time() - age)
+
+
+def test_entries_are_fresh_then_stale_then_gone(backend):
+    cache = ResponseCache(backend, ttl=10, stale_ttl=20)
+    _store(cache, "fresh", {"n": 1}, age=5)
+    _store(cache, "stale", {"n": 2}, age=15)
+    assert cache.get("fresh")[:2] == ({"n": 1}, HIT)
+    assert cache.get("stale")[:2] == ({"n": 2}, STALE)
+
+    _store(cache, "expired", {"n": 3}, age=31)
+    assert cache.get("expired") == (None, MISS, 0.0)
+    assert cache.peek("expired") == (MISS, 0.0)  # the expired entry was dropped
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(backend):
+    cache = ResponseCache(backend)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    time.sleep(0.01)
+    cache.set("c", 3)
+    assert cache.get("b")[1] == MISS
+    assert cache.get("a")[1] == HIT and cache.get("c")[1] == HIT
+    assert cache.stats()["evictions"] == 1
+
+
+def test_stale_entries_are_revalidated_once_in_the_background():
+    cache = ResponseCache(ttl=10, stale_ttl=20)
+    _store(cache, "k", "old", age=15)
+    calls, release = [], threading.Event()
+
+    def producer():
+        calls.append(1)
+        release.wait(5)
+        return "new"
+
+    cache.revalidate("k", producer)
+    cache.revalidate("k", producer)  # already refreshing: no second call
+    assert cache.get("k")[:2] == ("old", STALE)
+    release.set()
+    deadline = time.monotonic() + 5
+    while cache.peek("k")[0] != HIT and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get("k")[:2] == ("new", HIT)
+    assert calls == [1] and cache.stats()["refreshes"] == 1
+
+
+def test_a_failed_refresh_keeps_the_stale_entry():
+    cache = ResponseCache(ttl=10, stale_ttl=20)
+    _store(cache, "k", "old", age=15)
+    assert cache.begin_refresh("k")
+    cache.end_refresh("k", error=RuntimeError("upstream down"))
+    assert cache.get("k")[:2] == ("old", STALE)
+    assert cache.stats()["refresh_errors"] == 1
+    assert cache.begin_refresh("k")  # the claim was released
@@ -0,0 +1,105 @@
+# ================================
+# Content negotiation tests (tests/test_serialization.py)
+# ================================
+import asyncio
+import gzip
+import json
+
+import pytest
+
+import serialization
+from serialization import (
+    JSON_MIMETYPE, MSGPACK_MIMETYPE, compress_body, content_coding, encode_body,
+    response_mimetype,
+)
+
+# Optional in the servers, so the format and coding tests need them installed
+brotli = pytest.importorskip("brotli")
+msgpack = pytest.importorskip("msgpack")
+
+PAYLOAD = {"success": True, "articles": [{"title": f"Story {i}"} for i in range(100)]}
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, JSON_MIMETYPE),
+    ("*/*", JSON_MIMETYPE),
+    ("application/msgpack", MSGPACK_MIMETYPE),
+    ("application/x-msgpack", MSGPACK_MIMETYPE),
+    ("application/json, application/msgpack", MSGPACK_MIMETYPE),  # ties go to msgpack
+    ("application/json, application/msgpack;q=0.5", JSON_MIMETYPE),
+    ("application/msgpack;q=0", JSON_MIMETYPE),
+])
+def test_accept_picks_the_body_format(accept, expected):
+    assert response_mimetype(accept) == expected
+
+
+def test_bodies_decode_to_the_same_payload():
+    body, mimetype = encode_body(PAYLOAD, "application/msgpack")
+    assert mimetype == MSGPACK_MIMETYPE and msgpack.unpackb(body) == PAYLOAD
+    body, mimetype = encode_body(PAYLOAD)
+    assert mimetype == JSON_MIMETYPE and json.loads(body) == PAYLOAD
+
+
+def test_json_only_without_msgpack(monkeypatch):
+    monkeypatch.setattr(serialization, "msgpack", None)
+    assert response_mimetype("application/msgpack") == JSON_MIMETYPE
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    (None, None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),
+    ("br;q=0.5, gzip", "gzip"),
+    ("*", "br"),
+    ("*, br;q=0", "gzip"),
+    ("gzip;q=0", None),
+])
+def test_accept_encoding_picks_the_coding(accept_encoding, expected):
+    assert content_coding(accept_encoding) == expected
+
+
+def test_gzip_only_without_brotli(monkeypatch):
+    monkeypatch.setattr(serialization, "brotli", None)
+    assert content_coding("br, gzip;q=0.1") == "gzip"
+    assert content_coding("br") is None
+
+
+def test_small_bodies_are_left_uncompressed():
+    body = json.dumps(PAYLOAD).encode()
+    assert compress_body(body[:100], "gzip", min_bytes=1024) == (body[:100], None)
+    compressed, coding = compress_body(body, "gzip", min_bytes=1024)
+    assert coding == "gzip" and gzip.decompress(compressed) == body
+    compressed, coding = compress_body(body, "br", min_bytes=1024)
+    assert coding == "br" and brotli.decompress(compressed) == body
+
+
+def test_flask_server_negotiates_format_and_coding():
+    import flask_api
+
+    client = flask_api.app.test_client()
+    response = client.get("/health", headers={"Accept": "application/msgpack"})
+    assert response.mimetype == MSGPACK_MIMETYPE
+    assert msgpack.unpackb(response.data)["message"] == "GPT News API running"
+    assert "Accept" in response.headers["Vary"]
+
+    response = client.get("/metrics", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert b"news_api_requests_total" in gzip.decompress(response.data)
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_async_server_negotiates_format_and_coding():
+    import async_api
+
+    async def run():
+        client = async_api.app.test_client()
+        health = await client.get("/health", headers={"Accept": "application/x-msgpack"})
+        metrics_page = await client.get("/metrics", headers={"Accept-Encoding": "br"})
+        return health, await health.get_data(), metrics_page, await metrics_page.get_data()
+
+    health, health_body, metrics_page, metrics_body = asyncio.run(run())
+    assert health.mimetype == MSGPACK_MIMETYPE
+    assert msgpack.unpackb(health_body)["message"] == "GPT News API running"
+    assert metrics_page.headers["Content-Encoding"] == "br"
+    assert b"news_api_requests_total" in brotli.decompress(metrics_body)
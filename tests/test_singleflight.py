@@ -0,0 +1,157 @@
+# ================================
+# Request coalescing tests (tests/test_singleflight.py)
+# ================================
+import asyncio
+import threading
+import time
+
+import pytest
+
+from singleflight import AsyncSingleFlight, SingleFlight, request_key
+
+
+def test_request_key_ignores_argument_order():
+    assert request_key(model="m", temperature=0.2) == request_key(temperature=0.2, model="m")
+    assert request_key(model="m", temperature=0.2) != request_key(model="m", temperature=0.3)
+
+
+def test_concurrent_callers_share_one_call():
+    flight, calls, release = SingleFlight(), [], threading.Event()
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", fn)))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    while flight.stats()["coalesced"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+    assert calls == [1]
+    assert results == ["result"] * 5
+    assert flight.stats() == {"upstream_calls": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_the_leaders_error_reaches_every_caller():
+    flight, release = SingleFlight(), threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise ValueError("upstream failed")
+
+    errors = []
+
+    def caller():
+        try:
+            flight.do("k", fn)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=caller) for _ in range(3)]
+    for t in threads:
+        t.start()
+    while flight.stats()["coalesced"] < 2:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join()
+    assert errors == ["upstream failed"] * 3
+
+
+def test_async_callers_share_one_call():
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def run():
+        flight = AsyncSingleFlight()
+        results = await asyncio.gather(*(flight.do("k", fn) for _ in range(5)))
+        return flight, results
+
+    flight, results = asyncio.run(run())
+    assert calls == [1]
+    assert results == ["result"] * 5
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_one_cancelled_waiter_leaves_the_call_running_for_the_others():
+    async def fn():
+        await asyncio.sleep(0.05)
+        return "result"
+
+    async def run():
+        flight = AsyncSingleFlight()
+        first = asyncio.ensure_future(flight.do("k", fn))
+        second = asyncio.ensure_future(flight.do("k", fn))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return flight, await second, first
+
+    flight, result, first = asyncio.run(run())
+    assert result == "result"
+    assert first.cancelled()
+    assert flight.stats()["abandoned"] == 0
+
+
+def test_the_call_is_cancelled_when_every_waiter_is():
+    cancelled = []
+
+    async def fn():
+        try:
+            await asyncio.sleep(1.0)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def run():
+        flight = AsyncSingleFlight()
+        waiters = [asyncio.ensure_future(flight.do("k", fn)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.gather(*waiters)
+        await asyncio.sleep(0)
+        return flight
+
+    flight = asyncio.run(run())
+    assert cancelled == [True]
+    assert flight.stats()["abandoned"] == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_sequential_calls_are_not_merged():
+    flight, calls = SingleFlight(), []
+    for _ in range(3):
+        flight.do("k", lambda: calls.append(1) or len(calls))
+    assert calls == [1, 1, 1]
+    assert flight.stats() == {"upstream_calls": 3, "coalesced": 0, "in_flight": 0}
+
+
+def test_async_calls_with_different_keys_run_separately():
+    calls = []
+
+    def fn_for(key):
+        async def fn():
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return key
+        return fn
+
+    async def run():
+        flight = AsyncSingleFlight()
+        results = await asyncio.gather(flight.do("a", fn_for("a")), flight.do("b", fn_for("b")))
+        return flight, results
+
+    flight, results = asyncio.run(run())
+    assert results == ["a", "b"] and sorted(calls) == ["a", "b"]
+    assert flight.stats()["coalesced"] == 0